@@ -1,22 +1,42 @@
 from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+import json
 import os
 import uvicorn
-from src.agent import BankingAgent
+from config.settings import LLM_BACKEND
+from src.agent import AgentEngine
+from src.conversation import ConversationStore
+from src.knowledge import get_knowledge_base, start_knowledge_base_watcher
 
 app = FastAPI(title="Agente Bancario Virtual")
 
 # Inicializar agente
+# Con LLM_BACKEND=fake la API corre sin red (pruebas de carga)
 api_key = os.environ.get('GEMINI_API_KEY')
-if not api_key:
+if LLM_BACKEND == "gemini" and not api_key:
     raise ValueError("❌ GEMINI_API_KEY no configurada")
 
-agent = BankingAgent(api_key)
+# La base de conocimiento se construye una sola vez por proceso y la
+# comparten todos los componentes (agente, herramientas y endpoints)
+get_knowledge_base()
+# Recarga faqs.json en caliente cuando cambia (FAQ_RELOAD_INTERVAL_SECONDS)
+start_knowledge_base_watcher()
+# Un solo motor para todas las conversaciones; cada navegador tiene su
+# ConversationState, identificado por la cookie CONVERSATION_COOKIE
+engine = AgentEngine(api_key)
+conversations = ConversationStore(on_evict=engine.reset_session)
+CONVERSATION_COOKIE = "conversation_id"
 
-# Almacenar sesiones (en memoria simple)
-sessions = {}
+
+def get_conversation(request: Request):
+    return conversations.get_or_create(request.cookies.get(CONVERSATION_COOKIE))
+
+
+def set_conversation_cookie(response, state):
+    response.set_cookie(CONVERSATION_COOKIE, state.conversation_id, httponly=True, samesite="lax")
+    return response
 
 @app.get("/", response_class=HTMLResponse)
 async def home():
@@ -191,17 +211,41 @@ async def home():
                 document.getElementById('loading').style.display = 'block';
                 
                 try {
-                    // Enviar al backend
-                    const response = await fetch('/chat', {
+                    // Enviar al backend y mostrar la respuesta a medida que llega
+                    const response = await fetch('/chat/stream', {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
                         body: JSON.stringify({ message: message })
                     });
+                    if (!response.ok) throw new Error(response.statusText);
                     
-                    const data = await response.json();
+                    const reader = response.body.getReader();
+                    const decoder = new TextDecoder();
+                    let buffer = '';
+                    let text = '';
+                    let content = null;
                     
-                    // Mostrar respuesta del bot
-                    addMessage(data.response, 'bot');
+                    while (true) {
+                        const { done, value } = await reader.read();
+                        if (done) break;
+                        buffer += decoder.decode(value, { stream: true });
+                        
+                        // Eventos SSE separados por una línea en blanco
+                        const events = buffer.split('\n\n');
+                        buffer = events.pop();
+                        for (const event of events) {
+                            if (!event.startsWith('data: ')) continue;
+                            text += JSON.parse(event.slice(6)).delta;
+                            if (!content) {
+                                document.getElementById('loading').style.display = 'none';
+                                content = addMessage(text, 'bot');
+                            } else {
+                                content.innerHTML = text;
+                                const chatBox = document.getElementById('chatBox');
+                                chatBox.scrollTop = chatBox.scrollHeight;
+                            }
+                        }
+                    }
                     
                 } catch (error) {
                     addMessage('❌ Error al comunicarse con el servidor. Intenta de nuevo.', 'bot');
@@ -221,6 +265,7 @@ async def home():
                 messageDiv.innerHTML = `<div class="message-content">${text}</div>`;
                 chatBox.appendChild(messageDiv);
                 chatBox.scrollTop = chatBox.scrollHeight;
+                return messageDiv.firstElementChild;
             }
         </script>
     </body>
@@ -238,13 +283,15 @@ async def chat(request: Request):
         if not message:
             return JSONResponse({"error": "Mensaje vacío"}, status_code=400)
         
-        # Procesar con el agente
-        response = agent.process_message(message)
+        # Procesar con el agente, en la conversación de este navegador
+        state = get_conversation(request)
+        response = await engine.aprocess_message(state, message)
+        conversations.update(state)
         
-        return JSONResponse({
+        return set_conversation_cookie(JSONResponse({
             "success": True,
             "response": response
-        })
+        }), state)
         
     except Exception as e:
         return JSONResponse({
@@ -252,10 +299,51 @@ async def chat(request: Request):
             "response": f"Error: {str(e)}"
         }, status_code=500)
 
+@app.post("/chat/stream")
+async def chat_stream(request: Request):
+    """
+    Endpoint en streaming (Server-Sent Events): cada evento trae un chunk
+    sanitizado de la respuesta en {"delta": str}, y el último es "done".
+    """
+    data = await request.json()
+    message = data.get('message', '')
+    
+    if not message:
+        return JSONResponse({"error": "Mensaje vacío"}, status_code=400)
+    
+    state = get_conversation(request)
+    
+    async def events():
+        async for chunk in engine.astream_message(state, message):
+            yield f"data: {json.dumps({'delta': chunk}, ensure_ascii=False)}\n\n"
+        conversations.update(state)
+        yield "event: done\ndata: {}\n\n"
+    
+    return set_conversation_cookie(StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Sin buffering en proxies (nginx) para que los chunks salgan al instante
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    ), state)
+
 @app.get("/health")
 async def health():
     """Health check para Render"""
-    return {"status": "healthy", "service": "banking-ai-agent"}
+    knowledge = get_knowledge_base()
+    return {
+        "status": "healthy",
+        "service": "banking-ai-agent",
+        "knowledge_base": {
+            "total_faqs": len(knowledge.faqs),
+            "rag_enabled": knowledge.use_embeddings,
+            "query_encoder": knowledge.query_encoder.get_stats() if knowledge.query_encoder else None
+        },
+        "response_cache": engine.response_cache.get_stats(),
+        "fast_path": engine.fast_path_stats,
+        "single_flight": engine.single_flight.get_stats(),
+        "llm": engine.llm.get_stats(),
+        "conversations": conversations.get_stats()
+    }
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
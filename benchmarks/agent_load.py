@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga del agente sin red.
+
+Corre en el mismo proceso un AgentEngine compartido con el backend
+"fake" (src/llm_backends.py) y un ConversationStore, y simula
+conversaciones concurrentes con una mezcla de escenarios: preguntas
+frecuentes, consultas generales, autenticación y consulta de saldo,
+charla y la misma pregunta repetida por muchos usuarios (campaña). Cada
+turno se consume con astream_message, como /chat/stream.
+Para cada tipo de turno reporta:
+- TTFT: tiempo hasta el primer chunk de texto (p50/p95/p99)
+- tiempo total del turno (p50/p95/p99)
+Y en general: throughput (turnos/s), errores y las estadísticas del
+motor (fast path, single-flight, LLM, caché de respuestas y
+conversaciones).
+
+Carga cerrada por defecto: --concurrency conversaciones a la vez, cada
+una empieza cuando termina otra. Con --rate la carga es abierta: llegan
+conversaciones nuevas según un proceso de Poisson de esa tasa (por
+segundo), sin importar cuántas sigan en curso; así se ve la cola que se
+forma cuando la tasa supera la capacidad (LLM_MAX_CONCURRENCY).
+
+La latencia del LLM simulado se controla con --latency-ms,
+--latency-sigma, --chunk-ms y --error-rate. Para someter a carga la API
+completa basta con iniciarla con LLM_BACKEND=fake.
+
+Uso:
+    python benchmarks/agent_load.py --conversations 500 --concurrency 100
+    python benchmarks/agent_load.py --rate 50 --conversations 1000 --latency-ms 800
+    python benchmarks/agent_load.py --mix campaign=5,general=1 --json carga.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+# Sin GEMINI_API_KEY config.settings falla con el backend gemini por defecto
+os.environ.setdefault("LLM_BACKEND", "fake")
+
+import src.knowledge as knowledge
+from src.agent import AgentEngine
+from src.conversation import ConversationStore
+from src.knowledge import KnowledgeBase
+from src.llm_backends import FakeLLM
+from src.llm_client import LLMClient
+
+# Turnos de cada escenario: (tipo de turno, mensaje)
+SCENARIOS = {
+    "faq": [
+        ("faq", "¿Cuáles son los horarios de atención?"),
+        ("faq", "¿Cuánto cobran por transferencias?"),
+    ],
+    "general": [
+        ("general", "Estoy pensando en ahorrar para comprar una casa, ¿qué me recomiendan?"),
+        ("general", "¿Y qué pasa si necesito retirar el dinero antes de tiempo?"),
+    ],
+    "auth": [
+        ("general", "Quiero consultar mi saldo"),
+        ("auth", "Mi cédula es 1234567890 y el código 123456"),
+        ("tool", "¿Cuál es mi saldo?"),
+        ("tool", "¿Y mis tarjetas?"),
+    ],
+    "chitchat": [
+        ("chitchat", "Hola"),
+        ("chitchat", "Muchas gracias"),
+    ],
+    # Muchos usuarios con la misma pregunta tras una campaña
+    "campaign": [
+        ("campaign", "¿Cómo participo en la promoción de aniversario?"),
+    ],
+}
+DEFAULT_MIX = "faq=3,general=3,auth=2,chitchat=2"
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Pesos de los escenarios, p. ej. "faq=3,auth=1" """
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Escenario desconocido: {name!r} (opciones: {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def build_engine(args) -> AgentEngine:
+    if args.no_embeddings:
+        # Índice léxico: se mide el agente, no el modelo de embeddings
+        knowledge._shared_knowledge_base = KnowledgeBase(use_embeddings=False)
+    model = FakeLLM(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        chunk_ms=args.chunk_ms,
+        chunk_chars=args.chunk_chars,
+        response_chars=args.response_chars,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    engine = AgentEngine(model=model)
+    if args.llm_concurrency:
+        engine.llm = LLMClient(model, max_concurrency=args.llm_concurrency)
+    return engine
+
+
+class LoadTest:
+    """Simula las conversaciones y registra la latencia de cada turno"""
+
+    def __init__(self, engine: AgentEngine, store: ConversationStore, think_ms: float):
+        self.engine = engine
+        self.store = store
+        self.think_ms = think_ms
+        self.ttft: Dict[str, List[float]] = defaultdict(list)
+        self.total: Dict[str, List[float]] = defaultdict(list)
+        self.errors = 0
+        self.turns = 0
+
+    async def conversation(self, scenario: str):
+        state = self.store.get_or_create(None)
+        for kind, message in SCENARIOS[scenario]:
+            start = time.perf_counter()
+            first = None
+            text = ""
+            async for chunk in self.engine.astream_message(state, message):
+                if first is None and chunk:
+                    first = time.perf_counter() - start
+                text += chunk
+            elapsed = time.perf_counter() - start
+
+            self.turns += 1
+            if text == self.engine.TECHNICAL_ERROR_MESSAGE:
+                self.errors += 1
+            self.ttft[kind].append(1000 * (first if first is not None else elapsed))
+            self.total[kind].append(1000 * elapsed)
+            self.store.update(state)
+            if self.think_ms:
+                await asyncio.sleep(self.think_ms / 1000)
+
+    async def run_closed(self, scenarios: List[str], concurrency: int):
+        queue = list(reversed(scenarios))
+
+        async def worker():
+            while queue:
+                await self.conversation(queue.pop())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def run_open(self, scenarios: List[str], rate: float, rng: random.Random):
+        tasks = []
+        for scenario in scenarios:
+            tasks.append(asyncio.ensure_future(self.conversation(scenario)))
+            await asyncio.sleep(rng.expovariate(rate))
+        await asyncio.gather(*tasks)
+
+    def summary(self) -> List[dict]:
+        rows = []
+        kinds = sorted(self.total)
+        all_ttft = [value for kind in kinds for value in self.ttft[kind]]
+        all_total = [value for kind in kinds for value in self.total[kind]]
+        for kind, ttft, total in [(kind, self.ttft[kind], self.total[kind]) for kind in kinds] + [
+                ("todos", all_ttft, all_total)]:
+            if not total:
+                continue
+            rows.append({
+                "turn": kind,
+                "count": len(total),
+                "ttft_p50_ms": statistics.median(ttft),
+                "ttft_p95_ms": percentile(ttft, 95),
+                "ttft_p99_ms": percentile(ttft, 99),
+                "total_p50_ms": statistics.median(total),
+                "total_p95_ms": percentile(total, 95),
+                "total_p99_ms": percentile(total, 99),
+            })
+        return rows
+
+
+def print_rows(rows: List[dict]):
+    header = (f"{'turno':<10} {'n':>6} {'TTFT p50':>9} {'TTFT p95':>9} {'TTFT p99':>9} "
+              f"{'total p50':>10} {'total p95':>10} {'total p99':>10}")
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(f"{r['turn']:<10} {r['count']:>6} {r['ttft_p50_ms']:>9.1f} {r['ttft_p95_ms']:>9.1f} "
+              f"{r['ttft_p99_ms']:>9.1f} {r['total_p50_ms']:>10.1f} {r['total_p95_ms']:>10.1f} "
+              f"{r['total_p99_ms']:>10.1f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga del agente con el LLM simulado")
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50,
+                        help="Conversaciones simultáneas (carga cerrada)")
+    parser.add_argument("--rate", type=float,
+                        help="Conversaciones nuevas por segundo (carga abierta)")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help="Pesos de los escenarios: " + ", ".join(SCENARIOS))
+    parser.add_argument("--think-ms", type=float, default=0,
+                        help="Pausa del usuario entre turnos")
+    parser.add_argument("--latency-ms", type=float, default=400,
+                        help="Mediana de la latencia del primer chunk del LLM")
+    parser.add_argument("--latency-sigma", type=float, default=0.5,
+                        help="Dispersión log-normal de esa latencia (0 = constante)")
+    parser.add_argument("--chunk-ms", type=float, default=15)
+    parser.add_argument("--chunk-chars", type=int, default=12)
+    parser.add_argument("--response-chars", type=int, default=300)
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fracción de llamadas al LLM que fallan (error transitorio)")
+    parser.add_argument("--llm-concurrency", type=int,
+                        help="Límite de llamadas en vuelo al LLM (por defecto LLM_MAX_CONCURRENCY)")
+    parser.add_argument("--no-embeddings", action="store_true",
+                        help="Usar solo el índice léxico")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="Escribir los resultados en JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    scenarios = rng.choices(list(mix), weights=list(mix.values()), k=args.conversations)
+
+    engine = build_engine(args)
+    store = ConversationStore(on_evict=engine.reset_session)
+    test = LoadTest(engine, store, args.think_ms)
+
+    load = f"{args.rate:g} conv/s" if args.rate else f"{args.concurrency} simultáneas"
+    print(f"\n📊 {args.conversations} conversaciones ({load}), LLM simulado "
+          f"{args.latency_ms:g} ms (σ={args.latency_sigma:g})\n")
+
+    async def run():
+        if args.rate:
+            await test.run_open(scenarios, args.rate, rng)
+        else:
+            await test.run_closed(scenarios, args.concurrency)
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    rows = test.summary()
+    print_rows(rows)
+    print(f"\n⏱️  {test.turns} turnos en {elapsed:.2f} s: {test.turns / elapsed:.1f} turnos/s, "
+          f"{test.errors} errores")
+
+    stats = {
+        "fast_path": dict(engine.fast_path_stats),
+        "single_flight": engine.single_flight.get_stats(),
+        "llm": engine.llm.get_stats(),
+        "response_cache": engine.response_cache.get_stats(),
+        "conversations": store.get_stats(),
+    }
+    print(f"⚡ Fast path: {stats['fast_path']}")
+    print(f"🔗 Single-flight: {stats['single_flight']['coalesced']} turnos coalescidos, "
+          f"{stats['single_flight']['fallbacks']} resueltos por su cuenta")
+    llm = stats["llm"]
+    print(f"🤖 LLM: {llm['calls']} llamadas, {llm['retries']} reintentos, "
+          f"{llm['errors']} errores, primer chunk p95 {llm['first_chunk_ms_p95']:.1f} ms")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "conversations": args.conversations,
+            "concurrency": None if args.rate else args.concurrency,
+            "rate": args.rate,
+            "mix": mix,
+            "latency_ms": args.latency_ms,
+            "latency_sigma": args.latency_sigma,
+            "error_rate": args.error_rate,
+            "seed": args.seed,
+        },
+        "elapsed_s": elapsed,
+        "turns": test.turns,
+        "throughput": test.turns / elapsed,
+        "errors": test.errors,
+        "results": rows,
+        "stats": stats,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        print(f"\n💾 Resultados guardados en {args.json}")
+
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Reporte de cuantización del índice vectorial (backend numpy).
+
+Compara float32 contra float16 / int8 (con y sin re-puntuación exacta) y
+reporta memoria de la matriz recorrida, memoria ahorrada y recall@k
+respecto al top-k exacto en float32, usando las queries de
+tests/test_rag.py sobre las FAQs reales.
+
+Para simular bases de conocimiento más grandes, --distractors agrega
+documentos sintéticos alrededor de los embeddings de las FAQs.
+--offline usa solo vectores sintéticos (no requiere el modelo).
+
+Uso:
+    python benchmarks/quantization_report.py --top-k 3 --distractors 50000
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from src.vector_store import NumpyVectorStore
+
+MODES = [
+    ("float32", False),
+    ("float16", False),
+    ("float16", True),
+    ("int8", False),
+    ("int8", True),
+]
+
+
+def load_real_vectors():
+    """Embeddings de las FAQs y de las queries de tests/test_rag.py"""
+    from src.knowledge import KnowledgeBase
+    from tests.test_rag import TEST_QUERIES, COMPARISON_QUERY
+
+    kb = KnowledgeBase(use_embeddings=True, vector_backend="numpy")
+    texts = [f"{faq['question']} {faq['answer']}" for faq in kb.faqs]
+    corpus = kb.embedding_model.encode(texts)
+    queries = kb.embedding_model.encode(TEST_QUERIES + [COMPARISON_QUERY])
+    return np.asarray(corpus, dtype=np.float32), np.asarray(queries, dtype=np.float32)
+
+
+def load_synthetic_vectors(rng, dims: int = 768, docs: int = 13, queries: int = 7):
+    corpus = rng.standard_normal((docs, dims)).astype(np.float32)
+    targets = rng.integers(0, docs, queries)
+    noise = 0.5 * rng.standard_normal((queries, dims)).astype(np.float32)
+    return corpus, corpus[targets] + noise
+
+
+def build_store(path: str, corpus: np.ndarray, dtype: str, rescore: bool) -> NumpyVectorStore:
+    store = NumpyVectorStore(path, "quantization-report", dtype=dtype, rescore=rescore)
+    ids = [f"doc_{i}" for i in range(len(corpus))]
+    store.upsert(ids, corpus, [{"content_hash": None}] * len(ids))
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reporte de cuantización del índice")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--distractors", type=int, default=0,
+                        help="Documentos sintéticos extra (cerca de las FAQs)")
+    parser.add_argument("--offline", action="store_true",
+                        help="Usar vectores sintéticos en lugar del modelo")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    corpus, queries = load_synthetic_vectors(rng) if args.offline else load_real_vectors()
+
+    if args.distractors:
+        anchors = corpus[rng.integers(0, len(corpus), args.distractors)]
+        spread = np.linalg.norm(corpus, axis=1).mean() * 0.05
+        noise = rng.standard_normal(anchors.shape).astype(np.float32)
+        noise *= spread / np.sqrt(corpus.shape[1])
+        corpus = np.vstack([corpus, anchors + noise]).astype(np.float32)
+
+    print(f"\n📊 {len(corpus)} documentos × {corpus.shape[1]} dims, "
+          f"{len(queries)} queries, recall@{args.top_k} vs float32 exacto\n")
+    header = f"{'modo':<18} {'MB':>9} {'ahorro':>7} {'recall':>7} {'p50 ms':>8}"
+    print(header)
+    print("-" * len(header))
+
+    baseline_bytes = None
+    exact = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype, rescore in MODES:
+            store = build_store(f"{tmp}/{dtype}-{rescore}", corpus, dtype, rescore)
+            latencies = []
+            results = []
+            for query in queries:
+                start = time.perf_counter()
+                results.append({item_id for item_id, _ in store.query(query, args.top_k)})
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            if exact is None:
+                exact, baseline_bytes = results, store.memory_bytes()
+
+            recall = statistics.mean(
+                len(found & expected) / len(expected) for found, expected in zip(results, exact)
+            )
+            saved = 1 - store.memory_bytes() / baseline_bytes
+            label = f"{dtype}{' + rescore' if rescore else ''}"
+            print(f"{label:<18} {store.memory_bytes() / 1e6:>9.2f} {saved:>6.0%} "
+                  f"{recall:>7.3f} {statistics.median(latencies):>8.3f}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Benchmark de calidad y latencia de la recuperación.
+
+Carga un conjunto etiquetado (query -> FAQs relevantes; por defecto
+LABELED_QUERIES de tests/test_rag.py) y evalúa cada combinación de
+backend de embeddings (src/embeddings.py), backend vectorial
+(src/vector_store.py) y modo de búsqueda. Para cada una reporta:
+- recall@k: fracción de las FAQs relevantes que aparecen en el top-k
+- MRR: posición media (recíproca) de la primera FAQ relevante
+- latencia por query (p50/p95/p99)
+- tiempo de construcción del índice (en un directorio vacío, sin
+  reutilizar vectores) y memoria residente que agrega
+
+El modo léxico (BM25) no depende de los backends y se evalúa una sola vez.
+
+Con --json se escriben los resultados en formato JSON; con --compare se
+contrastan contra un baseline guardado con --json y el proceso termina
+con código 1 si hay regresiones (recall/MRR más bajos o latencia/tiempo
+de construcción más altos que la tolerancia).
+
+Sin las bibliotecas de RAG solo se evalúa el modo léxico.
+
+Uso:
+    python benchmarks/retrieval_eval.py --top-k 3
+    python benchmarks/retrieval_eval.py --modes lexical,hybrid --repeat 20
+    python benchmarks/retrieval_eval.py --backends hashing,sentence-transformers --vector-backends numpy,ivf
+    python benchmarks/retrieval_eval.py --json baseline.json
+    python benchmarks/retrieval_eval.py --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import src.knowledge as knowledge
+from config.settings import EMBEDDING_BACKEND, EMBEDDING_MODEL, HASHING_DIMENSIONS, VECTOR_BACKEND
+from src.knowledge import KnowledgeBase
+from src.retrieval import SEARCH_MODES
+from tests.test_rag import LABELED_QUERIES
+
+# Métricas donde un valor más alto es mejor (el resto: más bajo es mejor)
+HIGHER_IS_BETTER = ("recall", "mrr")
+# Métricas de tiempo comparadas y el aumento absoluto mínimo que cuenta
+# como regresión (por debajo es ruido de medición)
+LATENCY_METRICS = {"p95_ms": 1.0, "build_s": 0.5}
+
+
+def rss_mb() -> float:
+    """Memoria residente actual del proceso en MB (Linux; pico en otros SO)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def load_labeled_queries(path: Optional[str]) -> Dict[str, List[str]]:
+    """Conjunto etiquetado {query: [faq_id, ...]} desde JSON, o el de tests/test_rag.py"""
+    if not path:
+        return LABELED_QUERIES
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def evaluate(kb: KnowledgeBase, mode: str, queries: Dict[str, List[str]],
+             top_k: int, repeat: int) -> dict:
+    recalls = []
+    reciprocal_ranks = []
+    latencies = []
+
+    for query, relevant in queries.items():
+        for _ in range(repeat):
+            start = time.perf_counter()
+            hits = kb.retrieve_hits(query, top_k, mode)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        found = [hit.id for hit in hits]
+        recalls.append(len(set(found) & set(relevant)) / len(relevant))
+        rank = next((i for i, faq_id in enumerate(found, 1) if faq_id in relevant), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    return {
+        "mode": mode,
+        "recall": statistics.mean(recalls),
+        "mrr": statistics.mean(reciprocal_ranks),
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def build_knowledge_base(index_dir: str, docs_dir: Optional[str], **options):
+    """Construye una KnowledgeBase sobre un índice vacío; devuelve (kb, segundos, MB)"""
+    # Directorio nuevo por configuración: se mide la indexación completa,
+    # sin reutilizar vectores de corridas anteriores
+    knowledge.VECTOR_STORE_DIR = index_dir
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    kb = KnowledgeBase(docs_dir=docs_dir, **options)
+    return kb, time.perf_counter() - start, rss_mb() - rss_before
+
+
+def load_embedding_model(backend: str):
+    """Carga el backend de embeddings una vez; devuelve (modelo, segundos, MB)"""
+    from src.embeddings import create_embedding_backend
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    options = {"dimensions": HASHING_DIMENSIONS} if backend == "hashing" else {}
+    model = create_embedding_backend(backend, EMBEDDING_MODEL, **options)
+    return model, time.perf_counter() - start, rss_mb() - rss_before
+
+
+def run(args, queries: Dict[str, List[str]], workdir: str) -> List[dict]:
+    docs_dir = None if args.no_docs else knowledge.DOCS_DIR
+    modes = args.modes.split(",")
+    results = []
+
+    def record(embedding_backend, vector_backend, kb, mode, build):
+        row = {
+            "embedding_backend": embedding_backend,
+            "vector_backend": vector_backend,
+            **evaluate(kb, mode, queries, args.top_k, args.repeat),
+            **build,
+        }
+        results.append(row)
+        print_row(row)
+
+    print_header(len(queries), args.top_k)
+
+    if "lexical" in modes:
+        kb, build_s, rss = build_knowledge_base(
+            os.path.join(workdir, "lexical"), docs_dir, use_embeddings=False
+        )
+        record("-", "-", kb, "lexical", {"build_s": build_s, "rss_mb": rss})
+
+    semantic_modes = [mode for mode in modes if mode != "lexical"]
+    if args.no_embeddings or not knowledge.RAG_AVAILABLE or not semantic_modes:
+        if semantic_modes:
+            print("(modos semánticos no disponibles sin embeddings)")
+        return results
+
+    for embedding_backend in args.backends.split(","):
+        try:
+            model, load_s, model_rss = load_embedding_model(embedding_backend)
+        except (ImportError, OSError, ValueError) as e:
+            print(f"{embedding_backend}: no disponible ({e})")
+            continue
+
+        for vector_backend in args.vector_backends.split(","):
+            kb, build_s, rss = build_knowledge_base(
+                os.path.join(workdir, f"{embedding_backend}-{vector_backend}"),
+                docs_dir, vector_backend=vector_backend,
+                embedding_backend=embedding_backend, embedding_model=model
+            )
+            # Precalentar la caché de embeddings: se mide la recuperación,
+            # no la primera pasada del modelo
+            kb.embed_queries(list(queries))
+            build = {"build_s": build_s, "rss_mb": rss,
+                     "model_load_s": load_s, "model_rss_mb": model_rss}
+            for mode in semantic_modes:
+                record(embedding_backend, vector_backend, kb, mode, build)
+
+    return results
+
+
+def print_header(query_count: int, top_k: int):
+    print(f"\n📊 {query_count} queries etiquetadas, top-{top_k}\n")
+    header = (f"{'embeddings':<22} {'vector':<7} {'modo':<9} {'recall@k':>8} {'MRR':>6} "
+              f"{'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'build s':>8} {'RSS MB':>7}")
+    print(header)
+    print("-" * len(header))
+
+
+def print_row(r: dict):
+    print(f"{r['embedding_backend']:<22} {r['vector_backend']:<7} {r['mode']:<9} "
+          f"{r['recall']:>8.3f} {r['mrr']:>6.3f} {r['p50_ms']:>7.3f} {r['p95_ms']:>7.3f} "
+          f"{r['p99_ms']:>7.3f} {r['build_s']:>8.2f} {r['rss_mb']:>7.0f}")
+
+
+def result_key(row: dict) -> tuple:
+    return row["embedding_backend"], row["vector_backend"], row["mode"]
+
+
+def compare(results: List[dict], baseline: dict, quality_tolerance: float,
+            latency_tolerance: float) -> List[str]:
+    """
+    Regresiones respecto al baseline.
+
+    recall y MRR no pueden bajar más de `quality_tolerance` (absoluto);
+    p95 y tiempo de construcción no pueden subir más de
+    `latency_tolerance` (relativo, 0.5 = +50%) ni más que el mínimo
+    absoluto de LATENCY_METRICS.
+    """
+    baseline_rows = {result_key(row): row for row in baseline["results"]}
+    regressions = []
+    for row in results:
+        before = baseline_rows.get(result_key(row))
+        if before is None:
+            continue
+        name = "/".join(result_key(row))
+        for metric in HIGHER_IS_BETTER:
+            if row[metric] < before[metric] - quality_tolerance:
+                regressions.append(f"{name}: {metric} {before[metric]:.3f} → {row[metric]:.3f}")
+        for metric, min_increase in LATENCY_METRICS.items():
+            if (row[metric] > before[metric] * (1 + latency_tolerance)
+                    and row[metric] - before[metric] >= min_increase):
+                regressions.append(f"{name}: {metric} {before[metric]:.3f} → {row[metric]:.3f}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de calidad y latencia de la recuperación")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--modes", default=",".join(SEARCH_MODES))
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Repeticiones por query para medir latencia")
+    parser.add_argument("--queries", metavar="PATH",
+                        help="Conjunto etiquetado JSON {query: [faq_id, ...]}")
+    parser.add_argument("--no-embeddings", action="store_true",
+                        help="No cargar el modelo (solo modo léxico)")
+    parser.add_argument("--no-docs", action="store_true",
+                        help="No indexar los documentos de DOCS_DIR")
+    parser.add_argument("--backends", default=EMBEDDING_BACKEND,
+                        help="Backends de embeddings a comparar, separados por coma")
+    parser.add_argument("--vector-backends", default=VECTOR_BACKEND,
+                        help="Backends vectoriales a comparar, separados por coma")
+    parser.add_argument("--json", metavar="PATH", help="Escribir los resultados en JSON")
+    parser.add_argument("--compare", metavar="PATH", help="Baseline JSON contra el cual comparar")
+    parser.add_argument("--quality-tolerance", type=float, default=0.01,
+                        help="Caída absoluta admitida de recall/MRR")
+    parser.add_argument("--latency-tolerance", type=float, default=0.5,
+                        help="Aumento relativo admitido de p95 y tiempo de construcción")
+    args = parser.parse_args()
+
+    queries = load_labeled_queries(args.queries)
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run(args, queries, workdir)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "top_k": args.top_k,
+            "repeat": args.repeat,
+            "queries": len(queries),
+            "docs": not args.no_docs,
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados guardados en {args.json}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.quality_tolerance, args.latency_tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regresiones respecto a {args.compare}:")
+            for regression in regressions:
+                print(f"  • {regression}")
+            return 1
+        print(f"\n✅ Sin regresiones respecto a {args.compare}")
+
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
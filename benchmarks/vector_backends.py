@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark de backends vectoriales: ChromaDB vs NumPy en proceso vs IVF.
+
+Genera un corpus sintético de embeddings agrupados por temas (misma
+dimensión que el modelo mpnet) y mide para cada backend:
+- tiempo de construcción del índice
+- latencia de query individual (p50/p95) y por lote
+- memoria (RSS del proceso y tamaño del índice)
+- coincidencia del top-k con la búsqueda exacta
+
+Para IVF se recorre la curva recall/latencia con varios valores de nprobe.
+
+Uso:
+    python benchmarks/vector_backends.py --docs 10000 --queries 200
+    python benchmarks/vector_backends.py --docs 200000 --backends numpy,ivf --nprobe 4,16,64
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from src.vector_store import create_vector_store
+
+
+def current_rss_bytes() -> int:
+    """RSS actual del proceso (Linux); 0 si no está disponible"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def benchmark_backend(backend: str, corpus: np.ndarray, queries: np.ndarray,
+                      top_k: int, batch_size: int, exact_top: list,
+                      nprobes=(None,)) -> list:
+    ids = [f"doc_{i}" for i in range(len(corpus))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rss_before = current_rss_bytes()
+        start = time.perf_counter()
+        store = create_vector_store(backend, tmp, "benchmark")
+        for offset in range(0, len(corpus), batch_size):
+            chunk = slice(offset, offset + batch_size)
+            store.upsert(
+                ids[chunk],
+                corpus[chunk],
+                [{"content_hash": item_id} for item_id in ids[chunk]],
+                [""] * len(ids[chunk])
+            )
+        store.persist()
+        build_seconds = time.perf_counter() - start
+        rss_delta = current_rss_bytes() - rss_before
+
+        rows = []
+        for nprobe in nprobes:
+            if nprobe is not None:
+                store.nprobe = nprobe
+
+            latencies = []
+            overlaps = []
+            for query, expected in zip(queries, exact_top):
+                start = time.perf_counter()
+                hits = store.query(query, top_k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                overlaps.append(len({item_id for item_id, _ in hits} & expected) / top_k)
+
+            start = time.perf_counter()
+            store.query_batch(queries, top_k)
+            batch_ms = (time.perf_counter() - start) * 1000
+
+            rows.append({
+                "backend": backend if nprobe is None else f"{backend}/{nprobe}",
+                "build_s": build_seconds,
+                "p50_ms": statistics.median(latencies),
+                "p95_ms": percentile(latencies, 95),
+                "batch_ms_per_query": batch_ms / len(queries),
+                "recall": statistics.mean(overlaps),
+                "rss_delta_mb": rss_delta / 1e6,
+                "index_mb": store.memory_bytes() / 1e6,
+            })
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backends vectoriales")
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--backends", default="numpy,chroma,ivf")
+    parser.add_argument("--nprobe", default="1,4,16",
+                        help="Valores de nprobe a medir para IVF")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    # Corpus agrupado por temas, como los embeddings reales de documentos
+    topics = rng.standard_normal((max(1, args.docs // 100), args.dim)).astype(np.float32)
+    corpus = topics[rng.integers(0, len(topics), args.docs)]
+    corpus = corpus + 0.7 * rng.standard_normal((args.docs, args.dim)).astype(np.float32)
+    # Queries cercanas a documentos del corpus, como paráfrasis de una FAQ
+    targets = rng.integers(0, args.docs, args.queries)
+    queries = corpus[targets] + 0.5 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    normalized = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    exact_scores = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ normalized.T
+    exact_top = [
+        {f"doc_{i}" for i in np.argsort(-row)[:args.top_k]}
+        for row in exact_scores
+    ]
+
+    print(f"\n📊 Corpus: {args.docs} docs × {args.dim} dims, {args.queries} queries, top-{args.top_k}\n")
+    header = f"{'backend':<10} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8} {'lote ms/q':>10} {'recall':>7} {'ΔRSS MB':>8} {'índice MB':>10}"
+    print(header)
+    print("-" * len(header))
+
+    for backend in args.backends.split(","):
+        nprobes = [int(n) for n in args.nprobe.split(",")] if backend == "ivf" else [None]
+        try:
+            rows = benchmark_backend(backend, corpus, queries, args.top_k,
+                                     args.batch_size, exact_top, nprobes)
+        except ImportError as e:
+            print(f"{backend:<10} no disponible: {e}")
+            continue
+        for r in rows:
+            print(
+                f"{r['backend']:<10} {r['build_s']:>8.2f} {r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f} "
+                f"{r['batch_ms_per_query']:>10.4f} {r['recall']:>7.3f} {r['rss_delta_mb']:>8.1f} {r['index_mb']:>10.1f}"
+            )
+    print()
+
+
+if __name__ == "__main__":
+    main()
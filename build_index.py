@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Construye el índice vectorial persistente de la base de conocimiento.
+
+Se ejecuta en tiempo de build (ver render.yaml) para que el servicio
+arranque con los embeddings ya calculados. Es incremental: solo embebe
+las FAQs y los fragmentos de documentos (DOCS_DIR) nuevos o modificados
+desde la última ejecución.
+
+Uso:
+    python build_index.py
+    python build_index.py --ingest export.jsonl --batch-size 256
+    VECTOR_BACKEND=ivf python build_index.py --rebuild-ivf --nlist 1024
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config.settings import EMBEDDING_BATCH_SIZE
+from src.knowledge import KnowledgeBase, RAG_AVAILABLE
+
+
+def iter_export(path: str) -> Iterator[Dict]:
+    """
+    Lee una exportación de FAQs de forma perezosa.
+
+    Admite JSON Lines (una FAQ por línea) o JSON con la forma de
+    faqs.json ({"faqs": [...]}) o una lista de FAQs.
+    """
+    if path.endswith('.jsonl'):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    yield from (data.get('faqs', []) if isinstance(data, dict) else data)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Construye el índice de la base de conocimiento")
+    parser.add_argument("--ingest", metavar="PATH",
+                        help="Exportación de FAQs (.json o .jsonl) a ingerir antes de indexar")
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE,
+                        help="Tamaño de lote para generar embeddings")
+    parser.add_argument("--rebuild-ivf", action="store_true",
+                        help="Re-entrenar las particiones del índice IVF (VECTOR_BACKEND=ivf)")
+    parser.add_argument("--nlist", type=int, default=None,
+                        help="Particiones IVF al re-entrenar (por defecto IVF_NLIST o ~4·√n)")
+    args = parser.parse_args()
+
+    if not RAG_AVAILABLE:
+        print("❌ Bibliotecas de RAG no disponibles; no se puede construir el índice")
+        return 1
+
+    start = time.perf_counter()
+    kb = KnowledgeBase(use_embeddings=True)
+
+    if args.ingest:
+        print(f"📥 Ingiriendo {args.ingest}...")
+        ingest_stats = kb.add_faqs(iter_export(args.ingest), batch_size=args.batch_size)
+        kb.compact_journal()
+        print(f"  • Nuevas: {ingest_stats['added']}")
+        print(f"  • Actualizadas: {ingest_stats['updated']}")
+        print(f"  • Sin cambios: {ingest_stats['unchanged']}")
+
+    if args.rebuild_ivf:
+        print("🧮 Re-entrenando particiones IVF...")
+        kb.rebuild_ann_index(args.nlist)
+
+    elapsed = time.perf_counter() - start
+
+    stats = kb.get_statistics()
+    sync = stats["index_sync"]
+    docs = stats["documents"]
+
+    print("\n" + "="*70)
+    print("📦 ÍNDICE VECTORIAL CONSTRUIDO")
+    print("="*70)
+    print(f"  • Modelo: {stats['embedding_model']}")
+    print(f"  • Backend: {stats['vector_db']}")
+    print(f"  • Ruta: {stats['index_path']}")
+    print(f"  • FAQs: {stats['total_faqs']}")
+    print(f"  • Reutilizadas: {sync['reused']}")
+    print(f"  • Indexadas: {sync['embedded']}")
+    print(f"  • Eliminadas: {sync['deleted']}")
+    print(f"  • Documentos: {docs['documents']} ({docs['chunks']} fragmentos, "
+          f"{docs['embedded']} indexados, {docs['deleted']} eliminados)")
+    print(f"  • Tiempo: {elapsed:.2f}s")
+    print("="*70 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 """
 Prompts del sistema para el agente bancario.
 """
+import hashlib
 
 SYSTEM_PROMPT = """Eres un asistente virtual bancario del Banco Nacional del Ecuador.
 
@@ -36,6 +37,12 @@ ESTADO: Usuario autenticado ✓
 Nombre: {user_name}
 """
 
+# Identifica la versión de los prompts: las respuestas cacheadas con otra
+# versión no se reutilizan
+PROMPT_VERSION = hashlib.sha256(
+    (SYSTEM_PROMPT + UNAUTHENTICATED_CONTEXT + AUTHENTICATED_CONTEXT).encode('utf-8')
+).hexdigest()[:12]
+
 def get_system_prompt(authenticated: bool = False, user_data: dict = None) -> str:
     if authenticated and user_data:
         context = AUTHENTICATED_CONTEXT.format(
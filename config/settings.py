@@ -10,10 +10,14 @@ try:
 except ImportError:
     pass
 
+# Backend del LLM: "gemini" o "fake" (modelo local con guion, sin red:
+# pruebas de carga y CI; ver src/llm_backends.py)
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'gemini')
+
 # API Keys - SIEMPRE con valor por defecto
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 
-if not GEMINI_API_KEY:
+if LLM_BACKEND == 'gemini' and not GEMINI_API_KEY:
     raise ValueError(
         "❌ GEMINI_API_KEY no está configurada.\n"
         "Configúrala como variable de entorno:\n"
@@ -25,6 +29,29 @@ if not GEMINI_API_KEY:
 MODEL_NAME = os.environ.get('MODEL_NAME', 'gemini-2.5-flash')
 MODEL_TEMPERATURE = float(os.environ.get('MODEL_TEMPERATURE', '0.7'))
 MODEL_MAX_TOKENS = int(os.environ.get('MODEL_MAX_TOKENS', '2048'))
+# Llamadas al LLM: máximo en vuelo por proceso, plazo total de cada
+# llamada y plazo para recibir el primer chunk de cada intento
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '16'))
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', '30'))
+LLM_FIRST_CHUNK_TIMEOUT_SECONDS = float(os.environ.get('LLM_FIRST_CHUNK_TIMEOUT_SECONDS', '10'))
+# Reintentos ante errores transitorios, con backoff exponencial con jitter
+LLM_RETRY_ATTEMPTS = int(os.environ.get('LLM_RETRY_ATTEMPTS', '2'))
+LLM_RETRY_BACKOFF_SECONDS = float(os.environ.get('LLM_RETRY_BACKOFF_SECONDS', '0.5'))
+# Hedging: si el primer chunk tarda más que el p95 observado, lanzar una
+# segunda request y quedarse con la primera que responda (duplica el costo
+# de las llamadas lentas; requiere LLM_HEDGE_MIN_SAMPLES llamadas previas)
+LLM_HEDGE_ENABLED = os.environ.get('LLM_HEDGE_ENABLED', 'false').lower() == 'true'
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get('LLM_HEDGE_MIN_SAMPLES', '20'))
+# Backend "fake": latencia del primer chunk (mediana en ms y dispersión
+# log-normal; 0 = constante), pausa entre chunks (ms), caracteres por
+# chunk, largo de las respuestas de texto y fracción de llamadas que
+# fallan con un error transitorio
+FAKE_LLM_LATENCY_MS = float(os.environ.get('FAKE_LLM_LATENCY_MS', '400'))
+FAKE_LLM_LATENCY_SIGMA = float(os.environ.get('FAKE_LLM_LATENCY_SIGMA', '0.5'))
+FAKE_LLM_CHUNK_MS = float(os.environ.get('FAKE_LLM_CHUNK_MS', '15'))
+FAKE_LLM_CHUNK_CHARS = int(os.environ.get('FAKE_LLM_CHUNK_CHARS', '12'))
+FAKE_LLM_RESPONSE_CHARS = int(os.environ.get('FAKE_LLM_RESPONSE_CHARS', '300'))
+FAKE_LLM_ERROR_RATE = float(os.environ.get('FAKE_LLM_ERROR_RATE', '0'))
 
 # Configuración de seguridad
 SESSION_TIMEOUT_MINUTES = int(os.environ.get('SESSION_TIMEOUT_MINUTES', '15'))
@@ -34,17 +61,99 @@ RATE_LIMIT_WINDOW_MINUTES = int(os.environ.get('RATE_LIMIT_WINDOW_MINUTES', '1')
 
 # Configuración de la aplicación
 MAX_CONVERSATION_HISTORY = int(os.environ.get('MAX_CONVERSATION_HISTORY', '50'))
+# Conversaciones de la API en memoria: máximo simultáneo, minutos sin
+# actividad antes de descartarlas y memoria total estimada (MB) que pueden
+# ocupar; al superar cualquiera se descartan las menos recientes
+MAX_ACTIVE_CONVERSATIONS = int(os.environ.get('MAX_ACTIVE_CONVERSATIONS', '10000'))
+CONVERSATION_IDLE_MINUTES = int(os.environ.get('CONVERSATION_IDLE_MINUTES', '30'))
+CONVERSATION_MEMORY_MB = int(os.environ.get('CONVERSATION_MEMORY_MB', '64'))
 ENABLE_LOGGING = os.environ.get('ENABLE_LOGGING', 'true').lower() == 'true'
 LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
 
 # Rutas de archivos
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
 FAQS_FILE = os.path.join(DATA_DIR, 'faqs.json')
+# Journal append-only con los cambios a faqs.json desde la última compactación
+FAQS_JOURNAL_FILE = os.environ.get('FAQS_JOURNAL_FILE', os.path.join(DATA_DIR, 'faqs.journal.jsonl'))
+FAQ_JOURNAL_COMPACT_THRESHOLD = int(os.environ.get('FAQ_JOURNAL_COMPACT_THRESHOLD', '1000'))
+# Cada cuántos segundos revisar si faqs.json cambió para recargarlo en
+# caliente (0 = deshabilitado; requiere VECTOR_BACKEND numpy o ivf, o RAG
+# deshabilitado: chroma comparte la colección entre instancias)
+FAQ_RELOAD_INTERVAL_SECONDS = float(os.environ.get('FAQ_RELOAD_INTERVAL_SECONDS', '5'))
+# Documentos markdown de producto que se indexan por fragmentos junto a las
+# FAQs y pueden citarse en las respuestas a clientes ('' = deshabilitado).
+# Por defecto data/docs (vacío si no existe); docs/ tiene los informes
+# internos del proyecto y solo se indexa si se pide explícitamente
+DOCS_DIR = os.environ.get('DOCS_DIR', os.path.join(DATA_DIR, 'docs'))
+# Tamaño máximo de un fragmento y solapamiento entre fragmentos (caracteres)
+DOC_CHUNK_SIZE = int(os.environ.get('DOC_CHUNK_SIZE', '800'))
+DOC_CHUNK_OVERLAP = int(os.environ.get('DOC_CHUNK_OVERLAP', '150'))
 
 # Configuración de RAG
+# Backend de embeddings: "sentence-transformers" (EMBEDDING_MODEL) o
+# "hashing" (n-gramas de caracteres, sin descargar modelo; para instancias chicas)
+EMBEDDING_BACKEND = os.environ.get('EMBEDDING_BACKEND', 'sentence-transformers')
 EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', 'paraphrase-multilingual-mpnet-base-v2')
+# Dimensiones del backend "hashing"
+HASHING_DIMENSIONS = int(os.environ.get('HASHING_DIMENSIONS', '1024'))
 TOP_K_RESULTS = int(os.environ.get('TOP_K_RESULTS', '3'))
-SIMILARITY_THRESHOLD = float(os.environ.get('SIMILARITY_THRESHOLD', '0.5'))
+# Modo de búsqueda por defecto: "semantic", "lexical" (BM25) o "hybrid"
+# (ambas fusionadas con Reciprocal Rank Fusion). Se puede elegir por llamada.
+SEARCH_MODE = os.environ.get('SEARCH_MODE', 'semantic')
+# Candidatos que aporta cada fuente a la fusión híbrida y constante k de RRF
+HYBRID_CANDIDATES = int(os.environ.get('HYBRID_CANDIDATES', '20'))
+RRF_K = int(os.environ.get('RRF_K', '60'))
+# Score mínimo para inyectar una FAQ en el prompt: similitud coseno
+# (búsqueda semántica) y score BM25 (búsqueda léxica)
+MIN_SEMANTIC_SCORE = float(os.environ.get('MIN_SEMANTIC_SCORE', '0.35'))
+# Con el backend "hashing" las similitudes son más bajas (solo solapamiento
+# de n-gramas), así que el umbral semántico es otro
+MIN_HASHING_SCORE = float(os.environ.get('MIN_HASHING_SCORE', '0.1'))
+MIN_LEXICAL_SCORE = float(os.environ.get('MIN_LEXICAL_SCORE', '1.0'))
+# Presupuesto de caracteres del contexto de FAQs en el prompt (~4 por token)
+KNOWLEDGE_CONTEXT_MAX_CHARS = int(os.environ.get('KNOWLEDGE_CONTEXT_MAX_CHARS', '1500'))
+# Respuesta extractiva sin llamar al LLM: si la pregunta coincide con la de
+# una FAQ, o si la mejor FAQ supera FAST_PATH_MIN_SCORE (similitud coseno) con
+# al menos FAST_PATH_MIN_MARGIN de ventaja sobre la siguiente más similar de
+# toda la base (búsqueda solo semántica, sin categorías ni fusión híbrida)
+FAST_PATH_ENABLED = os.environ.get('FAST_PATH_ENABLED', 'true').lower() == 'true'
+FAST_PATH_MIN_SCORE = float(os.environ.get('FAST_PATH_MIN_SCORE', '0.85'))
+FAST_PATH_MIN_MARGIN = float(os.environ.get('FAST_PATH_MIN_MARGIN', '0.1'))
+EMBEDDING_BATCH_SIZE = int(os.environ.get('EMBEDDING_BATCH_SIZE', '64'))
+# Caché LRU de embeddings de queries normalizadas (0 = deshabilitada)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get('QUERY_EMBEDDING_CACHE_SIZE', '2048'))
+# Micro-batching de embeddings de queries concurrentes: tamaño máximo de
+# lote y espera máxima para completarlo (QUERY_BATCH_MAX_SIZE=0 lo deshabilita)
+QUERY_BATCH_MAX_SIZE = int(os.environ.get('QUERY_BATCH_MAX_SIZE', '32'))
+QUERY_BATCH_MAX_WAIT_MS = float(os.environ.get('QUERY_BATCH_MAX_WAIT_MS', '2'))
+# Directorio del índice vectorial persistente (un subdirectorio por modelo)
+VECTOR_STORE_DIR = os.environ.get('VECTOR_STORE_DIR', os.path.join(DATA_DIR, 'vector_store'))
+# Backend de búsqueda vectorial: "chroma", "numpy" (matriz en proceso)
+# o "ivf" (aproximado, para bases de conocimiento muy grandes). Si chromadb
+# no está instalado, "chroma" cae a "numpy"
+VECTOR_BACKEND = os.environ.get('VECTOR_BACKEND', 'chroma')
+# Con el backend numpy, cargar embeddings.npy memory-mapped
+VECTOR_STORE_MMAP = os.environ.get('VECTOR_STORE_MMAP', 'true').lower() == 'true'
+# Almacenamiento del backend numpy: "float32", "float16" o "int8"
+VECTOR_STORE_DTYPE = os.environ.get('VECTOR_STORE_DTYPE', 'float32')
+# Re-puntuar en float32 los top_k * factor candidatos de un índice cuantizado
+VECTOR_RESCORE = os.environ.get('VECTOR_RESCORE', 'false').lower() == 'true'
+VECTOR_RESCORE_FACTOR = int(os.environ.get('VECTOR_RESCORE_FACTOR', '4'))
+# Índice IVF: particiones (0 = ~4·√n), particiones recorridas por query
+# (más = mejor recall, más latencia) y tamaño mínimo para entrenar
+IVF_NLIST = int(os.environ.get('IVF_NLIST', '0'))
+IVF_NPROBE = int(os.environ.get('IVF_NPROBE', '8'))
+IVF_MIN_TRAIN_SIZE = int(os.environ.get('IVF_MIN_TRAIN_SIZE', '1000'))
+
+# Caché semántica de respuestas (consultas generales sin autenticar):
+# similitud coseno mínima para reutilizar una respuesta, tamaño
+# máximo (0 = deshabilitada) y vigencia de cada entrada
+SIMILARITY_THRESHOLD = float(os.environ.get('SIMILARITY_THRESHOLD', '0.92'))
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', '1000'))
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', '3600'))
+# Coalescer consultas generales idénticas y simultáneas (sin autenticar):
+# una sola recuperación y llamada al LLM, cuya respuesta reciben todas
+SINGLE_FLIGHT_ENABLED = os.environ.get('SINGLE_FLIGHT_ENABLED', 'true').lower() == 'true'
 
 # Mensajes del sistema
 WELCOME_MESSAGE = """¡Hola! 👋 Soy tu asistente virtual bancario.
@@ -84,7 +193,7 @@ def validate_config():
     """Valida que la configuración esté correcta"""
     errors = []
     
-    if not GEMINI_API_KEY or GEMINI_API_KEY == 'tu_api_key_aqui':
+    if LLM_BACKEND == 'gemini' and (not GEMINI_API_KEY or GEMINI_API_KEY == 'tu_api_key_aqui'):
         errors.append("GEMINI_API_KEY no está configurada correctamente")
     
     if SESSION_TIMEOUT_MINUTES < 1:
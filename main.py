@@ -8,7 +8,7 @@ Caso de Evaluación: AI Engineer
 
 import sys
 import os
-from config.settings import GEMINI_API_KEY, WELCOME_MESSAGE, GOODBYE_MESSAGE
+from config.settings import GEMINI_API_KEY, LLM_BACKEND, WELCOME_MESSAGE, GOODBYE_MESSAGE
 from src.agent import BankingAgent
 
 def print_banner():
@@ -57,7 +57,7 @@ def main():
     """Función principal - Modo interactivo"""
     
     # Verificar API key
-    if not GEMINI_API_KEY:
+    if LLM_BACKEND == "gemini" and not GEMINI_API_KEY:
         print("❌ Error: No se encontró GEMINI_API_KEY")
         print("Por favor configura la variable de entorno o modifica config/settings.py")
         sys.exit(1)
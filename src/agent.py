@@ -1,52 +1,258 @@
 """
 Agente conversacional bancario principal.
 """
+import asyncio
 import json
-import google.generativeai as genai
+import random
+import threading
+from contextlib import aclosing
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-from config.settings import GEMINI_API_KEY, MODEL_NAME, MODEL_TEMPERATURE
-from config.prompts import get_system_prompt
+from config.settings import (
+    GEMINI_API_KEY,
+    MODEL_NAME,
+    LLM_BACKEND,
+    KNOWLEDGE_CONTEXT_MAX_CHARS,
+    FAST_PATH_ENABLED,
+    FAST_PATH_MIN_SCORE,
+    FAST_PATH_MIN_MARGIN,
+    LLM_TIMEOUT_SECONDS,
+    SINGLE_FLIGHT_ENABLED,
+    TOOL_TIMEOUT_SECONDS,
+    TOOL_RETRY_ATTEMPTS
+)
+from config.prompts import get_system_prompt, PROMPT_VERSION
+from src.cache import get_response_cache
+from src.conversation import ConversationState
 from src.tools import BankingTools
-from src.knowledge import KnowledgeBase, search_knowledge_base
-from src.security import SecurityManager
+from src.knowledge import get_knowledge_base, search_knowledge_base
+from src.llm_backends import create_llm_backend
+from src.llm_client import LLMClient
+from src.security import SecurityManager, StreamSanitizer
+from src.single_flight import Flight, SingleFlight
+from src.stream_parser import JSON, ToolCallStreamParser
+from src.normalization import fold_accents, normalize_query
+from src.retrieval import SearchResult, format_results
 
-class BankingAgent:
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _run_sync(coroutine):
     """
-    Agente conversacional bancario basado en Gemini.
+    Ejecuta una corrutina desde código sync y espera su resultado.
+    
+    Todas las llamadas comparten un event loop en un hilo de fondo: el
+    cliente async de Gemini queda ligado al loop donde se creó, así que
+    no sirve abrir uno nuevo por mensaje (asyncio.run). Funciona también
+    si el llamador ya corre dentro de otro event loop.
     """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="agent-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coroutine, _loop).result()
+
+class AgentEngine:
+    """
+    Motor del agente conversacional bancario basado en Gemini.
     
-    def __init__(self, api_key: str = GEMINI_API_KEY):
-        # Configurar Gemini
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(
-            MODEL_NAME,
-            generation_config={
-                "temperature": MODEL_TEMPERATURE,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 2048,
-            }
-        )
+    Es compartido y sin estado por usuario: tiene el modelo, las
+    herramientas, la base de conocimiento y la seguridad, y cada método
+    recibe el ConversationState de la conversación que atiende. Un proceso
+    sirve así muchas conversaciones sin construir un agente para cada una.
+    """
+    
+    # Términos (sin tildes) que delatan la intención del usuario y las
+    # categorías de FAQs donde buscar cuando aparecen
+    INTENT_CATEGORIES = {
+        "tarjeta": ["tarjetas", "emergencias"],
+        "pin": ["tarjetas"],
+        "seguro": ["seguros"],
+        "poliza": ["seguros"],
+        "cuenta": ["cuentas", "tasas", "consultas"],
+        "ahorro": ["cuentas", "tasas"],
+        "saldo": ["consultas"],
+        "prestamo": ["prestamos"],
+        "invers": ["inversiones"],
+        "invertir": ["inversiones"],
+        "transfer": ["transferencias"],
+        "horario": ["horarios"],
+        "reclamo": ["reclamos"],
+        "queja": ["reclamos"],
+    }
+    
+    TECHNICAL_ERROR_MESSAGE = "Disculpa, tuve un problema técnico. ¿Puedes reformular tu pregunta? 😊"
+    
+    def __init__(self, api_key: str = GEMINI_API_KEY, backend: str = LLM_BACKEND,
+                 model=None):
+        # Modelo del backend configurado (o el recibido, p. ej. en tests), con
+        # concurrencia, plazos, reintentos y hedging de las llamadas
+        self.llm = LLMClient(model or create_llm_backend(backend, api_key=api_key))
         
         # Inicializar componentes
         self.tools = BankingTools()
-        self.knowledge = KnowledgeBase()
+        get_knowledge_base()
         self.security = SecurityManager()
-        
-        # Estado de la conversación
-        self.conversation_history = []
-        self.session_token = None
-        self.session_data = None
-        self.current_user_id = None
+        self.response_cache = get_response_cache()
+        # Consultas generales idénticas y simultáneas comparten una respuesta
+        self.single_flight = SingleFlight()
+        # Turnos respondidos directo desde una FAQ (por motivo) y con el LLM
+        self.fast_path_stats = {"exact": 0, "confident": 0, "llm": 0}
         
         print("✅ Agente bancario inicializado correctamente")
     
-    def process_message(self, user_message: str) -> str:
+    @property
+    def knowledge(self):
+        """Base de conocimiento compartida vigente (cambia tras una recarga en caliente)"""
+        return get_knowledge_base()
+    
+    @property
+    def model(self):
+        return self.llm.model
+    
+    @model.setter
+    def model(self, model):
+        self.llm.model = model
+    
+    def process_message(self, state: ConversationState, user_message: str) -> str:
         """
         Procesa un mensaje del usuario y genera una respuesta.
+        
+        Envoltorio sync de aprocess_message (consola, voz, tests).
+        """
+        return _run_sync(self.aprocess_message(state, user_message))
+    
+    async def aprocess_message(self, state: ConversationState, user_message: str) -> str:
         """
+        Versión async de process_message.
+        
+        Las esperas de E/S (Gemini, herramientas) no bloquean el event loop
+        y la recuperación corre en el pool de hilos, así un único worker
+        atiende muchas conversaciones concurrentes.
+        """
+        chunks = [chunk async for chunk in self.astream_message(state, user_message)]
+        return "".join(chunks)
+    
+    async def astream_message(self, state: ConversationState, user_message: str) -> AsyncIterator[str]:
+        """
+        Versión en streaming de aprocess_message: produce la respuesta en
+        chunks de texto ya sanitizados a medida que Gemini la genera.
+        
+        Las respuestas sin LLM (fast path, caché, errores de validación)
+        salen en un solo chunk. Si la salida abre un objeto JSON es una
+        llamada a herramienta: no se reenvía, y la herramienta se ejecuta
+        apenas el objeto cierra, sin esperar el resto de la generación.
+        
+        Los turnos de una misma conversación se atienden de a uno.
+        """
+        async with state.lock:
+            async for chunk in self._stream_turn(state, user_message):
+                yield chunk
+    
+    async def _stream_turn(self, state: ConversationState, user_message: str) -> AsyncIterator[str]:
+        answer = self._check_turn(state, user_message)
+        if answer is not None:
+            yield answer
+            return
+        
+        flight_key = self._single_flight_key(state, user_message)
+        if flight_key is None:
+            async for chunk in self._generate_turn(state, user_message):
+                yield chunk
+            return
+        
+        # Consultas idénticas en vuelo: una sola recuperación y llamada al LLM
+        flight, leader = self.single_flight.join(flight_key)
+        if leader:
+            try:
+                async for chunk in self._generate_turn(state, user_message, flight):
+                    flight.publish(chunk)
+                    yield chunk
+                flight.finish()
+            finally:
+                self.single_flight.land(flight)
+            return
+        
+        async for chunk in self._follow_flight(state, user_message, flight):
+            yield chunk
+    
+    async def _follow_flight(self, state: ConversationState, user_message: str,
+                             flight: Flight) -> AsyncIterator[str]:
+        """Turno resuelto con la respuesta de otra conversación con la misma consulta"""
+        followed = []
+        try:
+            async for chunk in flight.follow(LLM_TIMEOUT_SECONDS):
+                followed.append(chunk)
+                yield chunk
+        except asyncio.TimeoutError:
+            pass
+        
+        if flight.done and flight.shared:
+            state.add_message("user", user_message)
+            if not flight.failed:
+                state.add_message("assistant", flight.text)
+            return
+        if followed:
+            # El líder abandonó el turno a mitad de la respuesta
+            self._log_error("Consulta coalescida sin terminar", state)
+            yield self.TECHNICAL_ERROR_MESSAGE
+            return
+        
+        # La respuesta del líder no sirve a esta conversación: generar la propia
+        self.single_flight.fallbacks += 1
+        async for chunk in self._generate_turn(state, user_message):
+            yield chunk
+    
+    async def _generate_turn(self, state: ConversationState, user_message: str,
+                             flight: Optional[Flight] = None) -> AsyncIterator[str]:
+        answer, full_prompt, cache_context = await self._prepare_turn(state, user_message)
+        if answer is not None:
+            yield answer
+            return
+        
+        parser = ToolCallStreamParser()
+        sanitizer = StreamSanitizer(self.security, state.authenticated)
+        try:
+            # 8. Generar respuesta con Gemini, chunk a chunk
+            self.fast_path_stats["llm"] += 1
+            async with aclosing(self.llm.stream(full_prompt)) as chunks:
+                async for text in chunks:
+                    piece = sanitizer.feed(parser.feed(text))
+                    if piece:
+                        yield piece
+                    if parser.complete:
+                        break
+            
+            if parser.mode == JSON:
+                # 9. Ejecutar la herramienta (o corregir el JSON fuera de lugar);
+                # el resultado depende de la sesión: no se comparte
+                if flight is not None:
+                    flight.finish(shared=False)
+                response_text = await self._resolve_json_response(state, user_message, parser.tool_call)
+                response_text = self.security.sanitize_output(response_text, state.authenticated)
+                cache_context = None
+                yield response_text
+            else:
+                # 10. Emitir lo retenido por la sanitización
+                piece = sanitizer.feed(parser.flush()) + sanitizer.flush()
+                if piece:
+                    yield piece
+                response_text = sanitizer.text
+            
+            # 11. Cachear y agregar respuesta al historial
+            self._finish_turn(state, user_message, response_text, cache_context)
+            
+        except Exception as e:
+            self._log_error(str(e), state)
+            if flight is not None:
+                flight.failed = True
+            yield self.TECHNICAL_ERROR_MESSAGE
+    
+    def _check_turn(self, state: ConversationState, user_message: str) -> Optional[str]:
+        """Validación, rate limiting y FAQ exacta: la respuesta, o None si hay que generarla"""
         
         # 1. Validar input
         validation = self.security.validate_input(user_message)
@@ -54,69 +260,137 @@ class BankingAgent:
             return f"⚠️  {validation['reason']}. Por favor, reformula tu mensaje."
         
         # 2. Rate limiting
-        if self.current_user_id:
-            rate_check = self.security.check_rate_limit(self.current_user_id)
+        if state.current_user_id:
+            rate_check = self.security.check_rate_limit(state.current_user_id)
             if not rate_check["allowed"]:
                 reset_time = rate_check["reset_time"].strftime("%H:%M")
                 return f"⚠️  Has alcanzado el límite de solicitudes. Por favor intenta de nuevo a las {reset_time}."
         
-        # 3. Buscar contexto relevante en la base de conocimiento
+        # 3. Pregunta idéntica a la de una FAQ: responder con ella (fast path)
+        if FAST_PATH_ENABLED:
+            exact_faq = self.knowledge.find_faq_by_question(user_message)
+            if exact_faq is not None:
+                return self._answer_from_faq(state, user_message, exact_faq, "exact")
+        
+        return None
+    
+    async def _prepare_turn(self, state: ConversationState, user_message: str) -> Tuple[Optional[str], Optional[str], Optional[Dict]]:
+        """
+        Pasos previos a llamar al LLM.
+        
+        Devuelve (respuesta, None, None) si el turno se resuelve sin LLM, o
+        (None, prompt completo, contexto de caché) si hay que generar.
+        """
+        
+        # 4. Reutilizar la respuesta a una consulta general equivalente
+        cache_context = await asyncio.to_thread(self._response_cache_context, state, user_message)
+        if cache_context:
+            cached_response = self.response_cache.get(user_message, **cache_context)
+            if cached_response is not None:
+                state.add_message("user", user_message)
+                state.add_message("assistant", cached_response)
+                return cached_response, None, None
+        
+        # 5. Buscar contexto relevante en la base de conocimiento; si la
+        # mejor FAQ es inequívoca se responde con ella, sin llamar al LLM
         knowledge_context = ""
         if self._is_general_query(user_message):
-            kb_results = search_knowledge_base(user_message)
+            kb_results = await asyncio.to_thread(self._search_knowledge, user_message)
             if kb_results.get("success"):
-                knowledge_context = f"\n[INFORMACIÓN RELEVANTE]:\n{kb_results['results']}\n"
-        
-        # 4. Construir prompt completo
-        system_prompt = self._build_system_prompt(knowledge_context)
+                confident_faq = None
+                if FAST_PATH_ENABLED:
+                    confident_faq = await asyncio.to_thread(self._fast_path_faq, user_message)
+                if confident_faq is not None:
+                    return self._answer_from_faq(state, user_message, confident_faq, "confident"), None, None
+                context = format_results(kb_results["results"], KNOWLEDGE_CONTEXT_MAX_CHARS)
+                knowledge_context = f"\n[INFORMACIÓN RELEVANTE]:\n{context}\n"
+        
+        # 6. Construir prompt completo
+        system_prompt = self._build_system_prompt(state, knowledge_context)
         system_prompt += "\n\nIMPORTANTE: Responde en texto natural conversacional. NO uses JSON excepto para herramientas bancarias específicas."
+        full_prompt = self._build_full_prompt(state, system_prompt, user_message)
         
-        # 5. Agregar mensaje al historial
-        self._add_to_history("user", user_message)
+        # 7. Agregar mensaje al historial
+        state.add_message("user", user_message)
         
-        try:
-            # 6. Generar respuesta con Gemini
-            full_prompt = self._build_full_prompt(system_prompt, user_message)
-            response = self.model.generate_content(full_prompt)
-            response_text = response.text.strip()
-            
-            # 7. Detectar si es una llamada a herramienta
-            if self._is_tool_call(response_text):
-                response_text = self._handle_tool_call(response_text)
-            else:
-                # Si viene JSON cuando no debería, responder apropiadamente
-                if response_text.startswith('{'):
-                    msg_lower = user_message.lower()
-                    if "hola" in msg_lower or "buenos" in msg_lower or "hi" in msg_lower:
-                        response_text = "¡Hola! 👋 ¿En qué puedo ayudarte hoy?"
-                    elif "horario" in msg_lower:
-                        response_text = "Nuestros horarios son: Lunes a Viernes de 8 AM a 5 PM, Sábados de 9 AM a 1 PM. 🏦"
-                    else:
-                        response_text = "¿En qué puedo ayudarte? Puedo responder sobre productos bancarios o tus cuentas. 😊"
-            
-            # 8. Sanitizar output
-            is_authenticated = self.session_data is not None
-            response_text = self.security.sanitize_output(response_text, is_authenticated)
-            
-            # 9. Agregar respuesta al historial
-            self._add_to_history("assistant", response_text)
-            
-            return response_text
-            
-        except Exception as e:
-            self._log_error(str(e))
-            return "Disculpa, tuve un problema técnico. ¿Puedes reformular tu pregunta? 😊"
+        return None, full_prompt, cache_context
+    
+    async def _resolve_json_response(self, state: ConversationState, user_message: str,
+                                     tool_call: Optional[Dict]) -> str:
+        """Resultado de la herramienta pedida, o una respuesta si el JSON no era una"""
+        if tool_call is not None:
+            return await self._handle_tool_call(state, tool_call)
+        
+        # Si viene JSON cuando no debería, responder apropiadamente
+        msg_lower = user_message.lower()
+        if "hola" in msg_lower or "buenos" in msg_lower or "hi" in msg_lower:
+            return "¡Hola! 👋 ¿En qué puedo ayudarte hoy?"
+        elif "horario" in msg_lower:
+            return "Nuestros horarios son: Lunes a Viernes de 8 AM a 5 PM, Sábados de 9 AM a 1 PM. 🏦"
+        else:
+            return "¿En qué puedo ayudarte? Puedo responder sobre productos bancarios o tus cuentas. 😊"
+    
+    def _finish_turn(self, state: ConversationState, user_message: str, response_text: str,
+                     cache_context: Optional[Dict]):
+        """Guarda la respuesta (ya sanitizada) en la caché y el historial"""
+        if cache_context:
+            self.response_cache.put(user_message, response_text, **cache_context)
+        state.add_message("assistant", response_text)
+    
+    def _confident_faq(self, results: List[SearchResult]) -> Optional[SearchResult]:
+        """
+        FAQ que se puede devolver tal cual: la de mayor similitud semántica,
+        si alcanza FAST_PATH_MIN_SCORE y supera a la siguiente por
+        FAST_PATH_MIN_MARGIN. Los fragmentos de documentos no califican.
+        """
+        ranked = sorted(
+            (r for r in results if "semantic" in r.scores),
+            key=lambda r: r.scores["semantic"], reverse=True
+        )
+        if not ranked or ranked[0].source is not None:
+            return None
+        
+        best = ranked[0].scores["semantic"]
+        runner_up = ranked[1].scores["semantic"] if len(ranked) > 1 else 0.0
+        if best < FAST_PATH_MIN_SCORE or best - runner_up < FAST_PATH_MIN_MARGIN:
+            return None
+        return ranked[0]
     
-    def _build_system_prompt(self, knowledge_context: str = "") -> str:
+    def _fast_path_faq(self, query: str) -> Optional[SearchResult]:
+        """
+        _confident_faq sobre las 2 más similares de toda la base, con una
+        búsqueda solo semántica. Los resultados de _search_knowledge no
+        sirven: pueden estar acotados a categorías y, en modo híbrido, la
+        fusión RRF puede dejar fuera del top-k a la segunda más similar.
+        """
+        if not self.knowledge.use_embeddings:
+            return None
+        return self._confident_faq(
+            self.knowledge.retrieve(query, top_k=2, mode="semantic", prune=False)
+        )
+    
+    def _answer_from_faq(self, state: ConversationState, user_message: str,
+                         faq: SearchResult, reason: str) -> str:
+        """Responde con la respuesta de una FAQ (fast path, sin LLM)"""
+        response_text = self.security.sanitize_output(faq.answer, state.authenticated)
+        
+        state.add_message("user", user_message)
+        state.add_message("assistant", response_text)
+        
+        self.fast_path_stats[reason] += 1
+        self._log_fast_path(state, faq, reason)
+        return response_text
+    
+    def _build_system_prompt(self, state: ConversationState, knowledge_context: str = "") -> str:
         """Construye el system prompt con contexto actual"""
-        authenticated = self.session_data is not None
+        authenticated = state.authenticated
         
         user_data = None
-        if authenticated and self.session_data:
+        if authenticated and state.session_data:
             user_data = {
-                "name": self.session_data.get("user_name", "Usuario"),
-                "user_id": self.session_data.get("user_id"),
-                "session_expiry": self.session_data.get("expires_at")
+                "name": state.session_data.get("user_name", "Usuario"),
+                "user_id": state.session_data.get("user_id"),
+                "session_expiry": state.session_data.get("expires_at")
             }
         
         base_prompt = get_system_prompt(authenticated, user_data)
@@ -126,12 +400,12 @@ class BankingAgent:
         
         return base_prompt
     
-    def _build_full_prompt(self, system_prompt: str, user_message: str) -> str:
+    def _build_full_prompt(self, state: ConversationState, system_prompt: str, user_message: str) -> str:
         """Construye el prompt completo con historial"""
         prompt_parts = [system_prompt]
         
         # Agregar últimos N mensajes del historial para contexto
-        recent_history = self.conversation_history[-6:]  # Últimos 3 intercambios
+        recent_history = state.history[-6:]  # Últimos 3 intercambios
         if recent_history:
             prompt_parts.append("\n[HISTORIAL RECIENTE DE LA CONVERSACIÓN]:")
             for msg in recent_history:
@@ -144,6 +418,75 @@ class BankingAgent:
         
         return "\n".join(prompt_parts)
     
+    def _response_cache_context(self, state: ConversationState, message: str) -> Optional[Dict]:
+        """
+        Parámetros de la caché de respuestas para el mensaje, o None si
+        no se debe cachear (usuario autenticado, consulta no general o
+        conversación con historial).
+        
+        Las respuestas solo se comparten entre consultas con la misma
+        versión de prompt, modelo y estado de autenticación, y se
+        invalidan cuando cambia el contenido de la base de conocimiento.
+        El prompt incluye el historial reciente (_build_full_prompt), así
+        que solo la respuesta a un primer mensaje es igual para todos.
+        """
+        authenticated = state.authenticated
+        if authenticated or state.history or not self._is_general_query(message):
+            return None
+        
+        embedding = None
+        if self.knowledge.use_embeddings:
+            # Queda en la caché de embeddings para la búsqueda posterior
+            embedding = self.knowledge.embed_query(message)
+        
+        return {
+            "embedding": embedding,
+            "namespace": (PROMPT_VERSION, getattr(self.model, "name", MODEL_NAME), authenticated),
+            "content_version": self.knowledge.content_version
+        }
+    
+    def _single_flight_key(self, state: ConversationState, message: str) -> Optional[Tuple]:
+        """
+        Clave para coalescer el turno con consultas idénticas en vuelo, o
+        None si no se comparte. Aplica a las mismas consultas que la caché
+        de respuestas (generales, sin autenticar y sin historial), cuya
+        respuesta no depende de la conversación.
+        """
+        if (not SINGLE_FLIGHT_ENABLED or state.authenticated or state.history
+                or not self._is_general_query(message)):
+            return None
+        return (PROMPT_VERSION, getattr(self.model, "name", MODEL_NAME),
+                state.authenticated, normalize_query(message))
+    
+    def _detect_categories(self, message: str) -> Optional[List[str]]:
+        """
+        Categorías de FAQs a las que apunta el mensaje, o None si la
+        intención no es clara (se busca en toda la base).
+        """
+        words = fold_accents(message.lower()).split()
+        categories = {
+            category
+            for term, term_categories in self.INTENT_CATEGORIES.items()
+            if any(word.strip("¿?¡!.,;:").startswith(term) for word in words)
+            for category in term_categories
+        }
+        known = categories.intersection(self.knowledge.get_all_categories())
+        return sorted(known) or None
+    
+    def _search_knowledge(self, query: str) -> Dict:
+        """
+        Busca en la base de conocimiento acotando a las categorías de la
+        intención detectada; si ahí no hay resultados, busca en toda la base.
+        Si la búsqueda se acotó, el resultado lleva esas "categories".
+        """
+        categories = self._detect_categories(query)
+        if categories:
+            result = search_knowledge_base(query, self.knowledge, categories=categories)
+            if result.get("success"):
+                result["categories"] = categories
+                return result
+        return search_knowledge_base(query, self.knowledge)
+    
     def _is_general_query(self, message: str) -> bool:
         """Detecta si es una consulta general que requiere buscar en FAQs"""
         general_keywords = [
@@ -154,47 +497,9 @@ class BankingAgent:
         message_lower = message.lower()
         return any(keyword in message_lower for keyword in general_keywords)
     
-    def _is_tool_call(self, response: str) -> bool:
-        """Detecta si la respuesta del LLM es una llamada a herramienta"""
-        try:
-            response = response.strip()
-            
-            if '{' not in response or '}' not in response:
-                return False
-            
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            
-            if json_start == -1 or json_end <= json_start:
-                return False
-            
-            json_str = response[json_start:json_end]
-            data = json.loads(json_str)
-            
-            return (
-                data.get("action") == "call_tool" and 
-                "tool_name" in data and
-                data.get("tool_name") in [
-                    "authenticate_user",
-                    "get_account_balance", 
-                    "get_account_movements",
-                    "get_card_info",
-                    "get_policy_info",
-                    "search_knowledge_base"
-                ]
-            )
-        except:
-            return False
-    
-    def _handle_tool_call(self, response: str) -> str:
-        """Procesa llamadas a herramientas"""
+    async def _handle_tool_call(self, state: ConversationState, tool_request: Dict) -> str:
+        """Procesa llamadas a herramientas (ya validadas por ToolCallStreamParser)"""
         try:
-            # Extraer JSON
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            json_str = response[json_start:json_end]
-            tool_request = json.loads(json_str)
-            
             tool_name = tool_request["tool_name"]
             parameters = tool_request.get("parameters", {})
             user_message = tool_request.get("user_message", "Un momento por favor...")
@@ -207,36 +512,64 @@ class BankingAgent:
                 "get_policy_info"
             ]
             
-            if tool_name in protected_tools and not self.session_data:
+            if tool_name in protected_tools and not state.session_data:
                 return "Por tu seguridad, necesito verificar tu identidad primero. ¿Tienes a mano tu cédula? 🔐"
             
             # Ejecutar herramienta correspondiente
             if tool_name == "authenticate_user":
-                return self._execute_authenticate(parameters)
+                return await self._execute_authenticate(state, parameters)
             
             elif tool_name == "get_account_balance":
-                return self._execute_get_balance(parameters)
+                return await self._execute_get_balance(state, parameters)
             
             elif tool_name == "get_account_movements":
-                return self._execute_get_movements(parameters)
+                return await self._execute_get_movements(state, parameters)
             
             elif tool_name == "get_card_info":
-                return self._execute_get_cards(parameters)
+                return await self._execute_get_cards(state, parameters)
             
             elif tool_name == "get_policy_info":
-                return self._execute_get_policies(parameters)
+                return await self._execute_get_policies(state, parameters)
             
             elif tool_name == "search_knowledge_base":
-                return self._execute_search_kb(parameters)
+                return await asyncio.to_thread(self._execute_search_kb, parameters)
             
             else:
                 return "Disculpa, esa operación no está disponible en este momento."
                 
         except Exception as e:
-            self._log_error(f"Tool error: {str(e)}")
+            self._log_error(f"Tool error: {str(e)}", state)
             return "Tuve un problema al procesar tu solicitud. ¿Puedo ayudarte con algo más? 😊"
     
-    def _execute_authenticate(self, parameters: Dict) -> str:
+    async def _call_tool(self, tool, *args) -> Dict:
+        """
+        Ejecuta una herramienta con plazo (TOOL_TIMEOUT_SECONDS); si vence
+        o el servicio no está disponible, reintenta hasta
+        TOOL_RETRY_ATTEMPTS veces con backoff con jitter. Las herramientas
+        sync corren en el pool de hilos.
+        """
+        for attempt in range(TOOL_RETRY_ATTEMPTS + 1):
+            if asyncio.iscoroutinefunction(tool):
+                call = tool(*args)
+            else:
+                call = asyncio.to_thread(tool, *args)
+            try:
+                result = await asyncio.wait_for(call, TOOL_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                result = {
+                    "success": False,
+                    "error": "TIMEOUT",
+                    "message": f"La herramienta no respondió en {TOOL_TIMEOUT_SECONDS} s"
+                }
+            if result.get("error") not in ("SERVICE_UNAVAILABLE", "TIMEOUT"):
+                return result
+            if attempt < TOOL_RETRY_ATTEMPTS:
+                await asyncio.sleep(random.uniform(0, 0.2 * 2 ** attempt))
+        
+        self._log_error(f"Tool {getattr(tool, '__name__', tool)}: {result['error']}")
+        return result
+    
+    async def _execute_authenticate(self, state: ConversationState, parameters: Dict) -> str:
         """Ejecuta autenticación del usuario"""
         document_id = parameters.get("document_id")
         otp_code = parameters.get("otp_code")
@@ -244,17 +577,17 @@ class BankingAgent:
         if not document_id:
             return "Necesito tu número de cédula para autenticarte. ¿Puedes proporcionarla?"
         
-        result = self.tools.authenticate_user(document_id, otp_code)
+        result = await self._call_tool(self.tools.aauthenticate_user, document_id, otp_code)
         
         if result["success"]:
             # Crear sesión
-            self.session_token = self.security.create_session(
+            state.session_token = self.security.create_session(
                 result["user_id"],
                 result
             )
-            is_valid, session = self.security.validate_session(self.session_token)
-            self.session_data = session
-            self.current_user_id = result["user_id"]
+            is_valid, session = self.security.validate_session(state.session_token)
+            state.session_data = session
+            state.current_user_id = result["user_id"]
             
             return f"✅ ¡Perfecto! Autenticación exitosa. Hola {result['user_name']} 👋\n\n¿En qué puedo ayudarte hoy?"
         
@@ -264,20 +597,20 @@ class BankingAgent:
                 return "No encontré un usuario registrado con esa cédula. ¿Puedes verificar el número?"
             elif error == "INVALID_OTP":
                 return "El código de verificación no es correcto. ¿Quieres que te envíe uno nuevo?"
-            elif error == "SERVICE_UNAVAILABLE":
+            elif error in ("SERVICE_UNAVAILABLE", "TIMEOUT"):
                 return "Estoy teniendo problemas técnicos. ¿Puedes intentar en unos minutos? 🙏"
             else:
                 return "No pude completar la autenticación. ¿Quieres intentar de nuevo?"
     
-    def _execute_get_balance(self, parameters: Dict) -> str:
+    async def _execute_get_balance(self, state: ConversationState, parameters: Dict) -> str:
         """Ejecuta consulta de saldo"""
-        if not self.session_data:
+        if not state.session_data:
             return "Por seguridad, necesito que te autentiques primero."
         
-        user_id = self.session_data["user_id"]
+        user_id = state.session_data["user_id"]
         account_type = parameters.get("account_type")
         
-        result = self.tools.get_account_balance(user_id, account_type)
+        result = await self._call_tool(self.tools.get_account_balance, user_id, account_type)
         
         if result["success"]:
             accounts = result["data"]
@@ -299,16 +632,16 @@ Actualizado: {acc['last_updated']}
         else:
             return "No pude consultar tu saldo en este momento. ¿Quieres que intente de nuevo?"
     
-    def _execute_get_movements(self, parameters: Dict) -> str:
+    async def _execute_get_movements(self, state: ConversationState, parameters: Dict) -> str:
         """Ejecuta consulta de movimientos"""
-        if not self.session_data:
+        if not state.session_data:
             return "Por seguridad, necesito que te autentiques primero."
         
-        user_id = self.session_data["user_id"]
+        user_id = state.session_data["user_id"]
         account_type = parameters.get("account_type", "ahorros")
         limit = parameters.get("limit", 5)
         
-        result = self.tools.get_account_movements(user_id, account_type, limit)
+        result = await self._call_tool(self.tools.get_account_movements, user_id, account_type, limit)
         
         if result["success"]:
             movements = result["data"]["movements"]
@@ -325,15 +658,15 @@ Actualizado: {acc['last_updated']}
         else:
             return "No pude consultar los movimientos. ¿Intentamos de nuevo?"
     
-    def _execute_get_cards(self, parameters: Dict) -> str:
+    async def _execute_get_cards(self, state: ConversationState, parameters: Dict) -> str:
         """Ejecuta consulta de tarjetas"""
-        if not self.session_data:
+        if not state.session_data:
             return "Por seguridad, necesito que te autentiques primero."
         
-        user_id = self.session_data["user_id"]
+        user_id = state.session_data["user_id"]
         card_type = parameters.get("card_type")
         
-        result = self.tools.get_card_info(user_id, card_type)
+        result = await self._call_tool(self.tools.get_card_info, user_id, card_type)
         
         if result["success"]:
             cards = result["data"]
@@ -356,15 +689,15 @@ Actualizado: {acc['last_updated']}
         else:
             return "No pude consultar la información de tus tarjetas. ¿Intentamos nuevamente?"
     
-    def _execute_get_policies(self, parameters: Dict) -> str:
+    async def _execute_get_policies(self, state: ConversationState, parameters: Dict) -> str:
         """Ejecuta consulta de pólizas"""
-        if not self.session_data:
+        if not state.session_data:
             return "Por seguridad, necesito que te autentiques primero."
         
-        user_id = self.session_data["user_id"]
+        user_id = state.session_data["user_id"]
         policy_type = parameters.get("policy_type")
         
-        result = self.tools.get_policy_info(user_id, policy_type)
+        result = await self._call_tool(self.tools.get_policy_info, user_id, policy_type)
         
         if result["success"]:
             policies = result["data"]
@@ -395,51 +728,114 @@ Actualizado: {acc['last_updated']}
         if not query:
             return "No entendí sobre qué quieres información. ¿Puedes ser más específico?"
         
-        result = search_knowledge_base(query)
+        result = self._search_knowledge(query)
         
         if result["success"]:
-            return result["results"] + "\n\n¿Necesitas saber algo más?"
+            return format_results(result["results"], KNOWLEDGE_CONTEXT_MAX_CHARS) + "\n\n¿Necesitas saber algo más?"
         else:
             return "No encontré información sobre eso. ¿Quieres que te contacte con un asesor? 📞"
     
-    def _add_to_history(self, role: str, content: str):
-        """Agrega un mensaje al historial de conversación"""
-        self.conversation_history.append({
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        # Mantener solo los últimos N mensajes
-        if len(self.conversation_history) > 50:
-            self.conversation_history = self.conversation_history[-50:]
-    
-    def _log_error(self, error: str):
+    def _log_error(self, error: str, state: Optional[ConversationState] = None):
         """Registra errores para monitoreo"""
         log_entry = {
             "timestamp": datetime.now().isoformat(),
             "error": error,
-            "user_id": self.current_user_id or "anonymous",
-            "session_active": self.session_data is not None
+            "user_id": (state and state.current_user_id) or "anonymous",
+            "session_active": state is not None and state.authenticated
         }
         print(f"[ERROR] {json.dumps(log_entry)}")
     
+    def _log_fast_path(self, state: ConversationState, faq: SearchResult, reason: str):
+        """Registra los turnos respondidos sin LLM, aparte del resto"""
+        log_entry = {
+            "timestamp": datetime.now().isoformat(),
+            "faq_id": faq.id,
+            "reason": reason,
+            "score": round(faq.scores.get("semantic", faq.score), 4),
+            "user_id": state.current_user_id or "anonymous"
+        }
+        print(f"[FAST_PATH] {json.dumps(log_entry)}")
+    
+    def reset_session(self, state: ConversationState):
+        """Reinicia la sesión bancaria de una conversación (logout)"""
+        if state.session_token:
+            self.security.destroy_session(state.session_token)
+        state.clear_session()
+    
+    def get_session_info(self, state: ConversationState) -> Optional[Dict]:
+        """Obtiene información de la sesión de una conversación"""
+        if not state.session_token:
+            return None
+        return self.security.get_session_info(state.session_token)
+
+
+class BankingAgent:
+    """
+    Agente conversacional bancario de una sola conversación.
+    
+    Envuelve un AgentEngine (propio, o uno compartido) y un
+    ConversationState con la API de siempre: consola, voz y tests.
+    """
+    
+    def __init__(self, api_key: str = GEMINI_API_KEY, engine: Optional[AgentEngine] = None):
+        self.engine = engine or AgentEngine(api_key)
+        self.state = ConversationState()
+    
+    @property
+    def model(self):
+        return self.engine.model
+    
+    @model.setter
+    def model(self, model):
+        self.engine.model = model
+    
+    @property
+    def tools(self) -> BankingTools:
+        return self.engine.tools
+    
+    @property
+    def security(self) -> SecurityManager:
+        return self.engine.security
+    
+    @property
+    def knowledge(self):
+        return self.engine.knowledge
+    
+    @property
+    def conversation_history(self) -> List[Dict]:
+        return self.state.history
+    
+    @property
+    def session_token(self) -> Optional[str]:
+        return self.state.session_token
+    
+    @property
+    def session_data(self) -> Optional[Dict]:
+        return self.state.session_data
+    
+    @property
+    def current_user_id(self) -> Optional[str]:
+        return self.state.current_user_id
+    
+    def process_message(self, user_message: str) -> str:
+        """Procesa un mensaje del usuario y genera una respuesta"""
+        return self.engine.process_message(self.state, user_message)
+    
+    async def aprocess_message(self, user_message: str) -> str:
+        return await self.engine.aprocess_message(self.state, user_message)
+    
+    def astream_message(self, user_message: str) -> AsyncIterator[str]:
+        return self.engine.astream_message(self.state, user_message)
+    
     def reset_session(self):
         """Reinicia la sesión del usuario (logout)"""
-        if self.session_token:
-            self.security.destroy_session(self.session_token)
-        
-        self.session_token = None
-        self.session_data = None
-        self.current_user_id = None
+        self.engine.reset_session(self.state)
         print("✅ Sesión cerrada correctamente")
     
     def get_session_info(self) -> Optional[Dict]:
         """Obtiene información de la sesión actual"""
-        if not self.session_token:
-            return None
-        return self.security.get_session_info(self.session_token)
+        return self.engine.get_session_info(self.state)
     
     def get_conversation_history(self, last_n: int = 10) -> List[Dict]:
         """Obtiene el historial de conversación"""
-        return self.conversation_history[-last_n:]
\ No newline at end of file
+        return self.state.history[-last_n:]
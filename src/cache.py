@@ -0,0 +1,247 @@
+"""
+Cachés en memoria del agente.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from config.settings import (
+    SIMILARITY_THRESHOLD,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL_SECONDS
+)
+from src.normalization import normalize_query
+
+
+class LRUCache:
+    """
+    Caché LRU acotada y segura para hilos.
+    
+    Lleva contadores de aciertos, fallos y desalojos. maxsize = 0
+    deshabilita la caché (nunca almacena).
+    """
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Devuelve el valor (y lo marca como reciente) o None"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: Hashable, value: Any) -> None:
+        """Guarda un valor, desalojando el menos reciente si está llena"""
+        if self.maxsize <= 0:
+            return
+        
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def get_stats(self) -> Dict:
+        """Estadísticas de uso de la caché"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+class SemanticResponseCache:
+    """
+    Caché de respuestas del LLM indexada por similitud de la consulta.
+    
+    Una consulta reutiliza la respuesta de otra ya contestada si su texto
+    normalizado coincide o si la similitud coseno de sus embeddings
+    alcanza `threshold`. Las entradas se agrupan por `namespace` (versión
+    de prompt, estado de autenticación...) y nunca se comparan entre
+    grupos distintos.
+    
+    Expulsa por TTL y por tamaño (LRU), y se vacía completa cuando cambia
+    `content_version` (el contenido de la base de conocimiento).
+    """
+    
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE,
+                 ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+                 threshold: float = SIMILARITY_THRESHOLD,
+                 clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (namespace, texto normalizado) -> (embedding, respuesta, expira)
+        self._entries: "OrderedDict[Tuple, Tuple]" = OrderedDict()
+        # namespace -> (claves, matriz de embeddings normalizados)
+        self._matrices: Dict[Hashable, Tuple] = {}
+        self._content_version = None
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    def get(self, query: str, embedding=None, namespace: Hashable = (),
+            content_version: Optional[str] = None) -> Optional[str]:
+        """Devuelve la respuesta cacheada para la consulta o None"""
+        key = (namespace, normalize_query(query))
+        
+        with self._lock:
+            self._check_version(content_version)
+            now = self._clock()
+            
+            entry_key = key if key in self._entries else None
+            if entry_key is None and embedding is not None and NUMPY_AVAILABLE:
+                entry_key = self._nearest(namespace, embedding)
+            
+            if entry_key is not None:
+                _, response, expires_at = self._entries[entry_key]
+                if expires_at <= now:
+                    self._discard(entry_key)
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(entry_key)
+                    if entry_key == key:
+                        self.exact_hits += 1
+                    else:
+                        self.semantic_hits += 1
+                    return response
+            
+            self.misses += 1
+            return None
+    
+    def put(self, query: str, response: str, embedding=None,
+            namespace: Hashable = (), content_version: Optional[str] = None) -> None:
+        """Guarda la respuesta a una consulta"""
+        if self.maxsize <= 0:
+            return
+        
+        if embedding is not None and NUMPY_AVAILABLE:
+            embedding = np.asarray(embedding, dtype=np.float32)
+            norm = float(np.linalg.norm(embedding))
+            embedding = embedding / norm if norm else None
+        
+        key = (namespace, normalize_query(query))
+        with self._lock:
+            self._check_version(content_version)
+            self._entries[key] = (embedding, response, self._clock() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            self._matrices.pop(namespace, None)
+            
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _check_version(self, content_version: Optional[str]):
+        if content_version is None or content_version == self._content_version:
+            return
+        if self._content_version is not None and self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._matrices.clear()
+        self._content_version = content_version
+    
+    def _discard(self, key: Tuple):
+        del self._entries[key]
+        self._matrices.pop(key[0], None)
+    
+    def _nearest(self, namespace: Hashable, embedding) -> Optional[Tuple]:
+        """Clave de la entrada más similar del namespace si supera el umbral"""
+        if namespace not in self._matrices:
+            keys = [key for key, entry in self._entries.items()
+                    if key[0] == namespace and entry[0] is not None]
+            matrix = np.stack([self._entries[key][0] for key in keys]) if keys else None
+            self._matrices[namespace] = (keys, matrix)
+        
+        keys, matrix = self._matrices[namespace]
+        if matrix is None:
+            return None
+        
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if not norm:
+            return None
+        
+        scores = matrix @ (query / norm)
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= self.threshold else None
+    
+    def get_stats(self) -> Dict:
+        """Estadísticas de uso de la caché"""
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "threshold": self.threshold,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": hits / lookups if lookups else 0.0
+            }
+
+
+# Instancia compartida por proceso
+_shared_response_cache: Optional[SemanticResponseCache] = None
+_shared_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> SemanticResponseCache:
+    """Obtiene la caché de respuestas compartida por todos los agentes del proceso"""
+    global _shared_response_cache
+    
+    if _shared_response_cache is None:
+        with _shared_response_cache_lock:
+            if _shared_response_cache is None:
+                _shared_response_cache = SemanticResponseCache()
+    
+    return _shared_response_cache
@@ -0,0 +1,185 @@
+"""
+Estado por conversación y almacén de conversaciones activas.
+
+El AgentEngine (src/agent.py) es compartido y sin estado: todo lo que
+distingue a un usuario de otro vive en un ConversationState liviano, que
+la API busca por cookie en un ConversationStore acotado.
+"""
+import asyncio
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from config.settings import (
+    MAX_CONVERSATION_HISTORY,
+    MAX_ACTIVE_CONVERSATIONS,
+    CONVERSATION_IDLE_MINUTES,
+    CONVERSATION_MEMORY_MB
+)
+
+# Costo fijo estimado (bytes) de un estado y de cada mensaje del
+# historial, además del texto
+_STATE_OVERHEAD = 1024
+_MESSAGE_OVERHEAD = 300
+
+
+class ConversationState:
+    """Historial y sesión bancaria de una conversación"""
+
+    def __init__(self, conversation_id: Optional[str] = None,
+                 max_history: int = MAX_CONVERSATION_HISTORY):
+        self.conversation_id = conversation_id or secrets.token_urlsafe(16)
+        self.max_history = max_history
+        self.history: List[Dict] = []
+        self.session_token: Optional[str] = None
+        self.session_data: Optional[Dict] = None
+        self.current_user_id: Optional[str] = None
+        self.last_active = time.monotonic()
+        # Los turnos de una misma conversación se procesan de a uno
+        self.lock = asyncio.Lock()
+
+    @property
+    def authenticated(self) -> bool:
+        return self.session_data is not None
+
+    def add_message(self, role: str, content: str):
+        """Agrega un mensaje al historial, conservando los últimos max_history"""
+        self.history.append({
+            "role": role,
+            "content": content,
+            "timestamp": datetime.now().isoformat()
+        })
+        if len(self.history) > self.max_history:
+            del self.history[:-self.max_history]
+
+    def clear_session(self):
+        self.session_token = None
+        self.session_data = None
+        self.current_user_id = None
+
+    def approximate_size(self) -> int:
+        """Memoria estimada en bytes (texto del historial más costos fijos)"""
+        return _STATE_OVERHEAD + sum(
+            _MESSAGE_OVERHEAD + len(message["content"]) for message in self.history
+        )
+
+
+class ConversationStore:
+    """
+    Conversaciones activas por id, con desalojo LRU.
+
+    Se descartan las menos recientes cuando hay más de `max_conversations`,
+    cuando su memoria estimada total supera `max_memory_mb`, o cuando
+    llevan `idle_minutes` sin actividad. `on_evict` recibe cada estado
+    descartado (p. ej. para cerrar su sesión bancaria). Es segura para
+    hilos.
+    """
+
+    def __init__(self, max_conversations: int = MAX_ACTIVE_CONVERSATIONS,
+                 idle_minutes: float = CONVERSATION_IDLE_MINUTES,
+                 max_memory_mb: float = CONVERSATION_MEMORY_MB,
+                 on_evict: Optional[Callable[[ConversationState], None]] = None):
+        self.max_conversations = max(1, max_conversations)
+        self.idle_seconds = idle_minutes * 60
+        self.max_bytes = int(max_memory_mb * 1024 * 1024)
+        self.on_evict = on_evict
+        self._states: "OrderedDict[str, ConversationState]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evictions = {"capacity": 0, "memory": 0, "idle": 0}
+
+    def get_or_create(self, conversation_id: Optional[str]) -> ConversationState:
+        """La conversación del id dado, o una nueva (con otro id) si no existe"""
+        evicted = []
+        with self._lock:
+            now = time.monotonic()
+            evicted += self._evict_idle(now)
+            state = self._states.get(conversation_id) if conversation_id else None
+            if state is None:
+                state = ConversationState()
+                self._states[state.conversation_id] = state
+                self._sizes[state.conversation_id] = state.approximate_size()
+                self._total_bytes += self._sizes[state.conversation_id]
+                self.created += 1
+                evicted += self._evict_over_limits()
+            else:
+                self._states.move_to_end(conversation_id)
+            state.last_active = now
+        self._notify(evicted)
+        return state
+
+    def update(self, state: ConversationState):
+        """Recalcula la memoria de una conversación tras un turno"""
+        evicted = []
+        with self._lock:
+            conversation_id = state.conversation_id
+            if conversation_id not in self._states:
+                return
+            size = state.approximate_size()
+            self._total_bytes += size - self._sizes[conversation_id]
+            self._sizes[conversation_id] = size
+            state.last_active = time.monotonic()
+            self._states.move_to_end(conversation_id)
+            evicted += self._evict_over_limits()
+        self._notify(evicted)
+
+    def remove(self, conversation_id: str) -> Optional[ConversationState]:
+        with self._lock:
+            return self._pop(conversation_id)
+
+    def _pop(self, conversation_id: str) -> Optional[ConversationState]:
+        state = self._states.pop(conversation_id, None)
+        if state is not None:
+            self._total_bytes -= self._sizes.pop(conversation_id)
+        return state
+
+    def _evict_idle(self, now: float) -> List[ConversationState]:
+        evicted = []
+        # Orden LRU: las más antiguas están al principio
+        while self._states:
+            oldest = next(iter(self._states.values()))
+            if now - oldest.last_active < self.idle_seconds:
+                break
+            evicted.append(self._pop(oldest.conversation_id))
+            self.evictions["idle"] += 1
+        return evicted
+
+    def _evict_over_limits(self) -> List[ConversationState]:
+        # La conversación en curso es la más reciente: nunca se descarta
+        evicted = []
+        while len(self._states) > 1:
+            if len(self._states) > self.max_conversations:
+                reason = "capacity"
+            elif self._total_bytes > self.max_bytes:
+                reason = "memory"
+            else:
+                break
+            oldest_id = next(iter(self._states))
+            evicted.append(self._pop(oldest_id))
+            self.evictions[reason] += 1
+        return evicted
+
+    def _notify(self, evicted: List[ConversationState]):
+        # Fuera del lock: on_evict puede tocar otros componentes
+        if self.on_evict is not None:
+            for state in evicted:
+                self.on_evict(state)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "active": len(self._states),
+                "max_conversations": self.max_conversations,
+                "memory_mb": round(self._total_bytes / (1024 * 1024), 3),
+                "max_memory_mb": round(self.max_bytes / (1024 * 1024), 3),
+                "created": self.created,
+                "evictions": dict(self.evictions),
+            }
@@ -0,0 +1,208 @@
+"""
+Ingesta en streaming de documentos markdown largos (docs/) por fragmentos.
+
+Los archivos se leen línea a línea, de a uno, y se parten en fragmentos
+que respetan los encabezados: un fragmento nunca cruza de una sección a
+otra y lleva como título la ruta de encabezados que lo contiene
+("Documento › Sección › Subsección"). Los fragmentos consecutivos de una
+sección se solapan algunos párrafos para no cortar una idea en el borde.
+
+Cada fragmento recuerda su rango de bytes dentro del archivo: los índices
+solo retienen esa referencia (ChunkRef) y el texto se relee al mostrar un
+resultado, así la memoria no crece con el tamaño del corpus.
+"""
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+# Prefijo de los ids de fragmentos (comparten índices con las FAQs)
+CHUNK_ID_PREFIX = "doc:"
+
+MARKDOWN_EXTENSIONS = ('.md', '.markdown')
+
+_HEADING = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+_FENCE = re.compile(r'^\s*(```|~~~)')
+_RULE = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+
+
+def is_chunk_id(item_id: str) -> bool:
+    """True si el id corresponde a un fragmento de documento (no a una FAQ)"""
+    return item_id.startswith(CHUNK_ID_PREFIX)
+
+
+def chunk_hash(title: str, text: str) -> str:
+    """Hash del contenido que se embebe de un fragmento"""
+    return hashlib.sha256(f"{title}\n{text}".encode('utf-8')).hexdigest()
+
+
+@dataclass(frozen=True)
+class ChunkRef:
+    """Ubicación de un fragmento dentro de su documento (sin el texto)"""
+    source: str  # ruta relativa al directorio de documentos
+    title: str
+    start: int  # rango de bytes [start, end) en el archivo
+    end: int
+    content_hash: str
+
+
+@dataclass(frozen=True)
+class DocumentChunk:
+    """Fragmento recién leído de un documento, con su texto"""
+    id: str
+    ref: ChunkRef
+    text: str
+
+    @property
+    def embedding_text(self) -> str:
+        # El título aporta el contexto que el fragmento suelto no tiene
+        return f"{self.ref.title}\n{self.text}"
+
+
+def iter_markdown_files(root: str) -> Iterator[str]:
+    """Rutas (relativas a `root`) de los documentos markdown, en orden estable"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(MARKDOWN_EXTENSIONS):
+                path = os.path.relpath(os.path.join(dirpath, filename), root)
+                yield path.replace(os.sep, '/')
+
+
+class MarkdownChunker:
+    """
+    Parte documentos markdown en fragmentos de ~`chunk_size` caracteres.
+
+    La unidad mínima es el párrafo (los bloques de código se mantienen
+    enteros salvo que superen `chunk_size`, en cuyo caso se cortan entre
+    líneas). Un fragmento agrupa párrafos consecutivos de la misma
+    sección y el siguiente repite los últimos párrafos del anterior hasta
+    `overlap` caracteres.
+    """
+
+    def __init__(self, chunk_size: int = 800, overlap: int = 150):
+        if chunk_size <= 0 or not 0 <= overlap < chunk_size:
+            raise ValueError("Se requiere chunk_size > 0 y 0 <= overlap < chunk_size")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def chunk_file(self, root: str, source: str) -> Iterator[DocumentChunk]:
+        """Fragmentos de un documento, leyéndolo línea a línea"""
+        default_title = os.path.splitext(os.path.basename(source))[0]
+        headings: List[Tuple[int, str]] = []
+        # Sección en curso: bytes desde `section_start` y sus párrafos
+        # como (inicio, fin, caracteres), con offsets absolutos
+        section_start = 0
+        section = bytearray()
+        paragraphs: List[Tuple[int, int, int]] = []
+        paragraph: Optional[List[int]] = None
+        in_fence = False
+        offset = 0
+
+        def title() -> str:
+            return " › ".join(text for _, text in headings) or default_title
+
+        with open(os.path.join(root, source), 'rb') as f:
+            for raw in f:
+                line_start, offset = offset, offset + len(raw)
+                line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+
+                heading = None if in_fence else _HEADING.match(line)
+                if heading:
+                    if paragraph:
+                        paragraphs.append(tuple(paragraph))
+                    yield from self._section_chunks(source, title(), section_start, section, paragraphs)
+                    level = len(heading.group(1))
+                    while headings and headings[-1][0] >= level:
+                        headings.pop()
+                    headings.append((level, re.sub(r'[*`]', '', heading.group(2)).strip()))
+                    section_start, section, paragraphs, paragraph = offset, bytearray(), [], None
+                    continue
+
+                section += raw
+                if _FENCE.match(line):
+                    in_fence = not in_fence
+                elif not in_fence and (not line.strip() or _RULE.match(line)):
+                    if paragraph:
+                        paragraphs.append(tuple(paragraph))
+                    paragraph = None
+                    continue
+
+                size = len(line) + 1
+                if paragraph and paragraph[2] + size > self.chunk_size:
+                    paragraphs.append(tuple(paragraph))
+                    paragraph = None
+                if paragraph is None:
+                    paragraph = [line_start, offset, size]
+                else:
+                    paragraph[1] = offset
+                    paragraph[2] += size
+
+        if paragraph:
+            paragraphs.append(tuple(paragraph))
+        yield from self._section_chunks(source, title(), section_start, section, paragraphs)
+
+    def _section_chunks(self, source: str, title: str, section_start: int,
+                        section: bytearray,
+                        paragraphs: List[Tuple[int, int, int]]) -> Iterator[DocumentChunk]:
+        first = 0
+        while first < len(paragraphs):
+            last, size = first, 0
+            while last < len(paragraphs) and (last == first or size + paragraphs[last][2] <= self.chunk_size):
+                size += paragraphs[last][2]
+                last += 1
+
+            start, end = paragraphs[first][0], paragraphs[last - 1][1]
+            text = bytes(section[start - section_start:end - section_start])
+            text = text.decode('utf-8', errors='replace').strip()
+            content_hash = chunk_hash(title, text)
+            # Id por contenido: editar un párrafo solo cambia sus fragmentos
+            yield DocumentChunk(
+                id=f"{CHUNK_ID_PREFIX}{source}#{content_hash[:16]}",
+                ref=ChunkRef(source, title, start, end, content_hash),
+                text=text
+            )
+
+            if last >= len(paragraphs):
+                break
+            # Retroceder hasta `overlap` caracteres, avanzando al menos un párrafo
+            next_first, overlap = last, 0
+            while next_first - 1 > first and overlap + paragraphs[next_first - 1][2] <= self.overlap:
+                next_first -= 1
+                overlap += paragraphs[next_first][2]
+            first = next_first
+
+
+def iter_document_chunks(root: str, chunk_size: int = 800,
+                         overlap: int = 150) -> Iterator[DocumentChunk]:
+    """
+    Fragmentos de todos los documentos markdown bajo `root`.
+
+    Es un generador: solo hay un archivo abierto (y una sección en
+    memoria) a la vez, así que admite miles de documentos.
+    """
+    chunker = MarkdownChunker(chunk_size, overlap)
+    for source in iter_markdown_files(root):
+        try:
+            yield from chunker.chunk_file(root, source)
+        except OSError as e:
+            print(f"⚠️  No se pudo leer el documento {source}: {e}")
+
+
+def read_chunk(root: str, ref: ChunkRef) -> Optional[str]:
+    """
+    Relee el texto de un fragmento desde su documento.
+
+    Devuelve None si el archivo ya no existe o cambió desde que se indexó
+    (el hash no coincide); la próxima ingesta lo reindexa.
+    """
+    try:
+        with open(os.path.join(root, ref.source), 'rb') as f:
+            f.seek(ref.start)
+            data = f.read(ref.end - ref.start)
+    except OSError:
+        return None
+
+    text = data.decode('utf-8', errors='replace').strip()
+    return text if chunk_hash(ref.title, text) == ref.content_hash else None
@@ -0,0 +1,153 @@
+"""
+Micro-batching de embeddings de queries para tráfico concurrente.
+
+Cada llamada a `encode` del modelo tiene un costo fijo alto (tokenización,
+paso por el transformer, sincronización del GIL), así que codificar una
+query por request desperdicia la eficiencia por lote del modelo. El
+MicroBatchEncoder encola las queries de todos los hilos y un único worker
+las codifica juntas.
+"""
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence
+
+from src.metrics import percentile_ms
+
+_STOP = object()
+
+
+class MicroBatchEncoder:
+    """
+    Agrupa codificaciones concurrentes en lotes de hasta `max_batch_size`.
+
+    El worker toma la primera query en cola y espera a lo sumo
+    `max_wait_ms` (desde que esa query se encoló) a que lleguen más antes
+    de codificar el lote. Solo espera si hay concurrencia (más queries en
+    cola o un lote anterior de varias): una query aislada no paga la
+    ventana de espera. Mientras el modelo trabaja, las queries nuevas
+    se acumulan y salen en el lote siguiente, así el tamaño de lote crece
+    solo con la concurrencia. Cada llamador recibe sus propios embeddings
+    a través de un Future.
+
+    El hilo worker se inicia con la primera codificación.
+    """
+
+    def __init__(self, model, max_batch_size: int = 32, max_wait_ms: float = 2.0,
+                 history_size: int = 1024):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # Métricas (las listas recientes alimentan los percentiles)
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self._last_batch_size = 0
+        self._queue_waits: deque = deque(maxlen=history_size)
+        self._encode_times: deque = deque(maxlen=history_size)
+
+    def encode(self, texts: Sequence[str]) -> List:
+        """Embeddings de `texts` (bloquea hasta que su lote se codifica)"""
+        return [future.result() for future in self.submit(texts)]
+
+    async def aencode(self, texts: Sequence[str]) -> List:
+        """Versión async de encode: espera sin bloquear el event loop"""
+        futures = [asyncio.wrap_future(future) for future in self.submit(texts)]
+        return list(await asyncio.gather(*futures))
+
+    def submit(self, texts: Sequence[str]) -> List[Future]:
+        """Encola `texts` y devuelve un Future por texto"""
+        self._ensure_worker()
+        now = time.perf_counter()
+        futures = []
+        for text in texts:
+            future: Future = Future()
+            self._queue.put((text, future, now))
+            futures.append(future)
+        return futures
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                worker.start()
+                self._worker = worker
+
+    def close(self):
+        """Detiene el worker después de vaciar la cola"""
+        with self._start_lock:
+            if self._worker is not None:
+                self._queue.put(_STOP)
+                self._worker.join()
+                self._worker = None
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            concurrent = self._last_batch_size > 1 or not self._queue.empty()
+            deadline = first[2] + (self.max_wait if concurrent else 0.0)
+            stop = False
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._last_batch_size = len(batch)
+            self._encode_batch(batch)
+            if stop:
+                return
+
+    def _encode_batch(self, batch: List):
+        started = time.perf_counter()
+        futures = [future for _, future, _ in batch]
+        try:
+            embeddings = self.model.encode([text for text, _, _ in batch])
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        finished = time.perf_counter()
+
+        for future, embedding in zip(futures, embeddings):
+            future.set_result(embedding)
+
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self._queue_waits.extend(started - enqueued for _, _, enqueued in batch)
+            self._encode_times.append(finished - started)
+
+    def get_stats(self) -> Dict:
+        """Tamaño de lote, espera en cola y tiempo de codificación"""
+        with self._stats_lock:
+            waits = sorted(self._queue_waits)
+            encode_times = list(self._encode_times)
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "max_batch_size": self.max_batch_seen,
+                "queue_depth": self._queue.qsize(),
+                "queue_wait_ms_p50": percentile_ms(waits, 0.50),
+                "queue_wait_ms_p95": percentile_ms(waits, 0.95),
+                "encode_ms_avg": round(1000 * sum(encode_times) / len(encode_times), 3) if encode_times else 0.0,
+            }
@@ -0,0 +1,131 @@
+"""
+Backends de embeddings para la base de conocimiento.
+
+Todos cumplen el contrato de SentenceTransformer que usa KnowledgeBase:
+- encode(texts, batch_size=...) -> matriz (n, dimensiones) float32
+- get_sentence_embedding_dimension() -> int
+- name: identifica el espacio vectorial; el índice persistente se guarda
+  en un directorio por name, así dos backends nunca mezclan vectores
+
+Backends disponibles (EMBEDDING_BACKEND):
+- "sentence-transformers": transformer multilingüe (EMBEDDING_MODEL); el
+  mejor recall, pero descarga el modelo y es lento en CPUs chicas
+- "hashing": n-gramas de caracteres con feature hashing; no descarga ni
+  entrena nada, arranca al instante y ocupa unos pocos MB
+"""
+import zlib
+from functools import lru_cache
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+from src.lexical_index import tokenize
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+EMBEDDING_BACKENDS = ("sentence-transformers", "hashing")
+
+
+class SentenceTransformerEncoder:
+    """Transformer de sentence-transformers (descarga el modelo al crearse)"""
+
+    def __init__(self, model_name: str):
+        self.name = model_name
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        return self.model.encode(list(texts), batch_size=batch_size)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+
+@lru_cache(maxsize=65536)
+def _token_features(token: str, dimensions: int, min_n: int, max_n: int,
+                    word_weight: float) -> Tuple[Tuple[int, float], ...]:
+    """(posición, valor con signo) de los features de un token, cacheados"""
+    features = [f"w:{token}"]
+    padded = f" {token} "
+    for n in range(min_n, max_n + 1):
+        features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+    result = []
+    for i, feature in enumerate(features):
+        digest = zlib.crc32(feature.encode('utf-8'))
+        # Hashing con signo: las colisiones se cancelan en promedio en vez
+        # de sumarse siempre
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        weight = word_weight if i == 0 else 1.0
+        result.append((digest % dimensions, sign * weight))
+    return tuple(result)
+
+
+class HashingEncoder:
+    """
+    Embeddings léxicos por feature hashing de n-gramas de caracteres.
+
+    Cada token (normalizado y con stem, ver lexical_index.tokenize) aporta
+    la palabra completa y sus n-gramas de `min_n` a `max_n` caracteres,
+    proyectados a `dimensions` posiciones con un hash estable (crc32).
+    Las frecuencias se amortiguan con log(1 + tf) y el vector se normaliza.
+
+    Los n-gramas toleran errores de tipeo y variantes morfológicas
+    ("transferir" / "transferencia"), pero no entienden sinónimos: el
+    recall es menor que el del transformer. No usa IDF a propósito: un
+    IDF ajustado al corpus cambiaría los vectores ya persistidos con cada
+    FAQ nueva.
+    """
+
+    def __init__(self, dimensions: int = 1024, min_n: int = 3, max_n: int = 5,
+                 word_weight: float = 2.0):
+        self.dimensions = dimensions
+        self.min_n = min_n
+        self.max_n = max_n
+        self.word_weight = word_weight
+        self.name = f"hashing-{dimensions}d-char{min_n}-{max_n}"
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimensions
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts: Dict[int, float] = {}
+            for token in tokenize(text):
+                for position, value in _token_features(
+                    token, self.dimensions, self.min_n, self.max_n, self.word_weight
+                ):
+                    counts[position] = counts.get(position, 0.0) + value
+            if counts:
+                matrix[row, list(counts)] = list(counts.values())
+
+        # Frecuencias amortiguadas (conservando el signo del hashing)
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+def is_backend_available(backend: str) -> bool:
+    """True si las dependencias del backend están instaladas"""
+    if backend == "sentence-transformers":
+        return SENTENCE_TRANSFORMERS_AVAILABLE
+    return backend in EMBEDDING_BACKENDS
+
+
+def create_embedding_backend(backend: str, model_name: str, **options):
+    """Crea el backend de embeddings configurado (ver EMBEDDING_BACKENDS)"""
+    if backend == "sentence-transformers":
+        if not SENTENCE_TRANSFORMERS_AVAILABLE:
+            raise ImportError("sentence-transformers no está instalado")
+        return SentenceTransformerEncoder(model_name)
+    if backend == "hashing":
+        return HashingEncoder(**options)
+    raise ValueError(
+        f"Backend de embeddings desconocido: {backend!r} "
+        f"(opciones: {', '.join(EMBEDDING_BACKENDS)})"
+    )
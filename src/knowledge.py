@@ -2,136 +2,529 @@
 Sistema de gestión de conocimiento con RAG REAL.
 Usa embeddings y búsqueda vectorial semántica.
 """
+import hashlib
 import json
 import os
-from typing import List, Dict
-from config.settings import FAQS_FILE, TOP_K_RESULTS
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterable, Optional, Tuple
+from config.settings import (
+    FAQS_FILE,
+    FAQS_JOURNAL_FILE,
+    FAQ_JOURNAL_COMPACT_THRESHOLD,
+    FAQ_RELOAD_INTERVAL_SECONDS,
+    DOCS_DIR,
+    DOC_CHUNK_SIZE,
+    DOC_CHUNK_OVERLAP,
+    TOP_K_RESULTS,
+    SEARCH_MODE,
+    HYBRID_CANDIDATES,
+    RRF_K,
+    MIN_SEMANTIC_SCORE,
+    MIN_HASHING_SCORE,
+    MIN_LEXICAL_SCORE,
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL,
+    HASHING_DIMENSIONS,
+    EMBEDDING_BATCH_SIZE,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    QUERY_BATCH_MAX_SIZE,
+    QUERY_BATCH_MAX_WAIT_MS,
+    VECTOR_BACKEND,
+    VECTOR_STORE_DIR,
+    VECTOR_STORE_MMAP,
+    VECTOR_STORE_DTYPE,
+    VECTOR_RESCORE,
+    VECTOR_RESCORE_FACTOR,
+    IVF_NLIST,
+    IVF_NPROBE,
+    IVF_MIN_TRAIN_SIZE
+)
+from src.cache import LRUCache
+from src.embedding_batcher import MicroBatchEncoder
+from src.document_ingest import ChunkRef, is_chunk_id, iter_document_chunks, read_chunk
+from src.lexical_index import BM25Index
+from src.retrieval import (
+    SEARCH_MODES,
+    SearchHit,
+    SearchResult,
+    format_results,
+    hits_from_source,
+    passes_min_scores,
+    reciprocal_rank_fusion
+)
+from src.normalization import normalize_query
 
 # Importar bibliotecas para RAG
 try:
-    from sentence_transformers import SentenceTransformer
-    import chromadb
-    from chromadb.config import Settings
+    from src.embeddings import create_embedding_backend, is_backend_available
+    from src.vector_store import create_vector_store, is_vector_backend_available
     RAG_AVAILABLE = True
 except ImportError:
     RAG_AVAILABLE = False
     print("⚠️  Bibliotecas de RAG no disponibles. Usando búsqueda por keywords.")
 
+
+def get_index_path(model_name: str = EMBEDDING_MODEL) -> str:
+    """Directorio del índice persistente para un modelo de embeddings"""
+    slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+    return os.path.join(VECTOR_STORE_DIR, slug)
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, tamaño) de un archivo, o None si no existe"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _read_faqs_file() -> List[Dict]:
+    """Lee las FAQs de faqs.json (lanza excepción si el archivo es inválido)"""
+    with open(FAQS_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f).get('faqs', [])
+
+
+# Peso de cada campo de una FAQ en el índice léxico: las keywords curadas
+# y la pregunta describen mejor la FAQ que el texto de la respuesta
+LEXICAL_FIELD_WEIGHTS = {"keywords": 3.0, "question": 2.0, "answer": 1.0}
+
+
 class KnowledgeBase:
     """
     Gestiona la base de conocimiento con RAG real.
     
     PRODUCCIÓN: Usa embeddings + vector database para búsqueda semántica.
     FALLBACK: Si no hay bibliotecas, usa búsqueda por keywords.
+    
+    El backend vectorial ("chroma", "numpy" o "ivf", ver src/vector_store.py)
+    se elige con VECTOR_BACKEND o el parámetro vector_backend, y el de
+    embeddings ("sentence-transformers" o "hashing", ver src/embeddings.py)
+    con EMBEDDING_BACKEND o embedding_backend.
+    
+    Además de las FAQs indexa por fragmentos los documentos markdown de
+    `docs_dir` (ver src/document_ingest.py), en los mismos índices.
+    
+    Una instancia es una foto del contenido: la recarga en caliente
+    (reload_knowledge_base) construye otra y reemplaza la compartida, así
+    las búsquedas en curso terminan sobre la foto anterior. Con chroma la
+    colección persistente es compartida, así que no hay recarga en caliente
+    (ver supports_hot_reload).
     """
     
-    def __init__(self, use_embeddings: bool = True):
-        self.faqs = self._load_faqs()
-        self.use_embeddings = use_embeddings and RAG_AVAILABLE
+    def __init__(self, use_embeddings: bool = True,
+                 vector_backend: str = VECTOR_BACKEND,
+                 embedding_model=None,
+                 docs_dir: Optional[str] = DOCS_DIR,
+                 embedding_backend: str = EMBEDDING_BACKEND,
+                 query_encoder: Optional[MicroBatchEncoder] = None,
+                 search_executor: Optional[ThreadPoolExecutor] = None):
+        # Protege las mutaciones cuando la instancia se comparte entre
+        # hilos (ver get_knowledge_base)
+        self._lock = threading.RLock()
+        self._journal_entries = 0
+        # Instancia que reemplazó a esta en una recarga (las escrituras
+        # tardías se redirigen a ella)
+        self._replacement: Optional["KnowledgeBase"] = None
+        # Embeddings de queries ya vistas, por texto normalizado
+        self.query_embedding_cache = LRUCache(QUERY_EMBEDDING_CACHE_SIZE)
+        # Agrupa las queries de requests concurrentes en un solo encode
+        # (None = codificar en el hilo del llamador). Una recarga pasa el de
+        # la instancia anterior, igual que el modelo de embeddings
+        self.query_encoder: Optional[MicroBatchEncoder] = query_encoder
+        # Firma de faqs.json antes de leerlo: si cambia, hay que recargar
+        self.source_signature = _file_signature(FAQS_FILE)
+        self._reindex_faqs(self._load_faqs())
+        # Cambia con cada modificación del contenido; las cachés de
+        # respuestas lo usan para invalidarse
+        self.content_version = self._fingerprint(self.faqs)
+        # Índice invertido BM25 para la búsqueda por keywords
+        self.lexical_index = BM25Index(LEXICAL_FIELD_WEIGHTS)
+        self.lexical_index.add_many((faq['id'], faq) for faq in self.faqs)
+        # Score mínimo por fuente para conservar un resultado (ver retrieve)
+        self.min_scores = {"semantic": MIN_SEMANTIC_SCORE, "lexical": MIN_LEXICAL_SCORE}
+        # En modo híbrido la búsqueda léxica corre en paralelo a la semántica
+        # (compartido entre las instancias sucesivas de una recarga)
+        self._search_executor = search_executor or ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="kb-search"
+        )
+        self.use_embeddings = use_embeddings and RAG_AVAILABLE and (
+            embedding_model is not None or is_backend_available(embedding_backend)
+        )
+        if self.use_embeddings and not is_vector_backend_available(vector_backend):
+            print(f"⚠️  Backend vectorial '{vector_backend}' no disponible (falta su biblioteca). Usando 'numpy'.")
+            vector_backend = "numpy"
+        self.vector_backend = vector_backend
+        self.embedding_backend = embedding_backend
+        # Fragmentos de documentos indexados: id → ChunkRef (el texto no se
+        # guarda en memoria, se relee del archivo al mostrar un resultado)
+        self.docs_dir = docs_dir or None
+        self._chunks: Dict[str, ChunkRef] = {}
         
         if self.use_embeddings:
             print("🔄 Inicializando sistema RAG con embeddings...")
-            self._initialize_rag_system()
+            self._initialize_rag_system(embedding_model)
             print("✅ Sistema RAG inicializado correctamente")
         else:
             print("⚠️  Usando sistema de búsqueda por keywords (sin embeddings)")
+        
+        self._index_documents()
     
     def _load_faqs(self) -> List[Dict]:
-        """Carga las FAQs desde el archivo JSON"""
+        """Carga las FAQs desde el archivo JSON y aplica el journal de cambios"""
+        faqs = []
         try:
             if os.path.exists(FAQS_FILE):
-                with open(FAQS_FILE, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return data.get('faqs', [])
+                faqs = _read_faqs_file()
             else:
                 print(f"⚠️  Advertencia: No se encontró {FAQS_FILE}")
-                return []
         except Exception as e:
             print(f"❌ Error al cargar FAQs: {e}")
-            return []
+        
+        return self._replay_journal(faqs)
     
-    def _initialize_rag_system(self):
+    def _replay_journal(self, faqs: List[Dict]) -> List[Dict]:
         """
-        Inicializa el sistema RAG completo:
-        1. Carga modelo de embeddings
-        2. Crea/carga vector database
-        3. Indexa FAQs si es necesario
-        """
-        # 1. Cargar modelo de embeddings multilingüe
-        print("  📥 Cargando modelo de embeddings...")
-        self.embedding_model = SentenceTransformer(
-            'paraphrase-multilingual-mpnet-base-v2'
-        )
-        # Dimensiones: 768
-        # Soporta: 50+ idiomas incluyendo español
+        Aplica sobre las FAQs base las operaciones del journal append-only.
         
-        # 2. Inicializar ChromaDB (vector database)
-        print("  💾 Inicializando ChromaDB...")
-        self.chroma_client = chromadb.Client(Settings(
-            anonymized_telemetry=False,
-            allow_reset=True
-        ))
+        Las operaciones son idempotentes (upsert/delete por id), así que
+        volver a aplicarlas tras una compactación interrumpida es seguro.
+        """
+        if not os.path.exists(FAQS_JOURNAL_FILE):
+            return faqs
         
-        # 3. Crear colección (o cargarla si existe)
+        faqs_by_id = {faq['id']: faq for faq in faqs}
         try:
-            self.collection = self.chroma_client.get_collection("banking_faqs")
-            print("  ✅ Colección existente cargada")
-        except:
-            print("  🆕 Creando nueva colección...")
-            self.collection = self.chroma_client.create_collection(
-                name="banking_faqs",
-                metadata={"description": "FAQs bancarias con embeddings"}
+            with open(FAQS_JOURNAL_FILE, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Línea truncada por una escritura interrumpida
+                        print(f"⚠️  Journal: línea {line_number} inválida, se ignora")
+                        continue
+                    
+                    if entry.get('op') == 'upsert':
+                        faqs_by_id[entry['faq']['id']] = entry['faq']
+                    elif entry.get('op') == 'delete':
+                        faqs_by_id.pop(entry['id'], None)
+                    self._journal_entries += 1
+        except Exception as e:
+            print(f"❌ Error al aplicar el journal de FAQs: {e}")
+        
+        return list(faqs_by_id.values())
+    
+    @property
+    def faqs(self) -> List[Dict]:
+        return self._faq_table[0]
+    
+    @property
+    def _faq_positions(self) -> Dict[str, int]:
+        return self._faq_table[1]
+    
+    def _reindex_faqs(self, faqs: List[Dict]):
+        """
+        Publica `faqs` y reconstruye los índices en memoria id → posición,
+        pregunta → id, pregunta normalizada → id y categoría → ids.
+        
+        Las búsquedas no toman self._lock: cada índice se construye aparte
+        y se publica con una sola asignación. La lista y su mapa de
+        posiciones van juntos en _faq_table, así un lector nunca empareja
+        el mapa viejo con la lista nueva (ver _faq_snapshot).
+        """
+        # Conjuntos ordenados (dict) de ids por categoría
+        category_ids: Dict[str, Dict[str, None]] = {}
+        for faq in faqs:
+            category = faq.get('category')
+            if category is not None:
+                category_ids.setdefault(category, {})[faq['id']] = None
+        numbers = [
+            int(match.group(1)) for match in
+            (re.fullmatch(r'faq_(\d+)', faq['id']) for faq in faqs)
+            if match
+        ]
+        
+        self._faq_table = (faqs, {faq['id']: i for i, faq in enumerate(faqs)})
+        self._category_ids = category_ids
+        self._question_ids = {
+            self._question_key(faq['question']): faq['id'] for faq in faqs
+        }
+        # Sin tildes ni signos: para reconocer una pregunta idéntica a una FAQ
+        self._normalized_question_ids = {
+            normalize_query(faq['question']): faq['id'] for faq in faqs
+        }
+        self._next_faq_number = max(numbers, default=0) + 1
+    
+    def _faq_snapshot(self, faq_id: str) -> Optional[Dict]:
+        """FAQ con ese id, leída de una sola versión de la lista y sus posiciones"""
+        faqs, positions = self._faq_table
+        position = positions.get(faq_id)
+        return faqs[position] if position is not None else None
+    
+    def _index_category(self, faq: Dict):
+        category = faq.get('category')
+        if category is not None:
+            self._category_ids.setdefault(category, {})[faq['id']] = None
+    
+    def _unindex_category(self, faq: Dict):
+        faq_ids = self._category_ids.get(faq.get('category'))
+        if faq_ids is not None:
+            faq_ids.pop(faq['id'], None)
+            if not faq_ids:
+                del self._category_ids[faq['category']]
+    
+    def _category_faq_ids(self, categories: Optional[Iterable[str]]) -> Optional[Dict[str, None]]:
+        """Ids de las FAQs de las categorías dadas (None = sin filtro)"""
+        if categories is None:
+            return None
+        if isinstance(categories, str):
+            categories = [categories]
+        faq_ids: Dict[str, None] = {}
+        for category in categories:
+            faq_ids.update(self._category_ids.get(category, {}))
+        return faq_ids
+    
+    @staticmethod
+    def _question_key(question: str) -> str:
+        return " ".join(question.casefold().split())
+    
+    def _new_faq_id(self) -> str:
+        faq_id = f"faq_{self._next_faq_number:03d}"
+        self._next_faq_number += 1
+        return faq_id
+    
+    def _initialize_rag_system(self, embedding_model=None):
+        """
+        Inicializa el sistema RAG completo:
+        1. Carga modelo de embeddings (o reutiliza el ya cargado)
+        2. Abre la vector database persistente del modelo
+        3. Indexa solo las FAQs nuevas o modificadas
+        """
+        # 1. Cargar el backend de embeddings (EMBEDDING_BACKEND)
+        if embedding_model is None:
+            print(f"  📥 Cargando embeddings '{self.embedding_backend}'...")
+            options = {"dimensions": HASHING_DIMENSIONS} if self.embedding_backend == "hashing" else {}
+            embedding_model = create_embedding_backend(self.embedding_backend, EMBEDDING_MODEL, **options)
+        self.embedding_model = embedding_model
+        self.embedding_model_name = getattr(embedding_model, 'name', EMBEDDING_MODEL)
+        if self.embedding_backend == "hashing":
+            self.min_scores["semantic"] = MIN_HASHING_SCORE
+        if self.query_encoder is None and QUERY_BATCH_MAX_SIZE > 0:
+            self.query_encoder = MicroBatchEncoder(
+                embedding_model, QUERY_BATCH_MAX_SIZE, QUERY_BATCH_MAX_WAIT_MS
             )
-            self._index_faqs()
+        # paraphrase-multilingual-mpnet-base-v2: 768 dimensiones, 50+ idiomas
+        
+        # 2. Abrir el almacén vectorial persistente: un directorio por
+        # modelo (o configuración de hashing), así un cambio de backend
+        # nunca mezcla vectores incompatibles
+        self.index_path = get_index_path(self.embedding_model_name)
+        print(f"  💾 Abriendo índice '{self.vector_backend}' en {self.index_path}...")
+        options = {}
+        if self.vector_backend == "numpy":
+            options = {
+                "mmap": VECTOR_STORE_MMAP,
+                "dtype": VECTOR_STORE_DTYPE,
+                "rescore": VECTOR_RESCORE,
+                "rescore_factor": VECTOR_RESCORE_FACTOR
+            }
+        elif self.vector_backend == "ivf":
+            options = {
+                "mmap": VECTOR_STORE_MMAP,
+                "nlist": IVF_NLIST,
+                "nprobe": IVF_NPROBE,
+                "min_train_size": IVF_MIN_TRAIN_SIZE
+            }
+        self.vector_store = create_vector_store(
+            self.vector_backend, self.index_path, self.embedding_model_name, **options
+        )
+        
+        # 3. Sincronizar el índice con las FAQs cargadas
+        self._index_faqs()
+    
+    @staticmethod
+    def _content_hash(faq: Dict) -> str:
+        """Hash del contenido que se embebe/almacena de una FAQ"""
+        payload = json.dumps(
+            [faq['question'], faq['answer'], faq.get('category', 'general')],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _faq_metadata(self, faq: Dict) -> Dict:
+        """Metadatos que se guardan junto al vector de una FAQ"""
+        return {
+            'question': faq['question'],
+            'category': faq.get('category', 'general'),
+            'content_hash': self._content_hash(faq)
+        }
     
     def _index_faqs(self):
         """
-        Indexa todas las FAQs en la vector database.
+        Sincroniza la vector database con las FAQs cargadas.
         
         Proceso:
-        1. Para cada FAQ, combina pregunta + respuesta
-        2. Genera embedding usando sentence-transformers
-        3. Almacena en ChromaDB con metadatos
+        1. Lee los hashes de contenido ya almacenados en el índice
+        2. Elimina del índice las FAQs que ya no existen
+        3. Genera embeddings solo para FAQs nuevas o modificadas (en lotes)
+        4. Las almacena en el vector store (upsert) con sus metadatos
         """
-        print(f"  🔄 Indexando {len(self.faqs)} FAQs...")
+        indexed_hashes = self.vector_store.get_content_hashes()
         
-        documents = []
-        embeddings = []
-        ids = []
-        metadatas = []
+        current_ids = {faq['id'] for faq in self.faqs}
+        # Los fragmentos de documentos los sincroniza _index_documents
+        stale_ids = [
+            faq_id for faq_id in indexed_hashes
+            if faq_id not in current_ids and not is_chunk_id(faq_id)
+        ]
+        pending = [
+            faq for faq in self.faqs
+            if indexed_hashes.get(faq['id']) != self._content_hash(faq)
+        ]
         
-        for faq in self.faqs:
-            # Combinar pregunta y respuesta para mejor contexto
-            text = f"{faq['question']} {faq['answer']}"
-            
-            # Generar embedding
-            embedding = self.embedding_model.encode(text)
+        if stale_ids:
+            self.vector_store.delete(stale_ids)
+        
+        if pending:
+            print(f"  🔄 Indexando {len(pending)} de {len(self.faqs)} FAQs...")
+            self._embed_and_upsert(pending)
+        
+        self.vector_store.persist()
+        
+        self.index_stats = {
+            "reused": len(self.faqs) - len(pending),
+            "embedded": len(pending),
+            "deleted": len(stale_ids)
+        }
+        print(
+            f"  ✅ Índice sincronizado: {self.index_stats['reused']} reutilizadas, "
+            f"{self.index_stats['embedded']} indexadas, "
+            f"{self.index_stats['deleted']} eliminadas"
+        )
+    
+    def _index_documents(self, batch_size: int = EMBEDDING_BATCH_SIZE):
+        """
+        Indexa los fragmentos de los documentos de docs_dir.
+        
+        Recorre los documentos en streaming (un archivo a la vez): cada
+        fragmento se agrega al índice léxico y solo los nuevos o
+        modificados se embeben, en lotes de `batch_size`, así la memoria
+        usada no depende del tamaño del corpus. Los fragmentos que ya no
+        existen se eliminan del índice vectorial.
+        """
+        indexed_hashes = self.vector_store.get_content_hashes() if self.use_embeddings else {}
+        chunks = (
+            iter_document_chunks(self.docs_dir, DOC_CHUNK_SIZE, DOC_CHUNK_OVERLAP)
+            if self.docs_dir else iter(())
+        )
+        
+        version = hashlib.sha256()
+        documents = set()
+        pending = []
+        embedded = 0
+        for chunk in chunks:
+            if chunk.id in self._chunks:
+                # Fragmento repetido dentro del mismo documento
+                continue
+            self._chunks[chunk.id] = chunk.ref
+            documents.add(chunk.ref.source)
+            version.update(chunk.id.encode('utf-8'))
+            self.lexical_index.add(chunk.id, {"question": chunk.ref.title, "answer": chunk.text})
             
-            documents.append(faq['answer'])
-            embeddings.append(embedding.tolist())
-            ids.append(faq['id'])
-            metadatas.append({
-                'question': faq['question'],
-                'category': faq.get('category', 'general')
-            })
-        
-        # Agregar todo a ChromaDB en batch
-        self.collection.add(
-            documents=documents,
+            if self.use_embeddings and indexed_hashes.get(chunk.id) != chunk.ref.content_hash:
+                pending.append(chunk)
+                if len(pending) >= batch_size:
+                    self._embed_chunks(pending, batch_size)
+                    embedded += len(pending)
+                    pending = []
+        
+        stale_ids = []
+        if self.use_embeddings:
+            if pending:
+                self._embed_chunks(pending, batch_size)
+                embedded += len(pending)
+            stale_ids = [
+                item_id for item_id in indexed_hashes
+                if is_chunk_id(item_id) and item_id not in self._chunks
+            ]
+            self.vector_store.delete(stale_ids)
+            self.vector_store.persist()
+        
+        if self._chunks:
+            self.content_version = self._fingerprint([self.content_version, version.hexdigest()])
+            print(f"  📚 Documentos indexados: {len(documents)} ({len(self._chunks)} fragmentos, {embedded} embebidos)")
+        
+        self.document_stats = {
+            "documents": len(documents),
+            "chunks": len(self._chunks),
+            "embedded": embedded,
+            "deleted": len(stale_ids)
+        }
+    
+    def _embed_chunks(self, chunks: List, batch_size: int):
+        """Embebe un lote de fragmentos de documentos y los almacena (upsert)"""
+        embeddings = self.embedding_model.encode(
+            [chunk.embedding_text for chunk in chunks], batch_size=batch_size
+        )
+        self.vector_store.upsert(
+            ids=[chunk.id for chunk in chunks],
             embeddings=embeddings,
-            ids=ids,
-            metadatas=metadatas
+            metadatas=[
+                {
+                    'source': chunk.ref.source,
+                    'title': chunk.ref.title,
+                    'content_hash': chunk.ref.content_hash
+                }
+                for chunk in chunks
+            ],
+            documents=[chunk.text for chunk in chunks]
         )
+    
+    def rebuild_ann_index(self, nlist: Optional[int] = None):
+        """
+        Re-entrena las particiones del índice IVF con todos los vectores.
+        
+        Es una operación offline (ver build_index.py --rebuild-ivf): las
+        altas normales se asignan a particiones existentes sin re-entrenar,
+        así que conviene reconstruir cuando el corpus crece mucho.
+        """
+        if not self.use_embeddings or self.vector_backend != "ivf":
+            raise ValueError("rebuild_ann_index requiere el backend vectorial 'ivf'")
         
-        print(f"  ✅ {len(self.faqs)} FAQs indexadas correctamente")
+        with self._lock:
+            self.vector_store.train(nlist)
+            self.vector_store.persist()
     
-    def search(self, query: str, top_k: int = TOP_K_RESULTS) -> str:
+    def _embed_and_upsert(self, faqs: List[Dict],
+                          batch_size: int = EMBEDDING_BATCH_SIZE):
+        """Genera embeddings por lotes y los almacena (upsert) en el vector store"""
+        for start in range(0, len(faqs), batch_size):
+            batch = faqs[start:start + batch_size]
+            
+            # Combinar pregunta y respuesta para mejor contexto
+            texts = [f"{faq['question']} {faq['answer']}" for faq in batch]
+            embeddings = self.embedding_model.encode(texts, batch_size=batch_size)
+            
+            self.vector_store.upsert(
+                ids=[faq['id'] for faq in batch],
+                embeddings=embeddings,
+                metadatas=[self._faq_metadata(faq) for faq in batch],
+                documents=[faq['answer'] for faq in batch]
+            )
+    
+    def search(self, query: str, top_k: int = TOP_K_RESULTS,
+               mode: Optional[str] = None,
+               categories: Optional[List[str]] = None) -> str:
         """
-        Busca FAQs relevantes usando búsqueda semántica.
+        Busca FAQs relevantes usando búsqueda semántica, léxica o híbrida.
         
         PRODUCCIÓN (con embeddings):
         1. Convierte el query del usuario a embedding
-        2. Busca en ChromaDB por similitud coseno
+        2. Busca en el vector store por similitud coseno
         3. Retorna los top-K más relevantes
         
         FALLBACK (sin embeddings):
@@ -140,138 +533,447 @@ class KnowledgeBase:
         Args:
             query: Pregunta del usuario
             top_k: Número de resultados a retornar
+            mode: "semantic", "lexical" o "hybrid" (por defecto SEARCH_MODE).
+                  Sin embeddings siempre se usa "lexical".
+            categories: Limitar la búsqueda a FAQs de estas categorías
             
         Returns:
-            String formateado con las FAQs más relevantes
+            String formateado con las FAQs más relevantes (ver retrieve()
+            para obtener los resultados estructurados)
         """
-        if self.use_embeddings:
-            return self._search_with_embeddings(query, top_k)
-        else:
-            return self._search_with_keywords(query, top_k)
+        return format_results(self.retrieve(query, top_k, mode, categories))
+    
+    def retrieve(self, query: str, top_k: int = TOP_K_RESULTS,
+                 mode: Optional[str] = None,
+                 categories: Optional[List[str]] = None,
+                 prune: bool = True) -> List[SearchResult]:
+        """
+        Busca FAQs relevantes y las devuelve como SearchResults ordenados.
+        
+        Con prune=True se descartan los resultados que no alcanzan el score
+        mínimo de ninguna de sus fuentes (MIN_SEMANTIC_SCORE para coseno,
+        MIN_LEXICAL_SCORE para BM25), así el top-k no rellena el prompt
+        con FAQs irrelevantes.
+        """
+        return self._to_results(self.retrieve_hits(query, top_k, mode, categories), prune)
+    
+    def _to_results(self, hits: List[SearchHit], prune: bool = True) -> List[SearchResult]:
+        results = []
+        for hit in hits:
+            if prune and not passes_min_scores(hit, self.min_scores):
+                continue
+            
+            faq = self._faq_snapshot(hit.id)
+            if faq is not None:
+                results.append(SearchResult(
+                    id=faq['id'],
+                    question=faq['question'],
+                    answer=faq['answer'],
+                    category=faq.get('category'),
+                    score=hit.score,
+                    scores=hit.scores
+                ))
+                continue
+            
+            ref = self._chunks.get(hit.id)
+            text = read_chunk(self.docs_dir, ref) if ref is not None else None
+            if text is not None:
+                results.append(SearchResult(
+                    id=hit.id,
+                    question=ref.title,
+                    answer=text,
+                    category=None,
+                    score=hit.score,
+                    scores=hit.scores,
+                    source=ref.source
+                ))
+        return results
+    
+    def resolve_search_mode(self, mode: Optional[str] = None) -> str:
+        """Modo de búsqueda efectivo para una llamada"""
+        mode = mode or SEARCH_MODE
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Modo de búsqueda desconocido: {mode!r} (opciones: {', '.join(SEARCH_MODES)})")
+        if not self.use_embeddings:
+            return "lexical"
+        return mode
+    
+    def retrieve_hits(self, query: str, top_k: int = TOP_K_RESULTS,
+                      mode: Optional[str] = None,
+                      categories: Optional[List[str]] = None) -> List[SearchHit]:
+        """
+        Recupera los top-K documentos con su score por fuente.
+        
+        - lexical: BM25 sobre el índice invertido
+        - semantic: similitud coseno en el vector store
+        - hybrid: ambas en paralelo (HYBRID_CANDIDATES candidatos cada una)
+          fusionadas con Reciprocal Rank Fusion; más recall, algo más de
+          latencia
+        
+        Con `categories` solo se puntúan las FAQs de esas categorías
+        (índice categoría → ids), en ambas fuentes.
+        """
+        mode = self.resolve_search_mode(mode)
+        faq_ids = self._category_faq_ids(categories)
+        if faq_ids is not None and not faq_ids:
+            return []
+        
+        if mode == "lexical":
+            return hits_from_source("lexical", self.lexical_index.search(query, top_k, faq_ids))
+        
+        if mode == "semantic":
+            return hits_from_source(
+                "semantic", self.vector_store.query(self.embed_query(query), top_k, ids=faq_ids)
+            )
+        
+        candidates = max(top_k, HYBRID_CANDIDATES)
+        lexical = self._search_executor.submit(self.lexical_index.search, query, candidates, faq_ids)
+        semantic = self.vector_store.query(self.embed_query(query), candidates, ids=faq_ids)
+        return reciprocal_rank_fusion(
+            {"semantic": semantic, "lexical": lexical.result()}, top_k, RRF_K
+        )
     
     def _search_with_embeddings(self, query: str, top_k: int) -> str:
         """
-        Búsqueda semántica usando embeddings y ChromaDB.
+        Búsqueda semántica usando embeddings y el vector store.
         
         Ventajas:
         - Entiende sinónimos y paráfrasis
         - No depende de keywords exactas
         - Búsqueda por significado, no por palabras
         """
-        # 1. Generar embedding del query
-        query_embedding = self.embedding_model.encode(query)
+        return self.search(query, top_k, mode="semantic")
+    
+    def search_batch(self, queries: List[str], top_k: int = TOP_K_RESULTS,
+                     mode: Optional[str] = None,
+                     categories: Optional[List[str]] = None) -> List[str]:
+        """
+        Busca varias queries a la vez.
         
-        # 2. Buscar en ChromaDB por similitud coseno
-        results = self.collection.query(
-            query_embeddings=[query_embedding.tolist()],
-            n_results=top_k
-        )
+        Con embeddings, codifica todas las queries en un solo lote y hace
+        una única consulta matriz-matriz al vector store.
+        """
+        return [
+            format_results(self._to_results(hits))
+            for hits in self.retrieve_hits_batch(queries, top_k, mode, categories)
+        ]
+    
+    def retrieve_hits_batch(self, queries: List[str], top_k: int = TOP_K_RESULTS,
+                            mode: Optional[str] = None,
+                            categories: Optional[List[str]] = None) -> List[List[SearchHit]]:
+        """Versión por lotes de retrieve_hits"""
+        mode = self.resolve_search_mode(mode)
+        faq_ids = self._category_faq_ids(categories)
+        if mode == "lexical" or (faq_ids is not None and not faq_ids):
+            return [self.retrieve_hits(query, top_k, mode, categories) for query in queries]
         
-        # 3. Formatear resultados
-        if not results['documents'] or not results['documents'][0]:
-            return ""
+        candidates = top_k if mode == "semantic" else max(top_k, HYBRID_CANDIDATES)
+        lexical = None
+        if mode == "hybrid":
+            lexical = self._search_executor.submit(
+                lambda: [self.lexical_index.search(query, candidates, faq_ids) for query in queries]
+            )
         
-        formatted_results = []
-        for i, doc in enumerate(results['documents'][0]):
-            question = results['metadatas'][0][i]['question']
-            formatted_results.append(f"**{question}**\n{doc}")
+        query_embeddings = self.embed_queries(queries)
+        semantic = self.vector_store.query_batch(query_embeddings, candidates, ids=faq_ids)
         
-        return "\n\n".join(formatted_results)
+        if lexical is None:
+            return [hits_from_source("semantic", hits) for hits in semantic]
+        return [
+            reciprocal_rank_fusion(
+                {"semantic": semantic_hits, "lexical": lexical_hits}, top_k, RRF_K
+            )
+            for semantic_hits, lexical_hits in zip(semantic, lexical.result())
+        ]
     
-    def _search_with_keywords(self, query: str, top_k: int) -> str:
+    def embed_query(self, query: str):
         """
-        Búsqueda simple por keywords (fallback).
-        Usado si no hay embeddings disponibles.
+        Embedding de una query, cacheado por su texto normalizado.
+        
+        Variantes como "¿Horarios?" y "horarios" comparten entrada, así que
+        las preguntas repetidas no vuelven a pasar por el transformer.
         """
-        query_lower = query.lower()
+        return self.embed_queries([query])[0]
+    
+    def embed_queries(self, queries: List[str]) -> List:
+        """
+        Embeddings de varias queries; los fallos de caché se codifican en un lote.
         
-        # Calcular relevancia por keywords
-        scored_faqs = []
-        for faq in self.faqs:
-            score = 0
-            
-            # Buscar en keywords
-            for keyword in faq.get('keywords', []):
-                if keyword.lower() in query_lower:
-                    score += 2
-            
-            # Buscar en pregunta
-            if any(word in faq['question'].lower() for word in query_lower.split()):
-                score += 1
-            
-            # Buscar en respuesta
-            if any(word in faq['answer'].lower() for word in query_lower.split()):
-                score += 0.5
-            
-            if score > 0:
-                scored_faqs.append((score, faq))
+        Con micro-batching (QUERY_BATCH_MAX_SIZE > 0) ese lote se une al de
+        las demás requests concurrentes en el worker de query_encoder.
+        """
+        keys = [normalize_query(query) for query in queries]
+        embeddings = [self.query_embedding_cache.get(key) for key in keys]
         
-        # Ordenar por relevancia
-        scored_faqs.sort(reverse=True, key=lambda x: x[0])
+        missing = {}
+        for query, key, embedding in zip(queries, keys, embeddings):
+            if embedding is None and key not in missing:
+                missing[key] = query
         
-        # Retornar top_k resultados
-        if not scored_faqs:
-            return ""
+        if missing:
+            if self.query_encoder is not None:
+                encoded = self.query_encoder.encode(list(missing.values()))
+            else:
+                encoded = self.embedding_model.encode(list(missing.values()))
+            for key, embedding in zip(missing, encoded):
+                # Solo lectura: la misma instancia se comparte entre llamadas
+                embedding.setflags(write=False)
+                self.query_embedding_cache.put(key, embedding)
+                missing[key] = embedding
+            embeddings = [
+                embedding if embedding is not None else missing[key]
+                for key, embedding in zip(keys, embeddings)
+            ]
         
-        results = []
-        for _, faq in scored_faqs[:top_k]:
-            results.append(f"**{faq['question']}**\n{faq['answer']}")
+        return embeddings
+    
+    def _search_with_keywords(self, query: str, top_k: int) -> str:
+        """
+        Búsqueda por keywords con BM25 (fallback).
+        Usado si no hay embeddings disponibles.
         
-        return "\n\n".join(results)
+        Consulta el índice invertido (tokens sin tildes y con stem, más las
+        keywords curadas), así que solo recorre las FAQs que comparten
+        algún término con la query.
+        """
+        return self.search(query, top_k, mode="lexical")
+    
+    def find_faq_by_question(self, question: str) -> Optional[SearchResult]:
+        """
+        FAQ cuya pregunta coincide exactamente con `question`, ignorando
+        mayúsculas, tildes y signos ("cuales son los horarios" coincide con
+        "¿Cuáles son los horarios?"), o None.
+        """
+        faq_id = self._normalized_question_ids.get(normalize_query(question))
+        faq = self._faq_snapshot(faq_id) if faq_id is not None else None
+        if faq is None:
+            return None
+        return SearchResult(
+            id=faq['id'],
+            question=faq['question'],
+            answer=faq['answer'],
+            category=faq.get('category'),
+            score=1.0,
+            scores={"exact": 1.0}
+        )
     
     def get_faq_by_category(self, category: str) -> List[Dict]:
         """Obtiene todas las FAQs de una categoría"""
-        return [faq for faq in self.faqs if faq.get('category') == category]
+        faqs = (self._faq_snapshot(faq_id) for faq_id in list(self._category_ids.get(category, {})))
+        return [faq for faq in faqs if faq is not None]
     
     def get_all_categories(self) -> List[str]:
         """Obtiene todas las categorías disponibles"""
-        categories = set()
-        for faq in self.faqs:
-            if 'category' in faq:
-                categories.add(faq['category'])
-        return sorted(list(categories))
+        return sorted(self._category_ids)
     
     def add_faq(self, question: str, answer: str, category: str, 
                 keywords: List[str]) -> bool:
         """
         Agrega una nueva FAQ a la base de conocimiento.
         
-        Si hay embeddings activos, también la indexa en ChromaDB.
+        Si hay embeddings activos, también la indexa en el vector store.
         """
         try:
-            new_faq = {
-                "id": f"faq_{len(self.faqs) + 1:03d}",
-                "category": category,
-                "question": question,
-                "answer": answer,
-                "keywords": keywords
-            }
+            with self._lock:
+                self.add_faqs([{
+                    "id": self._new_faq_id(),
+                    "category": category,
+                    "question": question,
+                    "answer": answer,
+                    "keywords": keywords
+                }])
+            return True
+        except Exception as e:
+            print(f"Error al agregar FAQ: {e}")
+            return False
+    
+    def add_faqs(self, faqs: Iterable[Dict],
+                 batch_size: int = EMBEDDING_BATCH_SIZE) -> Dict:
+        """
+        Ingesta masiva (upsert) de FAQs.
+        
+        Consume el iterable por lotes de `batch_size`, así que admite
+        generadores sobre exportaciones grandes sin cargarlas completas.
+        Cada lote se compara contra lo ya indexado: solo se embeben las FAQs
+        nuevas o cuyo contenido cambió, y los cambios se persisten en el
+        journal append-only (no se reescribe faqs.json en cada inserción).
+        
+        Las FAQs sin "id" se emparejan por pregunta con las existentes;
+        si no hay coincidencia reciben un id nuevo.
+        
+        Returns:
+            {"added": int, "updated": int, "unchanged": int}
+        """
+        stats = {"added": 0, "updated": 0, "unchanged": 0}
+        
+        with self._lock:
+            if self._replacement is not None:
+                return self._replacement.add_faqs(faqs, batch_size)
             
-            self.faqs.append(new_faq)
+            batch = []
+            for faq in faqs:
+                batch.append(faq)
+                if len(batch) >= batch_size:
+                    self._ingest_batch(batch, batch_size, stats)
+                    batch = []
+            if batch:
+                self._ingest_batch(batch, batch_size, stats)
             
-            # Guardar en archivo JSON
-            with open(FAQS_FILE, 'w', encoding='utf-8') as f:
-                json.dump({"faqs": self.faqs}, f, ensure_ascii=False, indent=2)
+            if self.use_embeddings:
+                self.vector_store.persist()
+            self._maybe_compact_journal()
+        
+        return stats
+    
+    def _ingest_batch(self, batch: List[Dict], batch_size: int, stats: Dict):
+        """Aplica un lote de upserts sobre memoria, journal e índice vectorial"""
+        to_embed = []
+        journal = []
+        
+        for raw_faq in batch:
+            faq = self._normalize_faq(raw_faq)
+            position = self._faq_positions.get(faq['id'])
+            
+            if position is None:
+                # Primero la lista: un lector nunca ve una posición sin su FAQ
+                self.faqs.append(faq)
+                self._faq_positions[faq['id']] = len(self.faqs) - 1
+                to_embed.append(faq)
+                stats["added"] += 1
+            else:
+                current = self.faqs[position]
+                if current == faq:
+                    stats["unchanged"] += 1
+                    continue
+                if self._content_hash(current) != self._content_hash(faq):
+                    to_embed.append(faq)
+                self._question_ids.pop(self._question_key(current['question']), None)
+                self._normalized_question_ids.pop(normalize_query(current['question']), None)
+                self._unindex_category(current)
+                self.faqs[position] = faq
+                stats["updated"] += 1
+            
+            self._index_category(faq)
+            
+            self._question_ids[self._question_key(faq['question'])] = faq['id']
+            self._normalized_question_ids[normalize_query(faq['question'])] = faq['id']
+            self.lexical_index.add(faq['id'], faq)
+            journal.append({"op": "upsert", "faq": faq})
+        
+        # Primero el journal: si el embedding falla, el contenido ya es
+        # durable y la sincronización del próximo arranque lo indexa
+        self._append_journal(journal)
+        
+        if to_embed and self.use_embeddings:
+            self._embed_and_upsert(to_embed, batch_size)
+    
+    def _normalize_faq(self, raw_faq: Dict) -> Dict:
+        """Completa una FAQ de entrada con id, categoría y keywords"""
+        question = raw_faq['question'].strip()
+        faq_id = (
+            raw_faq.get('id')
+            or self._question_ids.get(self._question_key(question))
+            or self._new_faq_id()
+        )
+        return {
+            **raw_faq,
+            "id": faq_id,
+            "category": raw_faq.get('category', 'general'),
+            "question": question,
+            "answer": raw_faq['answer'].strip(),
+            "keywords": list(raw_faq.get('keywords', []))
+        }
+    
+    def remove_faqs(self, faq_ids: Iterable[str]) -> int:
+        """
+        Elimina FAQs de la base de conocimiento y del índice vectorial.
+        
+        Returns:
+            Número de FAQs eliminadas
+        """
+        with self._lock:
+            if self._replacement is not None:
+                return self._replacement.remove_faqs(faq_ids)
+            
+            ids = [faq_id for faq_id in dict.fromkeys(faq_ids)
+                   if faq_id in self._faq_positions]
+            if not ids:
+                return 0
+            
+            self._append_journal([{"op": "delete", "id": faq_id} for faq_id in ids])
+            
+            removed = set(ids)
+            next_faq_number = self._next_faq_number
+            self._reindex_faqs([faq for faq in self.faqs if faq['id'] not in removed])
+            # No reutilizar ids de FAQs eliminadas
+            self._next_faq_number = max(self._next_faq_number, next_faq_number)
+            
+            for faq_id in ids:
+                self.lexical_index.remove(faq_id)
             
-            # Si hay embeddings, indexar la nueva FAQ
             if self.use_embeddings:
-                text = f"{question} {answer}"
-                embedding = self.embedding_model.encode(text)
-                
-                self.collection.add(
-                    documents=[answer],
-                    embeddings=[embedding.tolist()],
-                    ids=[new_faq['id']],
-                    metadatas=[{
-                        'question': question,
-                        'category': category
-                    }]
-                )
+                self.vector_store.delete(ids)
+                self.vector_store.persist()
             
-            return True
-        except Exception as e:
-            print(f"Error al agregar FAQ: {e}")
-            return False
+            self._maybe_compact_journal()
+            return len(ids)
+    
+    def _append_journal(self, entries: List[Dict]):
+        """Agrega operaciones al journal y las sincroniza a disco"""
+        if not entries:
+            return
+        
+        with open(FAQS_JOURNAL_FILE, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        
+        self._journal_entries += len(entries)
+        self.content_version = self._fingerprint([self.content_version, entries])
+    
+    @staticmethod
+    def _fingerprint(data) -> str:
+        serialized = json.dumps(data, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()[:16]
+    
+    def _maybe_compact_journal(self):
+        if self._journal_entries >= FAQ_JOURNAL_COMPACT_THRESHOLD:
+            self.compact_journal()
+    
+    def compact_journal(self):
+        """
+        Reescribe faqs.json con el estado actual y vacía el journal.
+        
+        La escritura es atómica (archivo temporal + os.replace). Si el
+        proceso cae antes de borrar el journal, reaplicarlo es inocuo.
+        """
+        with self._lock:
+            if self._replacement is not None:
+                return self._replacement.compact_journal()
+            
+            tmp_path = f"{FAQS_FILE}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"faqs": self.faqs}, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, FAQS_FILE)
+            # Cambio propio: no debe disparar una recarga
+            self.source_signature = _file_signature(FAQS_FILE)
+            
+            if os.path.exists(FAQS_JOURNAL_FILE):
+                os.remove(FAQS_JOURNAL_FILE)
+            self._journal_entries = 0
+    
+    @property
+    def supports_hot_reload(self) -> bool:
+        """
+        True si se puede construir otra instancia mientras esta sirve.
+        
+        Con un almacén vectorial compartido (chroma) la instancia nueva
+        reindexaría la colección que esta sigue consultando.
+        """
+        return not self.use_embeddings or self.vector_store.supports_snapshots
     
     def get_statistics(self) -> Dict:
         """Obtiene estadísticas de la base de conocimiento"""
@@ -284,19 +986,191 @@ class KnowledgeBase:
             "total_faqs": len(self.faqs),
             "categories": categories,
             "categories_count": len(categories),
-            "rag_enabled": self.use_embeddings
+            "rag_enabled": self.use_embeddings,
+            "search_mode": self.resolve_search_mode(),
+            "journal_entries": self._journal_entries,
+            "content_version": self.content_version,
+            "documents": self.document_stats
         }
         
         if self.use_embeddings:
-            stats["embedding_model"] = "paraphrase-multilingual-mpnet-base-v2"
-            stats["embedding_dimensions"] = 768
-            stats["vector_db"] = "ChromaDB"
+            stats["embedding_backend"] = self.embedding_backend
+            stats["embedding_model"] = self.embedding_model_name
+            stats["embedding_dimensions"] = self.embedding_model.get_sentence_embedding_dimension()
+            stats["vector_db"] = self.vector_backend
+            stats["vector_count"] = self.vector_store.count()
+            stats["vector_memory_bytes"] = self.vector_store.memory_bytes()
+            stats["index_path"] = self.index_path
+            stats["index_sync"] = self.index_stats
+            stats["query_embedding_cache"] = self.query_embedding_cache.get_stats()
+            if self.query_encoder is not None:
+                stats["query_encoder"] = self.query_encoder.get_stats()
         
         return stats
 
 
+# Instancia compartida por proceso
+_shared_knowledge_base: Optional[KnowledgeBase] = None
+_shared_knowledge_base_lock = threading.Lock()
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    """
+    Obtiene la KnowledgeBase compartida del proceso.
+    
+    Se construye una sola vez (carga de FAQs, modelo de embeddings e
+    indexación) y la reutilizan el agente, las herramientas y la API.
+    Es segura para llamarse desde varios hilos a la vez.
+    """
+    global _shared_knowledge_base
+    
+    if _shared_knowledge_base is None:
+        with _shared_knowledge_base_lock:
+            # Doble verificación: otro hilo pudo construirla mientras esperábamos
+            if _shared_knowledge_base is None:
+                _shared_knowledge_base = KnowledgeBase()
+    
+    return _shared_knowledge_base
+
+
+def reset_knowledge_base() -> None:
+    """Descarta la instancia compartida (la siguiente llamada la reconstruye)"""
+    global _shared_knowledge_base
+    
+    with _shared_knowledge_base_lock:
+        _shared_knowledge_base = None
+
+
+_reload_lock = threading.Lock()
+
+
+def reload_knowledge_base() -> KnowledgeBase:
+    """
+    Recarga faqs.json sin downtime.
+    
+    Construye una KnowledgeBase nueva reutilizando el modelo de embeddings
+    y el índice persistido (solo se embeben las FAQs nuevas o modificadas)
+    y la publica con un único reemplazo de referencia. Las búsquedas en
+    curso terminan sobre la instancia anterior, que sigue intacta.
+    
+    Las escrituras sobre la instancia anterior quedan bloqueadas durante
+    la reconstrucción y después se redirigen a la nueva.
+    
+    Raises:
+        ValueError / OSError: si faqs.json no se puede leer; la instancia
+        actual sigue sirviendo.
+        RuntimeError: si el backend vectorial no admite recarga en caliente
+        (chroma); hay que reiniciar el proceso.
+    """
+    global _shared_knowledge_base
+    
+    with _reload_lock:
+        current = _shared_knowledge_base
+        if current is None:
+            return get_knowledge_base()
+        if not current.supports_hot_reload:
+            raise RuntimeError(
+                f"El backend vectorial '{current.vector_backend}' no admite recarga en caliente"
+            )
+        
+        # Validar antes de construir: un archivo a medio escribir no debe
+        # reemplazar la base por una vacía
+        _read_faqs_file()
+        
+        with current._lock:
+            fresh = KnowledgeBase(
+                use_embeddings=current.use_embeddings,
+                vector_backend=current.vector_backend,
+                embedding_model=getattr(current, 'embedding_model', None),
+                docs_dir=current.docs_dir,
+                embedding_backend=current.embedding_backend,
+                # Mismo modelo: el worker de micro-batching y los hilos de
+                # búsqueda se reutilizan en vez de acumularse en cada recarga
+                query_encoder=current.query_encoder,
+                search_executor=current._search_executor
+            )
+            # Los embeddings de queries siguen siendo válidos
+            fresh.query_embedding_cache = current.query_embedding_cache
+            
+            with _shared_knowledge_base_lock:
+                _shared_knowledge_base = fresh
+            current._replacement = fresh
+        
+        return fresh
+
+
+class KnowledgeBaseWatcher(threading.Thread):
+    """
+    Hilo que vigila faqs.json (polling de mtime/tamaño) y recarga la base
+    compartida cuando cambia.
+    """
+    
+    def __init__(self, interval_seconds: float = FAQ_RELOAD_INTERVAL_SECONDS):
+        super().__init__(name="kb-watcher", daemon=True)
+        self.interval_seconds = interval_seconds
+        self.reloads = 0
+        self._stop_event = threading.Event()
+        self._failed_signature = None
+    
+    def run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            self.check()
+    
+    def check(self) -> bool:
+        """Recarga si faqs.json cambió; devuelve True si hubo recarga"""
+        kb = _shared_knowledge_base
+        signature = _file_signature(FAQS_FILE)
+        if kb is None or signature is None or signature in (kb.source_signature, self._failed_signature):
+            return False
+        
+        print("🔄 faqs.json cambió, recargando base de conocimiento...")
+        try:
+            fresh = reload_knowledge_base()
+        except Exception as e:
+            # No reintentar hasta que el archivo vuelva a cambiar
+            self._failed_signature = signature
+            print(f"❌ Error al recargar FAQs, se mantiene la versión actual: {e}")
+            return False
+        
+        self.reloads += 1
+        print(f"✅ Base de conocimiento recargada ({len(fresh.faqs)} FAQs)")
+        return True
+    
+    def stop(self):
+        self._stop_event.set()
+
+
+_watcher: Optional[KnowledgeBaseWatcher] = None
+
+
+def start_knowledge_base_watcher(interval_seconds: float = FAQ_RELOAD_INTERVAL_SECONDS) -> Optional[KnowledgeBaseWatcher]:
+    """
+    Inicia (una sola vez) el watcher de faqs.json; interval_seconds <= 0 lo
+    deshabilita. No se inicia si la base compartida no admite recarga en
+    caliente (backend chroma).
+    """
+    global _watcher
+    
+    if interval_seconds <= 0:
+        return None
+    kb = get_knowledge_base()
+    if not kb.supports_hot_reload:
+        print(f"⚠️  Recarga en caliente de FAQs deshabilitada con el backend '{kb.vector_backend}'")
+        return None
+    with _reload_lock:
+        if _watcher is None:
+            _watcher = KnowledgeBaseWatcher(interval_seconds)
+            _watcher.start()
+    return _watcher
+
+
+# Nombre del método reportado por la herramienta para cada modo de búsqueda
+SEARCH_METHODS = {"semantic": "embeddings", "lexical": "keywords", "hybrid": "hybrid"}
+
+
 # Herramienta para búsqueda en la base de conocimiento
-def search_knowledge_base(query: str) -> Dict:
+def search_knowledge_base(query: str, kb: Optional[KnowledgeBase] = None,
+                          categories: Optional[List[str]] = None) -> Dict:
     """
     Tool: search_knowledge_base
     
@@ -309,13 +1183,17 @@ def search_knowledge_base(query: str) -> Dict:
     
     Entradas esperadas:
     - query (str): Pregunta o términos de búsqueda del usuario
+    - kb (KnowledgeBase, opcional): Instancia a usar; por defecto la
+      compartida del proceso (get_knowledge_base)
+    - categories (list, opcional): Limitar la búsqueda a estas categorías
     
     Salida esperada:
     {
         "success": bool,
-        "results": str (texto formateado con las FAQs relevantes),
+        "results": List[SearchResult] (FAQs relevantes, de mayor a menor
+                   score; se formatean con format_results),
         "count": int (número de resultados encontrados),
-        "method": str ("embeddings" o "keywords")
+        "method": str ("embeddings", "keywords" o "hybrid")
     }
     
     Posibles errores:
@@ -323,8 +1201,9 @@ def search_knowledge_base(query: str) -> Dict:
     - SERVICE_ERROR: Error al buscar en la base de datos
     """
     try:
-        kb = KnowledgeBase()
-        results = kb.search(query)
+        if kb is None:
+            kb = get_knowledge_base()
+        results = kb.retrieve(query, categories=categories)
         
         if not results:
             return {
@@ -332,14 +1211,14 @@ def search_knowledge_base(query: str) -> Dict:
                 "error": "NO_RESULTS",
                 "message": "No encontré información sobre eso en mi base de conocimiento",
                 "count": 0,
-                "method": "embeddings" if kb.use_embeddings else "keywords"
+                "method": SEARCH_METHODS[kb.resolve_search_mode()]
             }
         
         return {
             "success": True,
             "results": results,
-            "count": len(results.split('\n\n')),
-            "method": "embeddings" if kb.use_embeddings else "keywords"
+            "count": len(results),
+            "method": SEARCH_METHODS[kb.resolve_search_mode()]
         }
         
     except Exception as e:
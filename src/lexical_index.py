@@ -0,0 +1,159 @@
+"""
+Índice invertido con ranking BM25 para la búsqueda por keywords.
+"""
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+from src.normalization import fold_accents
+
+_TOKEN = re.compile(r'[a-z0-9ñ]+')
+
+# Palabras vacías frecuentes (ya sin tildes); no aportan al ranking
+SPANISH_STOPWORDS = frozenset("""
+a al algo como con cual cuales de del desde donde el ella en es esa ese esta
+este esto hay la las le les lo los me mi mis mas muy no nos o para pero por que
+se si sin sobre son su sus te tengo tiene tu un una uno unos unas y ya yo
+""".split())
+
+
+def light_stem(token: str) -> str:
+    """
+    Stemmer ligero para español: quita el plural y la vocal final.
+
+    Es deliberadamente conservador (no intenta derivaciones): agrupa
+    "tarjeta"/"tarjetas" y "comisión"/"comisiones" sin mezclar palabras
+    de significado distinto.
+    """
+    if len(token) > 4 and token.endswith('es') and token[-3] in 'lnrsdzj':
+        token = token[:-2]
+        # "intereses" -> "interes" -> "inter", igual que "interés"
+        if len(token) > 4 and token.endswith('es') and token[-3] in 'lnrdzj':
+            token = token[:-2]
+    elif len(token) > 3 and token.endswith('s') and token[-2] in 'aeiou':
+        token = token[:-1]
+
+    if len(token) > 4 and token[-1] in 'aeo':
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens normalizados (minúsculas, sin tildes, sin stopwords y con stem)"""
+    # La ñ se conserva: "año" y "ano" no son la misma palabra
+    text = text.casefold().replace('ñ', '\0')
+    text = fold_accents(text).replace('\0', 'ñ')
+    return [
+        light_stem(token) for token in _TOKEN.findall(text)
+        if token not in SPANISH_STOPWORDS
+    ]
+
+
+class BM25Index:
+    """
+    Índice invertido con ranking BM25 sobre documentos con varios campos.
+
+    Cada campo aporta sus términos ponderado por `field_weights` (por
+    ejemplo, las keywords curadas pesan más que la respuesta). El índice
+    admite altas, reemplazos y bajas incrementales; una búsqueda solo
+    recorre las listas de postings de los términos de la query.
+    """
+
+    def __init__(self, field_weights: Dict[str, float], k1: float = 1.2, b: float = 0.75):
+        self.field_weights = field_weights
+        self.k1 = k1
+        self.b = b
+        # término -> {doc_id: frecuencia ponderada}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        # doc_id -> {término: frecuencia ponderada}, para poder dar de baja
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_lengths: Dict[str, float] = {}
+        self._total_length = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_terms
+
+    def _document_terms(self, document: Dict) -> Dict[str, float]:
+        terms: Dict[str, float] = {}
+        for field, weight in self.field_weights.items():
+            value = document.get(field) or ""
+            if not isinstance(value, str):
+                value = " ".join(value)
+            for term, count in Counter(tokenize(value)).items():
+                terms[term] = terms.get(term, 0.0) + weight * count
+        return terms
+
+    def add(self, doc_id: str, document: Dict):
+        """Indexa (o reemplaza) un documento"""
+        terms = self._document_terms(document)
+        with self._lock:
+            self._remove(doc_id)
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = frequency
+            self._doc_terms[doc_id] = terms
+            length = sum(terms.values())
+            self._doc_lengths[doc_id] = length
+            self._total_length += length
+
+    def add_many(self, documents: Iterable[Tuple[str, Dict]]):
+        for doc_id, document in documents:
+            self.add(doc_id, document)
+
+    def remove(self, doc_id: str):
+        """Da de baja un documento (no hace nada si no existe)"""
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+
+    def search(self, query: str, top_k: int,
+               ids: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Top-k documentos por BM25 como [(doc_id, score)].
+
+        Con `ids` solo se puntúan esos documentos (búsqueda filtrada); las
+        estadísticas de BM25 siguen siendo las del corpus completo.
+        """
+        query_terms = set(tokenize(query))
+        if ids is not None and not isinstance(ids, (set, frozenset, dict)):
+            ids = set(ids)
+
+        with self._lock:
+            total_docs = len(self._doc_terms)
+            if not total_docs or not query_terms:
+                return []
+
+            avg_length = self._total_length / total_docs
+            scores: Dict[str, float] = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+
+                df = len(postings)
+                idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                for doc_id, frequency in postings.items():
+                    if ids is not None and doc_id not in ids:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + (
+                        idf * frequency * (self.k1 + 1) / (frequency + norm)
+                    )
+
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
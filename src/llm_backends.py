@@ -0,0 +1,193 @@
+"""
+Backends del LLM del agente.
+
+Todos cumplen el contrato de genai.GenerativeModel que usa LLMClient:
+- async generate_content_async(prompt, stream=False): con stream=True
+  devuelve un iterable async de chunks; cada chunk (y la respuesta sin
+  stream) expone el texto en `.text`
+- name: identifica el modelo (logs y métricas)
+
+Backends disponibles (LLM_BACKEND):
+- "gemini": Google Gemini (MODEL_NAME), requiere GEMINI_API_KEY
+- "fake": modelo local con guion y latencias simuladas; no usa la red,
+  así el agente, la API y el pipeline de voz se pueden someter a pruebas
+  de carga o correr en CI
+"""
+import asyncio
+import json
+import random
+import re
+from types import SimpleNamespace
+from typing import AsyncIterator, Callable, Dict, Optional
+
+from config.settings import (
+    MODEL_NAME,
+    MODEL_TEMPERATURE,
+    MODEL_MAX_TOKENS,
+    FAKE_LLM_LATENCY_MS,
+    FAKE_LLM_LATENCY_SIGMA,
+    FAKE_LLM_CHUNK_MS,
+    FAKE_LLM_CHUNK_CHARS,
+    FAKE_LLM_RESPONSE_CHARS,
+    FAKE_LLM_ERROR_RATE
+)
+
+try:
+    import google.generativeai as genai
+    GENAI_AVAILABLE = True
+except ImportError:
+    GENAI_AVAILABLE = False
+
+LLM_BACKENDS = ("gemini", "fake")
+
+
+class GeminiBackend:
+    """Google Gemini vía google-generativeai"""
+
+    def __init__(self, api_key: str, model_name: str = MODEL_NAME):
+        genai.configure(api_key=api_key)
+        self.name = model_name
+        self.model = genai.GenerativeModel(
+            model_name,
+            generation_config={
+                "temperature": MODEL_TEMPERATURE,
+                "top_p": 0.95,
+                "top_k": 40,
+                "max_output_tokens": MODEL_MAX_TOKENS,
+            }
+        )
+
+    async def generate_content_async(self, prompt, stream: bool = False):
+        return await self.model.generate_content_async(prompt, stream=stream)
+
+
+# Lo que el system prompt pide responder con una herramienta
+_DOCUMENT_ID = re.compile(r'\b(\d{10})\b')
+_OTP_CODE = re.compile(r'\b(\d{6})\b')
+_PERSONAL_TOOLS = (
+    ("saldo", "get_account_balance"),
+    ("movimiento", "get_account_movements"),
+    ("tarjeta", "get_card_info"),
+    ("póliza", "get_policy_info"),
+    ("poliza", "get_policy_info"),
+)
+_FILLER = (
+    "Te explico con gusto los detalles más importantes para que puedas "
+    "decidir con tranquilidad, y si necesitas algo más aquí estoy. "
+)
+
+
+class FakeLLM:
+    """
+    Modelo local determinista para pruebas de carga y CI.
+
+    La respuesta depende solo del prompt, imitando lo que pide el system
+    prompt: una llamada a authenticate_user si el último mensaje trae
+    cédula y código, la herramienta personal que corresponde si el
+    usuario ya está autenticado, o un texto de `response_chars`
+    caracteres en otro caso.
+
+    La latencia del primer chunk sigue una distribución log-normal de
+    mediana `latency_ms` y dispersión `latency_sigma` (0 = constante), o
+    la que devuelva `latency_fn()` en ms; luego cada chunk de
+    `chunk_chars` caracteres tarda `chunk_ms`. Con `error_rate` > 0 esa
+    fracción de llamadas falla con ConnectionError (error transitorio).
+    """
+
+    def __init__(self, latency_ms: float = FAKE_LLM_LATENCY_MS,
+                 latency_sigma: float = FAKE_LLM_LATENCY_SIGMA,
+                 chunk_ms: float = FAKE_LLM_CHUNK_MS,
+                 chunk_chars: int = FAKE_LLM_CHUNK_CHARS,
+                 response_chars: int = FAKE_LLM_RESPONSE_CHARS,
+                 error_rate: float = FAKE_LLM_ERROR_RATE,
+                 tool_calls: bool = True,
+                 latency_fn: Optional[Callable[[], float]] = None,
+                 seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.chunk_ms = chunk_ms
+        self.chunk_chars = max(1, chunk_chars)
+        self.response_chars = response_chars
+        self.error_rate = error_rate
+        self.tool_calls = tool_calls
+        self.latency_fn = latency_fn
+        self.random = random.Random(seed)
+        self.name = f"fake-{latency_ms:g}ms"
+        self.calls = 0
+
+    def sample_latency(self) -> float:
+        """Latencia del primer chunk en segundos"""
+        if self.latency_fn is not None:
+            return max(0.0, self.latency_fn()) / 1000
+        if self.latency_sigma <= 0:
+            return self.latency_ms / 1000
+        return self.random.lognormvariate(0.0, self.latency_sigma) * self.latency_ms / 1000
+
+    def respond(self, prompt: str) -> str:
+        """Texto completo de la respuesta al prompt"""
+        message = prompt.rsplit("\nUsuario: ", 1)[-1].rsplit("\nAsistente:", 1)[0].strip()
+        lowered = message.lower()
+
+        if self.tool_calls:
+            document_id = _DOCUMENT_ID.search(message)
+            otp_code = _OTP_CODE.search(message)
+            if document_id and otp_code:
+                return self._tool_call("authenticate_user", {
+                    "document_id": document_id.group(1),
+                    "otp_code": otp_code.group(1)
+                })
+            if "ESTADO: Usuario autenticado" in prompt:
+                for keyword, tool_name in _PERSONAL_TOOLS:
+                    if keyword in lowered:
+                        return self._tool_call(tool_name, {})
+
+        text = f"Con gusto te ayudo con tu consulta: «{message[:80]}». "
+        while len(text) < self.response_chars:
+            text += _FILLER
+        return text[:self.response_chars].rstrip()
+
+    @staticmethod
+    def _tool_call(tool_name: str, parameters: Dict) -> str:
+        return json.dumps({
+            "action": "call_tool",
+            "tool_name": tool_name,
+            "parameters": parameters
+        }, ensure_ascii=False, indent=2)
+
+    async def generate_content_async(self, prompt, stream: bool = False):
+        self.calls += 1
+        latency = self.sample_latency()
+        failed = self.error_rate > 0 and self.random.random() < self.error_rate
+        text = self.respond(str(prompt))
+
+        if stream:
+            return self._stream(text, latency, failed)
+        await asyncio.sleep(latency + self.chunk_ms / 1000 * (len(text) // self.chunk_chars))
+        if failed:
+            raise ConnectionError("Fallo simulado del LLM")
+        return SimpleNamespace(text=text)
+
+    async def _stream(self, text: str, latency: float, failed: bool) -> AsyncIterator:
+        await asyncio.sleep(latency)
+        if failed:
+            raise ConnectionError("Fallo simulado del LLM")
+        for i in range(0, len(text), self.chunk_chars):
+            if i:
+                await asyncio.sleep(self.chunk_ms / 1000)
+            yield SimpleNamespace(text=text[i:i + self.chunk_chars])
+
+
+def create_llm_backend(backend: str, api_key: Optional[str] = None, **options):
+    """Crea el backend del LLM configurado (ver LLM_BACKENDS)"""
+    if backend == "gemini":
+        if not GENAI_AVAILABLE:
+            raise ImportError("google-generativeai no está instalado")
+        if not api_key:
+            raise ValueError("El backend gemini requiere GEMINI_API_KEY")
+        return GeminiBackend(api_key, **options)
+    if backend == "fake":
+        return FakeLLM(**options)
+    raise ValueError(
+        f"Backend de LLM desconocido: {backend!r} "
+        f"(opciones: {', '.join(LLM_BACKENDS)})"
+    )
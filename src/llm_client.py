@@ -0,0 +1,324 @@
+"""
+Cliente de llamadas al LLM con control de concurrencia y de latencia.
+
+Envuelve el modelo (genai.GenerativeModel o cualquier objeto con
+`generate_content_async(prompt, stream=True)`) y agrega:
+- un semáforo que limita las llamadas en vuelo del proceso (válido desde
+  cualquier event loop: el motor se usa desde el loop de la API y desde el
+  loop de fondo de process_message)
+- un plazo total por llamada y otro para el primer chunk de cada intento
+- reintentos de errores transitorios con backoff exponencial con jitter
+- hedging opcional: si el primer chunk tarda más que el p95 observado,
+  una segunda request compite con la primera y se usa la más rápida
+- métricas de latencia por llamada (primer chunk y total)
+
+Los reintentos y el hedging solo actúan antes del primer chunk: una vez
+que el texto empezó a llegar al cliente no se puede reemplazar.
+"""
+import asyncio
+import random
+import threading
+from collections import deque
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from config.settings import (
+    LLM_MAX_CONCURRENCY,
+    LLM_TIMEOUT_SECONDS,
+    LLM_FIRST_CHUNK_TIMEOUT_SECONDS,
+    LLM_RETRY_ATTEMPTS,
+    LLM_RETRY_BACKOFF_SECONDS,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_MIN_SAMPLES
+)
+from src.metrics import percentile, percentile_ms
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    TRANSIENT_ERRORS: Tuple[type, ...] = (
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.DeadlineExceeded,
+    )
+except ImportError:
+    TRANSIENT_ERRORS = ()
+
+TRANSIENT_ERRORS += (asyncio.TimeoutError, ConnectionError)
+
+
+class LLMTimeoutError(asyncio.TimeoutError):
+    """La llamada al LLM superó su plazo total"""
+
+
+class _ConcurrencyLimiter:
+    """
+    Semáforo async no ligado a un event loop.
+
+    asyncio.Semaphore queda asociado al primer loop que espera en él, y el
+    mismo LLMClient se usa desde varios loops (el de la API y el de fondo
+    de _run_sync). Aquí cada espera es un future de su propio loop y
+    release() lo despierta con call_soon_threadsafe, así el límite es
+    global al proceso. Los cupos liberados pasan en orden de llegada.
+    """
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters: deque = deque()
+        self._lock = threading.Lock()
+
+    def locked(self) -> bool:
+        return self._value == 0
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter not in self._waiters
+                if not granted:
+                    self._waiters.remove(waiter)
+            # Si el cupo ya se entregó (y no lo devolverá _grant), se pasa
+            if granted and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                try:
+                    waiter.get_loop().call_soon_threadsafe(self._grant, waiter)
+                    return
+                except RuntimeError:
+                    # Loop ya cerrado: el cupo pasa al siguiente
+                    continue
+            self._value += 1
+
+    def _grant(self, waiter: asyncio.Future):
+        if waiter.cancelled():
+            self.release()
+        else:
+            waiter.set_result(None)
+
+
+class LLMClient:
+    """
+    Llamadas en streaming al LLM con límites de concurrencia y plazos.
+
+    `stream(prompt)` produce los chunks de texto de la respuesta. Es un
+    generador async: el llamador debe cerrarlo (contextlib.aclosing) si
+    deja de leer antes del final, para liberar el cupo del semáforo.
+    """
+
+    def __init__(self, model, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 timeout_seconds: float = LLM_TIMEOUT_SECONDS,
+                 first_chunk_timeout_seconds: float = LLM_FIRST_CHUNK_TIMEOUT_SECONDS,
+                 retry_attempts: int = LLM_RETRY_ATTEMPTS,
+                 retry_backoff_seconds: float = LLM_RETRY_BACKOFF_SECONDS,
+                 hedge: bool = LLM_HEDGE_ENABLED,
+                 hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+                 history_size: int = 1024):
+        self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout_seconds
+        self.first_chunk_timeout = first_chunk_timeout_seconds
+        self.retry_attempts = max(0, retry_attempts)
+        self.retry_backoff = retry_backoff_seconds
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self._semaphore = _ConcurrencyLimiter(self.max_concurrency)
+        # Métricas (las listas recientes alimentan los percentiles)
+        self.calls = 0
+        self.in_flight = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._first_chunk_times: deque = deque(maxlen=history_size)
+        self._total_times: deque = deque(maxlen=history_size)
+
+    async def stream(self, prompt) -> AsyncIterator[str]:
+        """Chunks de texto de la respuesta del LLM a `prompt`"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.timeout
+        self.calls += 1
+
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self._remaining(deadline))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise LLMTimeoutError("Sin cupo para llamar al LLM dentro del plazo")
+
+        self.in_flight += 1
+        chunks = None
+        try:
+            first, chunks = await self._open_with_retries(prompt, deadline)
+            self._first_chunk_times.append(loop.time() - started)
+            yield first.text
+
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), self._remaining(deadline))
+                except StopAsyncIteration:
+                    break
+                yield chunk.text
+            self._total_times.append(loop.time() - started)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise LLMTimeoutError("El LLM no respondió dentro del plazo")
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            if chunks is not None:
+                # Si el llamador dejó de leer, cerrar la respuesta HTTP
+                await _aclose(chunks)
+
+    def _remaining(self, deadline: float) -> float:
+        return max(0.0, deadline - asyncio.get_running_loop().time())
+
+    async def _open_with_retries(self, prompt, deadline: float):
+        """(primer chunk, iterador del resto), reintentando errores transitorios"""
+        attempt = 0
+        while True:
+            try:
+                return await self._open_hedged(prompt, deadline)
+            except TRANSIENT_ERRORS:
+                # Backoff exponencial con jitter completo: los clientes que
+                # fallaron juntos no reintentan todos a la vez
+                delay = random.uniform(0, self.retry_backoff * 2 ** attempt)
+                if attempt >= self.retry_attempts or delay >= self._remaining(deadline):
+                    raise
+                attempt += 1
+                self.retries += 1
+                await asyncio.sleep(delay)
+
+    async def _open(self, prompt, deadline: float):
+        """Un intento: abre el stream y espera su primer chunk"""
+        timeout = min(self.first_chunk_timeout, self._remaining(deadline))
+
+        async def first_chunk():
+            response = await self.model.generate_content_async(prompt, stream=True)
+            chunks = response.__aiter__()
+            try:
+                first = await chunks.__anext__()
+            except StopAsyncIteration:
+                raise ConnectionError("El LLM cerró el stream sin responder")
+            except BaseException:
+                # Cancelado (plazo o hedging) o fallido: cerrar la respuesta
+                await _aclose(chunks)
+                raise
+            return first, chunks
+
+        return await asyncio.wait_for(first_chunk(), timeout)
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge or len(self._first_chunk_times) < self.hedge_min_samples:
+            return None
+        return percentile(sorted(self._first_chunk_times), 0.95)
+
+    async def _open_hedged(self, prompt, deadline: float):
+        delay = self._hedge_delay()
+        primary = asyncio.ensure_future(self._open(prompt, deadline))
+        if delay is None:
+            return await primary
+
+        try:
+            await asyncio.wait_for(asyncio.shield(primary), delay)
+        except asyncio.TimeoutError:
+            pass
+        if primary.done():
+            return primary.result()
+        # Con el semáforo agotado no se agrega carga: se espera al primero
+        if self._semaphore.locked():
+            return await primary
+
+        # El cupo puede tomarlo otro loop entre locked() y acquire(): se
+        # espera a lo sumo hasta el plazo y mientras el primero no responda
+        acquire = asyncio.ensure_future(self._semaphore.acquire())
+        await asyncio.wait({primary, acquire}, timeout=self._remaining(deadline),
+                           return_when=asyncio.FIRST_COMPLETED)
+        if primary.done() or not acquire.done():
+            acquire.cancel()
+            await asyncio.wait({acquire})
+            # Cancelado, acquire() ya devolvió el cupo si se lo habían dado
+            if not acquire.cancelled():
+                self._semaphore.release()
+            return await primary
+
+        self.hedges += 1
+        hedge = asyncio.ensure_future(self._open(prompt, deadline))
+        winner = None
+        try:
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    if winner is hedge:
+                        self.hedge_wins += 1
+                    return winner.result()
+            # Ambos fallaron: se propaga el error de la request original
+            return primary.result()
+        finally:
+            try:
+                for task in (primary, hedge):
+                    if task is not winner:
+                        await _discard(task)
+            finally:
+                self._semaphore.release()
+
+    def get_stats(self) -> Dict:
+        """Llamadas, errores, reintentos, hedging y latencias (ms)"""
+        first_chunk = sorted(self._first_chunk_times)
+        total = sorted(self._total_times)
+        return {
+            "calls": self.calls,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "first_chunk_ms_p50": percentile_ms(first_chunk, 0.50),
+            "first_chunk_ms_p95": percentile_ms(first_chunk, 0.95),
+            "first_chunk_ms_p99": percentile_ms(first_chunk, 0.99),
+            "total_ms_p50": percentile_ms(total, 0.50),
+            "total_ms_p95": percentile_ms(total, 0.95),
+            "total_ms_p99": percentile_ms(total, 0.99),
+        }
+
+
+async def _aclose(chunks):
+    """Cierra el iterador de chunks de una respuesta (si se puede cerrar)"""
+    aclose = getattr(chunks, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+async def _discard(task: "asyncio.Future"):
+    """
+    Descarta un intento que perdió el hedging: lo cancela si sigue en curso
+    y, si alcanzó a abrir su stream, lo cierra.
+    """
+    if not task.done():
+        task.cancel()
+    # wait (a diferencia de await) no relanza la cancelación de la tarea
+    await asyncio.wait({task})
+    if task.cancelled() or task.exception() is not None:
+        return
+    await _aclose(task.result()[1])
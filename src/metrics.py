@@ -0,0 +1,17 @@
+"""
+Percentiles de latencia compartidos por las métricas de get_stats().
+"""
+from typing import List
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentil `fraction` (0-1) de una lista ordenada y no vacía"""
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def percentile_ms(sorted_values: List[float], fraction: float) -> float:
+    """percentile() de latencias en segundos, en ms (0.0 sin muestras)"""
+    if not sorted_values:
+        return 0.0
+    return round(1000 * percentile(sorted_values, fraction), 3)
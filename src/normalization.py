@@ -0,0 +1,25 @@
+"""
+Normalización de texto compartida por cachés e índices.
+"""
+import re
+import unicodedata
+
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def fold_accents(text: str) -> str:
+    """Elimina tildes y diacríticos ("cuánto" -> "cuanto", "año" -> "ano")"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def normalize_query(text: str) -> str:
+    """
+    Forma canónica de una consulta para usarla como clave.
+    
+    Pasa a minúsculas (casefold), elimina tildes, reemplaza la puntuación
+    por espacios y colapsa los espacios:
+    "¿Cómo   ABRIR una cuenta?" -> "como abrir una cuenta"
+    """
+    text = fold_accents(text.casefold())
+    return _NON_WORD.sub(' ', text).strip()
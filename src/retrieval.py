@@ -0,0 +1,101 @@
+"""
+Tipos y fusión de resultados de búsqueda (léxica, semántica e híbrida).
+"""
+import heapq
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Modos de búsqueda de KnowledgeBase.search
+SEARCH_MODES = ("lexical", "semantic", "hybrid")
+
+
+@dataclass
+class SearchHit:
+    """
+    Documento recuperado con su score final y el de cada fuente.
+
+    `scores` guarda el score original por fuente ("lexical" = BM25,
+    "semantic" = similitud coseno); en modo híbrido `score` es el
+    score RRF de la fusión.
+    """
+    id: str
+    score: float
+    scores: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class SearchResult:
+    """
+    FAQ o fragmento de documento recuperado, listo para formatear en el
+    borde (prompt, API...).
+
+    Para un fragmento, `question` es su ruta de encabezados, `answer` su
+    texto y `source` el documento de origen (None para las FAQs).
+    """
+    id: str
+    question: str
+    answer: str
+    category: Optional[str]
+    score: float
+    scores: Dict[str, float] = field(default_factory=dict)
+    source: Optional[str] = None
+
+
+def passes_min_scores(hit: SearchHit, min_scores: Dict[str, float]) -> bool:
+    """
+    Un resultado se conserva si alguna de sus fuentes alcanza su score
+    mínimo (cada fuente tiene su propia escala: coseno, BM25...).
+    """
+    return any(
+        score >= min_scores.get(source, float('-inf'))
+        for source, score in hit.scores.items()
+    )
+
+
+def format_results(results: Iterable[SearchResult], max_chars: Optional[int] = None) -> str:
+    """
+    Formatea resultados como texto markdown para el prompt.
+
+    Con `max_chars` se agregan resultados (en orden de relevancia) hasta
+    agotar el presupuesto; si ni el primero cabe completo, se recorta su
+    respuesta.
+    """
+    blocks: List[str] = []
+    used = 0
+    for result in results:
+        block = f"**{result.question}**\n{result.answer}"
+        separator = 2 if blocks else 0
+        if max_chars is not None and used + separator + len(block) > max_chars:
+            if not blocks and max_chars > 0:
+                blocks.append(block[:max(0, max_chars - 1)].rstrip() + "…")
+            break
+        blocks.append(block)
+        used += separator + len(block)
+
+    return "\n\n".join(blocks)
+
+
+def hits_from_source(source: str, ranking: List[Tuple[str, float]]) -> List[SearchHit]:
+    """Convierte un ranking [(id, score)] de una sola fuente en SearchHits"""
+    return [SearchHit(item_id, score, {source: score}) for item_id, score in ranking]
+
+
+def reciprocal_rank_fusion(rankings: Dict[str, List[Tuple[str, float]]],
+                           top_k: int, k: int = 60) -> List[SearchHit]:
+    """
+    Fusiona rankings de varias fuentes con Reciprocal Rank Fusion.
+
+    Cada documento suma 1 / (k + posición) por cada ranking en el que
+    aparece. Solo usa posiciones, así que no hace falta calibrar entre sí
+    scores de escalas distintas (BM25 vs coseno).
+    """
+    fused: Dict[str, SearchHit] = {}
+    for source, ranking in rankings.items():
+        for rank, (item_id, score) in enumerate(ranking, 1):
+            hit = fused.get(item_id)
+            if hit is None:
+                hit = fused[item_id] = SearchHit(item_id, 0.0)
+            hit.score += 1.0 / (k + rank)
+            hit.scores[source] = score
+
+    return heapq.nlargest(top_k, fused.values(), key=lambda hit: hit.score)
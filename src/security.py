@@ -284,4 +284,47 @@ class SecurityManager:
             "authenticated": session["authenticated"],
             "minutes_remaining": int(time_remaining.total_seconds() / 60),
             "last_activity": session["last_activity"].strftime("%H:%M:%S")
-        }
\ No newline at end of file
+        }
+
+class StreamSanitizer:
+    """
+    Aplica SecurityManager.sanitize_output a un texto que llega por partes.
+    
+    Un número de cuenta o un monto puede quedar partido entre dos chunks
+    ("Tu cuenta 12345" + "67890"), así que se retiene la cola que todavía
+    podría crecer hasta formar uno: el tramo final de dígitos, espacios y
+    signos [$,.-]. Todo patrón sensible está hecho solo de esos
+    caracteres, de modo que ninguno cruza el corte y lo emitido coincide
+    con sanitizar la respuesta completa de una vez.
+    """
+    
+    _OPEN_TAIL = re.compile(r'[\d\s,.$-]*\Z')
+    
+    def __init__(self, security: SecurityManager, authenticated: bool):
+        self.security = security
+        self.authenticated = authenticated
+        self.text = ""  # texto sanitizado emitido hasta ahora
+        self._raw = ""
+        self._cut = 0  # hasta dónde de _raw ya se emitió
+    
+    def feed(self, chunk: str) -> str:
+        """Agrega un chunk y devuelve la parte sanitizada que ya es definitiva"""
+        self._raw += chunk
+        tail = self._OPEN_TAIL.search(self._raw, self._cut)
+        return self._emit(tail.start())
+    
+    def flush(self) -> str:
+        """Fin del texto: devuelve lo retenido (sin espacios finales)"""
+        return self._emit(len(self._raw.rstrip()))
+    
+    def _emit(self, cut: int) -> str:
+        if cut <= self._cut:
+            return ""
+        # El carácter anterior al tramo nuevo da el contexto de los \b de
+        # los patrones; nunca forma parte de una coincidencia
+        start = max(0, self._cut - 1)
+        sanitized = self.security.sanitize_output(self._raw[start:cut], self.authenticated)
+        piece = sanitized[self._cut - start:]
+        self._cut = cut
+        self.text += piece
+        return piece
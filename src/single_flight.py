@@ -0,0 +1,117 @@
+"""
+Coalescencia de turnos idénticos en vuelo (single-flight).
+
+Cuando muchos usuarios hacen la misma consulta general a la vez (p. ej.
+tras una campaña), solo el primero (el líder) la resuelve: recuperación
+y llamada al LLM. Los demás (seguidores) reciben los mismos chunks a
+medida que el líder los genera, en lugar de iniciar su propia
+computación. Una vez terminada, las repeticiones las atiende la caché de
+respuestas (src/cache.py).
+
+El líder puede descartar el vuelo (finish(shared=False)) si su
+respuesta no sirve a los demás, p. ej. si el LLM pidió una herramienta,
+cuyo resultado depende de la sesión de cada conversación.
+"""
+import asyncio
+import threading
+from typing import AsyncIterator, Dict, Hashable, List, Tuple
+
+
+class Flight:
+    """Una computación en vuelo: los chunks que emitió y cómo terminó"""
+
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.pieces: List[str] = []
+        self.done = False
+        # False: el resultado no sirve a los seguidores, que deben resolver
+        # el turno por su cuenta
+        self.shared = True
+        # El líder terminó con un error técnico (que también se comparte)
+        self.failed = False
+        self.followers = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def text(self) -> str:
+        return "".join(self.pieces)
+
+    def publish(self, piece: str):
+        if self.done or not self.shared:
+            return
+        self.pieces.append(piece)
+        self._notify()
+
+    def finish(self, shared: bool = True):
+        if self.done:
+            return
+        self.done = True
+        self.shared = self.shared and shared
+        self._notify()
+
+    def _notify(self):
+        # Un evento por generación: los que esperan despiertan una vez
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self, timeout: float) -> AsyncIterator[str]:
+        """
+        Chunks del líder, los ya emitidos y los que lleguen, hasta que
+        termine. Lanza asyncio.TimeoutError si pasan `timeout` segundos
+        sin novedades.
+        """
+        index = 0
+        while True:
+            while self.shared and index < len(self.pieces):
+                yield self.pieces[index]
+                index += 1
+            if self.done or not self.shared:
+                return
+            await asyncio.wait_for(self._changed.wait(), timeout)
+
+
+class SingleFlight:
+    """
+    Vuelos en curso por clave.
+
+    join(key) devuelve (vuelo, es_líder): el primero en llegar crea el
+    vuelo y debe resolverlo y terminarlo con land(); los siguientes lo
+    siguen. Los vuelos son por event loop (sus eventos no cruzan loops).
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, Flight] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.fallbacks = 0
+
+    def join(self, key: Hashable) -> Tuple[Flight, bool]:
+        key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = Flight(key)
+            self.leaders += 1
+            return flight, True
+
+    def land(self, flight: Flight):
+        """Fin del vuelo del líder; si no lo terminó, se descarta"""
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+        flight.finish(shared=False)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            calls = self.leaders + self.coalesced
+            return {
+                "in_flight": len(self._flights),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "fallbacks": self.fallbacks,
+                "coalesced_rate": self.coalesced / calls if calls else 0.0,
+            }
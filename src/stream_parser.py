@@ -0,0 +1,218 @@
+"""
+Detección incremental de llamadas a herramientas en la salida de Gemini.
+
+El system prompt pide que una llamada a herramienta sea la respuesta
+completa (solo el JSON, a lo sumo dentro de un bloque ```json). Eso
+permite decidir con los primeros caracteres no vacíos si la salida es
+texto, que se reenvía al cliente de inmediato, o JSON, que se acumula
+hasta que el objeto cierra. En ese momento se parsea una sola vez y la
+herramienta puede ejecutarse sin esperar el resto de la generación.
+
+El modelo no siempre obedece: a veces antepone una frase ("Claro,
+consulto tu saldo: {...}"). En modo texto, a partir de cada '{' que abre
+un objeto se retiene la salida hasta que cierra; si es una llamada a
+herramienta válida se ejecuta (como hacía la detección original sobre la
+respuesta completa) y si no, se reenvía como texto.
+"""
+import json
+import re
+from typing import Dict, List, Optional
+
+# Herramientas que el agente sabe ejecutar
+TOOL_NAMES = (
+    "authenticate_user",
+    "get_account_balance",
+    "get_account_movements",
+    "get_card_info",
+    "get_policy_info",
+    "search_knowledge_base",
+)
+
+PENDING = "pending"
+TEXT = "text"
+JSON = "json"
+
+_FENCE = re.compile(r'```[A-Za-z]*\s*')
+# Lo que se retiene en modo texto esperando que cierre un posible objeto
+# JSON; si se supera, la llave era parte del texto
+MAX_EMBEDDED_CHARS = 2048
+
+
+def _object_end(text: str) -> Optional[int]:
+    """Posición tras la '}' que cierra el objeto que abre text[0], o None si no cierra"""
+    depth = 0
+    in_string = escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return None
+
+
+def _parse_tool_call(json_text: str) -> Optional[Dict]:
+    """La llamada a herramienta que describe json_text, o None si no es una válida"""
+    try:
+        data = json.loads(json_text)
+    except ValueError:
+        return None
+    if (isinstance(data, dict)
+            and data.get("action") == "call_tool"
+            and data.get("tool_name") in TOOL_NAMES):
+        return data
+    return None
+
+
+class ToolCallStreamParser:
+    """
+    Clasifica la salida del LLM a medida que llega.
+
+    - mode: PENDING mientras solo hubo espacios o el inicio de un bloque
+      de código; TEXT si es lenguaje natural; JSON si abre un objeto (o
+      si una llamada a herramienta aparece después de texto)
+    - feed(chunk) devuelve el texto a reenviar al cliente (vacío en modo
+      JSON o mientras no se decide; en modo texto sin lo retenido desde
+      un '{' que aún no cierra)
+    - complete: el objeto JSON ya cerró; lo que siga se ignora
+    - tool_call: la llamada a herramienta válida, o None si el JSON no es
+      una (o no llegó a cerrar)
+    """
+
+    def __init__(self):
+        self.mode = PENDING
+        self.json_text: Optional[str] = None
+        self.tool_call: Optional[Dict] = None
+        self._pending = ""
+        # Modo texto: salida retenida desde un '{' que todavía no cierra
+        self._held = ""
+        self._object: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def complete(self) -> bool:
+        return self.json_text is not None
+
+    def feed(self, chunk: str) -> str:
+        """Procesa un chunk; devuelve el texto que ya se puede reenviar"""
+        if self.mode == TEXT:
+            return self._feed_text(chunk)
+        if self.mode == JSON:
+            self._scan(chunk)
+            return ""
+
+        self._pending += chunk
+        text = self._pending.lstrip()
+        if not text or "```".startswith(text):
+            return ""
+
+        body = text
+        if text.startswith("```"):
+            fence = _FENCE.match(text)
+            if fence.end() == len(text):
+                # Todavía puede llegar más del nombre del lenguaje o el '{'
+                return ""
+            body = text[fence.end():]
+
+        if body.startswith("{"):
+            self.mode = JSON
+            self._pending = ""
+            self._scan(body)
+            return ""
+
+        self.mode = TEXT
+        self._pending = ""
+        return self._feed_text(text)
+
+    def flush(self) -> str:
+        """
+        Fin de la salida: si nunca se decidió (vacía o solo una cerca) es
+        texto, igual que lo retenido desde un '{' que no llegó a cerrar
+        """
+        if self.mode == TEXT:
+            text, self._held = self._held, ""
+            return text
+        if self.mode != PENDING:
+            return ""
+        self.mode = TEXT
+        text, self._pending = self._pending.lstrip(), ""
+        return text
+
+    def _feed_text(self, chunk: str) -> str:
+        """Modo texto: reenvía hasta el próximo '{' y retiene el posible objeto"""
+        self._held += chunk
+        forwarded = []
+        while True:
+            start = self._held.find("{")
+            if start == -1:
+                forwarded.append(self._held)
+                self._held = ""
+                break
+            forwarded.append(self._held[:start])
+            self._held = self._held[start:]
+
+            head = self._held[1:].lstrip()
+            if head and head[0] not in '"}':
+                # No abre un objeto JSON: la llave es parte del texto
+                forwarded.append("{")
+                self._held = self._held[1:]
+                continue
+            end = _object_end(self._held)
+            if end is None:
+                if len(self._held) > MAX_EMBEDDED_CHARS:
+                    forwarded.append("{")
+                    self._held = self._held[1:]
+                    continue
+                break
+
+            candidate, self._held = self._held[:end], self._held[end:]
+            tool_call = _parse_tool_call(candidate)
+            if tool_call is not None:
+                self.mode = JSON
+                self.json_text = candidate
+                self.tool_call = tool_call
+                self._held = ""
+                break
+            forwarded.append(candidate)
+        return "".join(forwarded)
+
+    def _scan(self, text: str):
+        if self.complete:
+            return
+        for i, char in enumerate(text):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._object.append(text[:i + 1])
+                    self._close()
+                    return
+        self._object.append(text)
+
+    def _close(self):
+        self.json_text = "".join(self._object)
+        self._object = []
+        self.tool_call = _parse_tool_call(self.json_text)
+
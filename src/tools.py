@@ -2,6 +2,7 @@
 Herramientas (Tools) que el agente puede utilizar.
 Estas son simulaciones de APIs reales del banco.
 """
+import asyncio
 import random
 import time
 from datetime import datetime, timedelta
@@ -129,10 +130,21 @@ class BankingTools:
         - Si SERVICE_UNAVAILABLE: Disculparse, sugerir intentar más tarde
         - Si ACCOUNT_LOCKED: Informar al usuario contactar soporte
         """
+        # Simular latencia de red
+        time.sleep(random.uniform(0.3, 0.8))
+        return self._authenticate(document_id, otp_code)
+    
+    async def aauthenticate_user(self, document_id: str, otp_code: str = None) -> Dict:
+        """
+        Versión async de authenticate_user: la latencia de red simulada
+        no bloquea el event loop mientras se atienden otras conversaciones.
+        """
+        await asyncio.sleep(random.uniform(0.3, 0.8))
+        return self._authenticate(document_id, otp_code)
+    
+    def _authenticate(self, document_id: str, otp_code: Optional[str]) -> Dict:
+        """Valida cédula y OTP contra la base simulada (sin la latencia de red)"""
         try:
-            # Simular latencia de red
-            time.sleep(random.uniform(0.3, 0.8))
-            
             # Simular 5% de fallos de servicio
             if random.random() < 0.05:
                 return {
@@ -0,0 +1,829 @@
+"""
+Almacenes vectoriales para la base de conocimiento.
+
+Todos los backends comparten el mismo contrato:
+- upsert(ids, embeddings, metadatas) / delete(ids)
+- query(embedding, top_k, ids=None) -> [(id, score)] ordenado por score
+  descendente; con `ids` solo se consideran esos documentos (búsqueda
+  filtrada, p. ej. por categoría)
+- query_batch(embeddings, top_k, ids=None) -> una lista de resultados por query
+- score = similitud coseno (1.0 = idéntico)
+- supports_snapshots: True si dos instancias sobre el mismo directorio son
+  independientes (las escrituras de una no cambian lo que busca la otra
+  hasta reabrirla); lo requiere la recarga en caliente de la base
+
+Backends disponibles:
+- "chroma": ChromaDB persistente (HNSW)
+- "numpy": matriz contigua en proceso, opcionalmente memory-mapped y
+  cuantizada (float16 / int8)
+- "ivf": índice aproximado particionado con k-means (nprobe ajustable)
+"""
+import json
+import os
+import threading
+from typing import Collection, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import chromadb
+    from chromadb.config import Settings
+    CHROMA_AVAILABLE = True
+except ImportError:
+    CHROMA_AVAILABLE = False
+
+SearchHits = List[Tuple[str, float]]
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normaliza filas a norma L2 = 1 (las filas nulas quedan en cero)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[np.newaxis, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Índices de los top_k scores de un vector, ordenados de mayor a menor"""
+    if top_k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < scores.size:
+        # argpartition es O(n); solo se ordenan los k candidatos
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(scores.size)
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def _rank_subset(queries: np.ndarray, ids: List[str], matrix: np.ndarray,
+                 top_k: int) -> List[SearchHits]:
+    """Búsqueda exacta de queries normalizadas sobre un subconjunto de vectores"""
+    if not ids:
+        return [[] for _ in range(len(queries))]
+    scores = queries @ _normalize_rows(matrix).T
+    return [
+        [(ids[i], float(row[i])) for i in _top_k(row, top_k)]
+        for row in scores
+    ]
+
+
+class ChromaVectorStore:
+    """Backend ChromaDB persistente con espacio coseno"""
+
+    name = "chroma"
+    # Las instancias comparten la colección persistente: una reindexación
+    # es visible de inmediato para las demás
+    supports_snapshots = False
+
+    def __init__(self, path: str, model_name: str,
+                 collection_name: str = "banking_faqs"):
+        if not CHROMA_AVAILABLE:
+            raise ImportError("Instala: pip install chromadb")
+
+        self.path = path
+        self.client = chromadb.PersistentClient(
+            path=path,
+            settings=Settings(anonymized_telemetry=False, allow_reset=True)
+        )
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name,
+            metadata={
+                "description": "FAQs bancarias con embeddings",
+                "embedding_model": model_name,
+                "hnsw:space": "cosine"
+            }
+        )
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def get_content_hashes(self) -> Dict[str, Optional[str]]:
+        """Hash de contenido almacenado por id"""
+        stored = self.collection.get(include=['metadatas'])
+        return {
+            item_id: (metadata or {}).get('content_hash')
+            for item_id, metadata in zip(stored['ids'], stored['metadatas'])
+        }
+
+    def upsert(self, ids: Sequence[str], embeddings: np.ndarray,
+               metadatas: Sequence[Dict], documents: Sequence[str]):
+        self.collection.upsert(
+            ids=list(ids),
+            embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            metadatas=list(metadatas),
+            documents=list(documents)
+        )
+
+    def delete(self, ids: Sequence[str]):
+        if ids:
+            self.collection.delete(ids=list(ids))
+
+    def query(self, embedding: np.ndarray, top_k: int,
+              ids: Optional[Collection[str]] = None) -> SearchHits:
+        return self.query_batch(np.asarray(embedding)[np.newaxis, :], top_k, ids)[0]
+
+    def query_batch(self, embeddings: np.ndarray, top_k: int,
+                    ids: Optional[Collection[str]] = None) -> List[SearchHits]:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        count = self.count()
+        if count == 0 or top_k <= 0:
+            return [[] for _ in range(len(embeddings))]
+
+        if ids is not None:
+            # Subconjunto acotado (una categoría): se leen sus vectores y se
+            # puntúan exactos en vez de filtrar dentro del HNSW
+            stored = self.collection.get(ids=list(ids), include=['embeddings']) if ids else None
+            if not stored or not stored['ids']:
+                return [[] for _ in range(len(embeddings))]
+            return _rank_subset(_normalize_rows(embeddings), stored['ids'],
+                                np.asarray(stored['embeddings']), top_k)
+
+        results = self.collection.query(
+            query_embeddings=embeddings.tolist(),
+            n_results=min(top_k, count),
+            include=['distances']
+        )
+        # En espacio coseno Chroma devuelve distancia = 1 - similitud
+        return [
+            [(item_id, 1.0 - float(distance)) for item_id, distance in zip(ids, distances)]
+            for ids, distances in zip(results['ids'], results['distances'])
+        ]
+
+    def persist(self):
+        """PersistentClient escribe en disco en cada operación"""
+
+    def memory_bytes(self) -> int:
+        """Tamaño en disco del índice (Chroma no expone su uso de memoria)"""
+        total = 0
+        for root, _, files in os.walk(self.path):
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        return total
+
+
+class NumpyVectorStore:
+    """
+    Backend en proceso sobre una matriz float32 contigua de embeddings
+    normalizados (L2), así la similitud coseno es un producto punto.
+
+    - Una query es un único producto matriz-vector + argpartition.
+    - Un lote de queries es un único producto matriz-matriz.
+    - Se persiste como embeddings.npy + ids.json y puede cargarse
+      memory-mapped (las páginas se comparten entre workers vía page cache).
+
+    Almacenamiento cuantizado (dtype):
+    - "float32": sin pérdida (3 KB por vector de 768 dims)
+    - "float16": la mitad de memoria
+    - "int8": un cuarto de memoria, con una escala float32 por vector
+    Con dtype cuantizado se busca sobre la matriz cuantizada; con rescore=True
+    los top_k * rescore_factor candidatos se re-puntúan en float32 leyendo
+    solo esas filas de embeddings.npy (que queda memory-mapped).
+
+    upsert/delete/persist reescriben los buffers y la lista de ids en su
+    lugar; un lock del store los serializa con las queries, que llegan
+    desde varios hilos (requests y el executor de búsqueda).
+    """
+
+    name = "numpy"
+    # Cada instancia trabaja sobre su copia y persist() reemplaza archivos
+    supports_snapshots = True
+
+    EMBEDDINGS_FILE = "embeddings.npy"
+    IDS_FILE = "ids.json"
+    DTYPES = ("float32", "float16", "int8")
+    # Filas por bloque al des-cuantizar para puntuar (acota la memoria temporal)
+    SCAN_CHUNK_ROWS = 2048
+
+    def __init__(self, path: str, model_name: str, mmap: bool = True,
+                 dtype: str = "float32", rescore: bool = False,
+                 rescore_factor: int = 4):
+        if dtype not in self.DTYPES:
+            raise ValueError(f"dtype no soportado: {dtype}. Opciones: {', '.join(self.DTYPES)}")
+
+        self.path = path
+        self.model_name = model_name
+        self.mmap = mmap
+        self.dtype = dtype
+        self.rescore = rescore and dtype != "float32"
+        self.rescore_factor = max(1, rescore_factor)
+
+        self.ids: List[str] = []
+        self.content_hashes: List[Optional[str]] = []
+        self._positions: Dict[str, int] = {}
+        # Buffers paralelos por fila ("full" float32, "quantized", "scales")
+        # con capacidad extra para inserciones amortizadas; las vistas
+        # públicas son siempre los prefijos contiguos de filas ocupadas
+        self._buffers: Dict[str, np.ndarray] = {}
+        self.matrix: Optional[np.ndarray] = None
+        self.quantized: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self._dirty = False
+        self._lock = threading.RLock()
+
+        self._load()
+
+    def _quantized_file(self) -> str:
+        return os.path.join(self.path, f"embeddings.{self.dtype}.npy")
+
+    def _scales_file(self) -> str:
+        return os.path.join(self.path, "scales.npy")
+
+    def _load(self):
+        embeddings_path = os.path.join(self.path, self.EMBEDDINGS_FILE)
+        ids_path = os.path.join(self.path, self.IDS_FILE)
+        if not (os.path.exists(embeddings_path) and os.path.exists(ids_path)):
+            return
+
+        with open(ids_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('embedding_model') != self.model_name:
+            # Vectores de otro modelo: se descartan y se reindexa
+            return
+
+        mmap_mode = 'r' if self.mmap else None
+        # Con dtype cuantizado la matriz float32 solo se lee para re-puntuar
+        # o reescribir: siempre mapeada, no ocupa RAM residente
+        full_mmap_mode = 'r' if self.mmap or self.dtype != "float32" else None
+        self._buffers = {"full": np.load(embeddings_path, mmap_mode=full_mmap_mode)}
+        self.ids = meta['ids']
+        self.content_hashes = meta['content_hashes']
+        self._positions = {item_id: i for i, item_id in enumerate(self.ids)}
+
+        if self.dtype != "float32":
+            if meta.get('dtype') == self.dtype and os.path.exists(self._quantized_file()):
+                self._buffers["quantized"] = np.load(self._quantized_file(), mmap_mode=mmap_mode)
+                if self.dtype == "int8":
+                    self._buffers["scales"] = np.load(self._scales_file(), mmap_mode=mmap_mode)
+            else:
+                # Índice persistido con otro dtype: se cuantiza al cargar, por
+                # bloques para no materializar temporales del tamaño completo
+                full = self._buffers["full"]
+                self._buffers["quantized"] = np.empty(full.shape, dtype=self.dtype)
+                if self.dtype == "int8":
+                    self._buffers["scales"] = np.empty(full.shape[0], dtype=np.float32)
+                for start in range(0, full.shape[0], self.SCAN_CHUNK_ROWS):
+                    end = start + self.SCAN_CHUNK_ROWS
+                    quantized, scales = self._quantize(np.asarray(full[start:end]))
+                    self._buffers["quantized"][start:end] = quantized
+                    if scales is not None:
+                        self._buffers["scales"][start:end] = scales
+                self._dirty = True
+
+        self._refresh_views()
+
+    def _quantize(self, vectors: np.ndarray):
+        """Cuantiza filas normalizadas al dtype del store -> (matriz, escalas)"""
+        if self.dtype == "float16":
+            return vectors.astype(np.float16), None
+
+        # int8 simétrico con escala por vector: v ≈ q * scale
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.clip(np.rint(vectors / scales[:, np.newaxis]), -127, 127)
+        return quantized.astype(np.int8), scales.astype(np.float32)
+
+    def _refresh_views(self):
+        count = len(self.ids)
+        self.matrix = self._buffers["full"][:count] if "full" in self._buffers else None
+        self.quantized = self._buffers["quantized"][:count] if "quantized" in self._buffers else None
+        self.scales = self._buffers["scales"][:count] if "scales" in self._buffers else None
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def get_content_hashes(self) -> Dict[str, Optional[str]]:
+        with self._lock:
+            return dict(zip(self.ids, self.content_hashes))
+
+    def _ensure_writable(self, extra_rows: int, dimensions: int):
+        """Pasa a memoria los buffers mapeados y reserva capacidad para extra_rows"""
+        count = self.count()
+        needed = count + extra_rows
+        layouts = {"full": (np.float32, (dimensions,))}
+        if self.dtype != "float32":
+            layouts["quantized"] = (np.dtype(self.dtype), (dimensions,))
+        if self.dtype == "int8":
+            layouts["scales"] = (np.float32, ())
+
+        for key, (dtype, row_shape) in layouts.items():
+            buffer = self._buffers.get(key)
+            if buffer is None or isinstance(buffer, np.memmap) or buffer.shape[0] < needed:
+                capacity = max(needed, 2 * (buffer.shape[0] if buffer is not None else 0), 16)
+                new_buffer = np.empty((capacity,) + row_shape, dtype=dtype)
+                if count:
+                    new_buffer[:count] = buffer[:count]
+                self._buffers[key] = new_buffer
+
+        self._refresh_views()
+
+    def upsert(self, ids: Sequence[str], embeddings: np.ndarray,
+               metadatas: Sequence[Dict], documents: Sequence[str] = ()):
+        if not ids:
+            return
+        vectors = _normalize_rows(embeddings)
+        with self._lock:
+            new_ids = [item_id for item_id in dict.fromkeys(ids) if item_id not in self._positions]
+            self._ensure_writable(len(new_ids), vectors.shape[1])
+
+            for item_id in new_ids:
+                self._positions[item_id] = len(self.ids)
+                self.ids.append(item_id)
+                self.content_hashes.append(None)
+            self._refresh_views()
+
+            positions = np.array([self._positions[item_id] for item_id in ids])
+            self.matrix[positions] = vectors
+            if self.dtype != "float32":
+                quantized, scales = self._quantize(vectors)
+                self.quantized[positions] = quantized
+                if scales is not None:
+                    self.scales[positions] = scales
+            for position, metadata in zip(positions, metadatas):
+                self.content_hashes[position] = (metadata or {}).get('content_hash')
+
+            self._dirty = True
+
+    def delete(self, ids: Sequence[str]):
+        with self._lock:
+            removed = {item_id for item_id in ids if item_id in self._positions}
+            if not removed:
+                return
+
+            keep = np.array([item_id not in removed for item_id in self.ids], dtype=bool)
+            count = self.count()
+            self._buffers = {
+                key: np.array(buffer[:count][keep]) for key, buffer in self._buffers.items()
+            }
+            self.ids = [item_id for item_id, kept in zip(self.ids, keep) if kept]
+            self.content_hashes = [h for h, kept in zip(self.content_hashes, keep) if kept]
+            self._positions = {item_id: i for i, item_id in enumerate(self.ids)}
+            self._refresh_views()
+            self._dirty = True
+
+    def _approximate_scores(self, queries: np.ndarray,
+                            rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Scores (n_queries, n_filas) sobre la matriz de almacenamiento.
+
+        Con `rows` solo se puntúan esas filas (búsqueda filtrada).
+        """
+        if self.dtype == "float32":
+            return queries @ (self.matrix if rows is None else self.matrix[rows]).T
+
+        total = self.count() if rows is None else len(rows)
+        scores = np.empty((len(queries), total), dtype=np.float32)
+        for start in range(0, total, self.SCAN_CHUNK_ROWS):
+            end = start + self.SCAN_CHUNK_ROWS
+            block_rows = slice(start, end) if rows is None else rows[start:end]
+            block = self.quantized[block_rows].astype(np.float32)
+            scores[:, start:end] = queries @ block.T
+            if self.scales is not None:
+                scores[:, start:end] *= self.scales[block_rows]
+        return scores
+
+    def _rank(self, query: np.ndarray, scores: np.ndarray, top_k: int,
+              rows: Optional[np.ndarray] = None) -> SearchHits:
+        if not self.rescore:
+            best = _top_k(scores, top_k)
+            positions = best if rows is None else rows[best]
+            return [(self.ids[p], float(scores[i])) for p, i in zip(positions, best)]
+
+        # Re-puntuar en float32 solo los candidatos del índice cuantizado
+        candidates = _top_k(scores, top_k * self.rescore_factor)
+        candidates = np.sort(candidates if rows is None else rows[candidates])
+        exact = self.matrix[candidates] @ query
+        return [
+            (self.ids[candidates[i]], float(exact[i]))
+            for i in _top_k(exact, top_k)
+        ]
+
+    def query(self, embedding: np.ndarray, top_k: int,
+              ids: Optional[Collection[str]] = None) -> SearchHits:
+        return self.query_batch(embedding, top_k, ids)[0]
+
+    def query_batch(self, embeddings: np.ndarray, top_k: int,
+                    ids: Optional[Collection[str]] = None) -> List[SearchHits]:
+        queries = _normalize_rows(embeddings)
+        with self._lock:
+            if not self.count():
+                return [[] for _ in range(len(queries))]
+
+            rows = None
+            if ids is not None:
+                rows = np.sort(np.fromiter(
+                    (self._positions[item_id] for item_id in ids if item_id in self._positions),
+                    dtype=np.int64
+                ))
+                if not rows.size:
+                    return [[] for _ in range(len(queries))]
+
+            scores = self._approximate_scores(queries, rows)
+            return [self._rank(query, row, top_k, rows) for query, row in zip(queries, scores)]
+
+    def persist(self):
+        """Escribe los .npy e ids.json de forma atómica"""
+        with self._lock:
+            if not self._dirty:
+                return
+
+            os.makedirs(self.path, exist_ok=True)
+            files = {os.path.join(self.path, self.EMBEDDINGS_FILE): self.matrix}
+            if self.quantized is not None:
+                files[self._quantized_file()] = self.quantized
+            if self.scales is not None:
+                files[self._scales_file()] = self.scales
+
+            for file_path, array in files.items():
+                if array is None:
+                    array = np.empty((0, 0), dtype=np.float32)
+                with open(f"{file_path}.tmp", 'wb') as f:
+                    np.save(f, np.ascontiguousarray(array))
+
+            ids_path = os.path.join(self.path, self.IDS_FILE)
+            with open(f"{ids_path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump({
+                    "embedding_model": self.model_name,
+                    "dtype": self.dtype,
+                    "ids": self.ids,
+                    "content_hashes": self.content_hashes
+                }, f, ensure_ascii=False)
+
+            for file_path in list(files) + [ids_path]:
+                os.replace(f"{file_path}.tmp", file_path)
+
+            self._dirty = False
+
+    def memory_bytes(self) -> int:
+        """Bytes de la matriz que se recorre en cada búsqueda (más escalas)"""
+        if not self.count():
+            return 0
+        if self.dtype == "float32":
+            return int(self.matrix.nbytes)
+        total = int(self.quantized.nbytes)
+        if self.scales is not None:
+            total += int(self.scales.nbytes)
+        return total
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_rows: int = 8192) -> np.ndarray:
+    """Centroide más cercano (producto punto) de cada fila, por bloques"""
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_rows):
+        block = np.asarray(vectors[start:start + chunk_rows], dtype=np.float32)
+        assignments[start:start + chunk_rows] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def spherical_kmeans(vectors: np.ndarray, nlist: int, iterations: int = 20,
+                     seed: int = 0) -> np.ndarray:
+    """
+    K-means esférico (similitud coseno) en CPU con NumPy.
+
+    Los vectores deben venir normalizados; devuelve centroides normalizados.
+    """
+    rng = np.random.default_rng(seed)
+    nlist = max(1, min(nlist, len(vectors)))
+    centroids = np.array(vectors[rng.choice(len(vectors), nlist, replace=False)], dtype=np.float32)
+
+    for _ in range(iterations):
+        assignments = _assign(vectors, centroids)
+        order = np.argsort(assignments, kind='stable')
+        sorted_assignments = assignments[order]
+        clusters, starts = np.unique(sorted_assignments, return_index=True)
+        sums = np.add.reduceat(np.asarray(vectors, dtype=np.float32)[order], starts, axis=0)
+
+        new_centroids = centroids.copy()
+        new_centroids[clusters] = sums
+        # Clusters vacíos: se reinician en un vector aleatorio
+        empty = np.setdiff1d(np.arange(nlist), clusters)
+        if empty.size:
+            new_centroids[empty] = vectors[rng.choice(len(vectors), empty.size)]
+        new_centroids = _normalize_rows(new_centroids)
+
+        if np.allclose(new_centroids, centroids, atol=1e-6):
+            centroids = new_centroids
+            break
+        centroids = new_centroids
+
+    return centroids
+
+
+class IVFVectorStore:
+    """
+    Índice aproximado IVF (inverted file) para bases de conocimiento grandes.
+
+    - Entrenamiento offline: k-means esférico en CPU (NumPy) sobre una
+      muestra, que define `nlist` particiones gruesas.
+    - Los vectores se guardan ordenados por partición en una sola matriz
+      contigua (vectors.npy) con sus offsets, así cada partición es un
+      slice que se puede leer memory-mapped sin tocar el resto.
+    - Una query puntúa los centroides y recorre solo las `nprobe`
+      particiones más cercanas: nprobe es la perilla recall/latencia
+      (nprobe = nlist equivale a búsqueda exacta).
+    - Las altas/cambios quedan en un buffer plano (búsqueda exacta) hasta
+      persist(), que los asigna a su partición sin re-entrenar. Mientras
+      no haya al menos `min_train_size` vectores, el índice es exacto.
+    - Como en NumpyVectorStore, un lock del store serializa las escrituras
+      (upsert/delete/train/persist) con las queries concurrentes.
+    """
+
+    name = "ivf"
+    supports_snapshots = True
+
+    CENTROIDS_FILE = "centroids.npy"
+    VECTORS_FILE = "vectors.npy"
+    OFFSETS_FILE = "offsets.npy"
+    IDS_FILE = "ids.json"
+
+    def __init__(self, path: str, model_name: str, mmap: bool = True,
+                 nlist: int = 0, nprobe: int = 8, min_train_size: int = 1000,
+                 train_sample_size: int = 100000):
+        self.path = path
+        self.model_name = model_name
+        self.mmap = mmap
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.train_sample_size = train_sample_size
+
+        # Layout persistido (ordenado por partición)
+        self.centroids: Optional[np.ndarray] = None
+        self.vectors: Optional[np.ndarray] = None
+        self.offsets: Optional[np.ndarray] = None
+        self.ids: List[str] = []
+        self.content_hashes: List[Optional[str]] = []
+        self._positions: Dict[str, int] = {}
+        self._alive: Optional[np.ndarray] = None
+
+        # Cambios desde el último persist(): id -> (vector, content_hash)
+        self._pending: Dict[str, Tuple[np.ndarray, Optional[str]]] = {}
+        self._dirty = False
+        self._lock = threading.RLock()
+
+        self._load()
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def _load(self):
+        ids_path = os.path.join(self.path, self.IDS_FILE)
+        vectors_path = os.path.join(self.path, self.VECTORS_FILE)
+        if not (os.path.exists(ids_path) and os.path.exists(vectors_path)):
+            return
+
+        with open(ids_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('embedding_model') != self.model_name:
+            return
+
+        self.vectors = np.load(vectors_path, mmap_mode='r' if self.mmap else None)
+        self.offsets = np.load(os.path.join(self.path, self.OFFSETS_FILE))
+        centroids_path = os.path.join(self.path, self.CENTROIDS_FILE)
+        if os.path.exists(centroids_path):
+            self.centroids = np.load(centroids_path)
+        self.ids = meta['ids']
+        self.content_hashes = meta['content_hashes']
+        self._positions = {item_id: i for i, item_id in enumerate(self.ids)}
+        self._alive = np.ones(len(self.ids), dtype=bool)
+
+    def count(self) -> int:
+        with self._lock:
+            alive = int(self._alive.sum()) if self._alive is not None else 0
+            new = sum(1 for item_id in self._pending if item_id not in self._positions)
+            return alive + new
+
+    def get_content_hashes(self) -> Dict[str, Optional[str]]:
+        with self._lock:
+            hashes = {
+                item_id: content_hash
+                for item_id, content_hash, alive in zip(self.ids, self.content_hashes, self._alive)
+                if alive
+            } if self._alive is not None else {}
+            hashes.update({item_id: entry[1] for item_id, entry in self._pending.items()})
+            return hashes
+
+    def upsert(self, ids: Sequence[str], embeddings: np.ndarray,
+               metadatas: Sequence[Dict], documents: Sequence[str] = ()):
+        vectors = _normalize_rows(embeddings) if len(ids) else []
+        with self._lock:
+            for item_id, vector, metadata in zip(ids, vectors, metadatas):
+                self._tombstone(item_id)
+                self._pending[item_id] = (vector, (metadata or {}).get('content_hash'))
+            self._dirty = self._dirty or bool(len(ids))
+
+    def delete(self, ids: Sequence[str]):
+        with self._lock:
+            for item_id in ids:
+                removed = self._pending.pop(item_id, None) is not None
+                removed = self._tombstone(item_id) or removed
+                self._dirty = self._dirty or removed
+
+    def _tombstone(self, item_id: str) -> bool:
+        position = self._positions.get(item_id)
+        if position is None or not self._alive[position]:
+            return False
+        self._alive[position] = False
+        return True
+
+    def query(self, embedding: np.ndarray, top_k: int,
+              ids: Optional[Collection[str]] = None, *,
+              nprobe: Optional[int] = None) -> SearchHits:
+        return self.query_batch(embedding, top_k, ids, nprobe=nprobe)[0]
+
+    def query_batch(self, embeddings: np.ndarray, top_k: int,
+                    ids: Optional[Collection[str]] = None, *,
+                    nprobe: Optional[int] = None) -> List[SearchHits]:
+        queries = _normalize_rows(embeddings)
+        nprobe = nprobe or self.nprobe
+
+        with self._lock:
+            if ids is not None:
+                # Un subconjunto filtrado es pequeño frente al índice: búsqueda
+                # exacta sobre sus filas, sin pasar por las particiones
+                return self._query_subset(queries, top_k, ids)
+
+            pending_ids = list(self._pending)
+            pending_scores = None
+            if pending_ids:
+                pending_matrix = np.stack([self._pending[item_id][0] for item_id in pending_ids])
+                pending_scores = queries @ pending_matrix.T
+
+            if self.trained and self.vectors is not None and len(self.ids):
+                probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :nprobe]
+            else:
+                probes = [None] * len(queries)
+
+            results = []
+            for i, query in enumerate(queries):
+                candidate_ids, candidate_scores = [], []
+
+                if self.vectors is not None and len(self.ids):
+                    ranges = (
+                        [(self.offsets[p], self.offsets[p + 1]) for p in probes[i]]
+                        if probes[i] is not None else [(0, len(self.ids))]
+                    )
+                    for start, end in ranges:
+                        if end <= start:
+                            continue
+                        scores = np.asarray(self.vectors[start:end] @ query)
+                        alive = self._alive[start:end]
+                        rows = np.nonzero(alive)[0]
+                        best = rows[_top_k(scores[rows], top_k)]
+                        candidate_ids.extend(self.ids[start + row] for row in best)
+                        candidate_scores.extend(scores[best])
+
+                if pending_scores is not None:
+                    best = _top_k(pending_scores[i], top_k)
+                    candidate_ids.extend(pending_ids[j] for j in best)
+                    candidate_scores.extend(pending_scores[i][best])
+
+                scores = np.asarray(candidate_scores, dtype=np.float32)
+                results.append([
+                    (candidate_ids[j], float(scores[j])) for j in _top_k(scores, top_k)
+                ])
+            return results
+
+    def _query_subset(self, queries: np.ndarray, top_k: int,
+                      ids: Collection[str]) -> List[SearchHits]:
+        subset_ids, blocks = [], []
+        pending = [item_id for item_id in ids if item_id in self._pending]
+        if self.vectors is not None and len(self.ids):
+            rows = sorted(
+                self._positions[item_id] for item_id in ids
+                if item_id in self._positions and self._alive[self._positions[item_id]]
+            )
+            if rows:
+                subset_ids.extend(self.ids[row] for row in rows)
+                blocks.append(np.asarray(self.vectors[rows], dtype=np.float32))
+        if pending:
+            subset_ids.extend(pending)
+            blocks.append(np.stack([self._pending[item_id][0] for item_id in pending]))
+
+        matrix = np.vstack(blocks) if blocks else None
+        return _rank_subset(queries, subset_ids, matrix, top_k)
+
+    def _all_vectors(self) -> Tuple[List[str], List[Optional[str]], np.ndarray]:
+        """Vectores vivos del layout más los pendientes"""
+        ids, hashes, blocks = [], [], []
+        if self.vectors is not None and len(self.ids):
+            keep = np.nonzero(self._alive)[0]
+            ids.extend(self.ids[i] for i in keep)
+            hashes.extend(self.content_hashes[i] for i in keep)
+            blocks.append(np.asarray(self.vectors[keep], dtype=np.float32))
+        if self._pending:
+            ids.extend(self._pending)
+            hashes.extend(entry[1] for entry in self._pending.values())
+            blocks.append(np.stack([entry[0] for entry in self._pending.values()]))
+        matrix = np.vstack(blocks) if blocks else np.empty((0, 0), dtype=np.float32)
+        return ids, hashes, matrix
+
+    def train(self, nlist: Optional[int] = None, iterations: int = 20, seed: int = 0):
+        """
+        (Re)entrena las particiones con k-means sobre todos los vectores.
+
+        nlist = 0 elige ~4·√n particiones.
+        """
+        with self._lock:
+            ids, hashes, matrix = self._all_vectors()
+            if not len(ids):
+                return
+            nlist = nlist or self.nlist or int(4 * np.sqrt(len(ids)))
+
+            rng = np.random.default_rng(seed)
+            sample = matrix
+            if len(matrix) > self.train_sample_size:
+                sample = matrix[np.sort(rng.choice(len(matrix), self.train_sample_size, replace=False))]
+            self.centroids = spherical_kmeans(sample, nlist, iterations, seed)
+            self._layout(ids, hashes, matrix)
+
+    def _layout(self, ids, hashes, matrix):
+        """Ordena los vectores por partición y recalcula offsets"""
+        if self.trained and len(ids):
+            assignments = _assign(matrix, self.centroids)
+            order = np.argsort(assignments, kind='stable')
+            counts = np.bincount(assignments, minlength=len(self.centroids))
+        else:
+            order = np.arange(len(ids))
+            counts = np.array([len(ids)])
+
+        vectors = np.ascontiguousarray(matrix[order], dtype=np.float32) if len(ids) else None
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        ordered_ids = [ids[i] for i in order]
+        ordered_hashes = [hashes[i] for i in order]
+        positions = {item_id: i for i, item_id in enumerate(ordered_ids)}
+
+        # Se publica el layout completo de una vez, ya calculado
+        self.vectors, self.offsets = vectors, offsets
+        self.ids, self.content_hashes, self._positions = ordered_ids, ordered_hashes, positions
+        self._alive = np.ones(len(ordered_ids), dtype=bool)
+        self._pending = {}
+        self._dirty = True
+
+    def persist(self):
+        """Integra los cambios pendientes en las particiones y escribe a disco"""
+        with self._lock:
+            if not self._dirty:
+                return
+
+            if not self.trained and self.count() >= self.min_train_size:
+                self.train()
+            else:
+                self._layout(*self._all_vectors())
+
+            os.makedirs(self.path, exist_ok=True)
+            arrays = {self.VECTORS_FILE: self.vectors, self.OFFSETS_FILE: self.offsets}
+            if self.trained:
+                arrays[self.CENTROIDS_FILE] = self.centroids
+            for name, array in arrays.items():
+                if array is None:
+                    array = np.empty((0, 0), dtype=np.float32)
+                with open(os.path.join(self.path, f"{name}.tmp"), 'wb') as f:
+                    np.save(f, array)
+
+            ids_path = os.path.join(self.path, self.IDS_FILE)
+            with open(f"{ids_path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump({
+                    "embedding_model": self.model_name,
+                    "nlist": len(self.centroids) if self.trained else 0,
+                    "ids": self.ids,
+                    "content_hashes": self.content_hashes
+                }, f, ensure_ascii=False)
+
+            for name in list(arrays) + [self.IDS_FILE]:
+                os.replace(os.path.join(self.path, f"{name}.tmp"), os.path.join(self.path, name))
+
+            self._dirty = False
+
+    def memory_bytes(self) -> int:
+        total = int(self.vectors.nbytes) if self.vectors is not None else 0
+        if self.trained:
+            total += int(self.centroids.nbytes)
+        return total
+
+
+VECTOR_BACKENDS = {
+    ChromaVectorStore.name: ChromaVectorStore,
+    NumpyVectorStore.name: NumpyVectorStore,
+    IVFVectorStore.name: IVFVectorStore,
+}
+
+
+def is_vector_backend_available(backend: str) -> bool:
+    """False si el backend necesita una biblioteca que no está instalada"""
+    if backend == ChromaVectorStore.name:
+        return CHROMA_AVAILABLE
+    return True
+
+
+def create_vector_store(backend: str, path: str, model_name: str, **options):
+    """Crea el almacén vectorial `backend` en el directorio `path`"""
+    try:
+        store_class = VECTOR_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Backend vectorial desconocido: {backend}. "
+            f"Opciones: {', '.join(sorted(VECTOR_BACKENDS))}"
+        )
+    return store_class(os.path.join(path, backend), model_name, **options)
@@ -0,0 +1,10 @@
+"""
+Configuración común de los tests.
+
+Los tests corren sin red: el backend "fake" del LLM (src/llm_backends.py)
+evita que config.settings exija GEMINI_API_KEY al importarse.
+"""
+
+import os
+
+os.environ.setdefault("LLM_BACKEND", "fake")
@@ -0,0 +1,206 @@
+"""
+Tests para el procesamiento async de mensajes de BankingAgent
+"""
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import src.knowledge as knowledge
+from src.agent import AgentEngine, BankingAgent
+from src.conversation import ConversationState
+from src.knowledge import KnowledgeBase
+from src.llm_backends import FakeLLM
+
+
+class FakeModel:
+    """Modelo que responde tras una latencia fija, sin llamar a Gemini"""
+
+    def __init__(self, text: str, latency: float = 0.2, chunk_size: int = 4):
+        self.text = text
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.streamed = 0
+
+    async def generate_content_async(self, prompt, stream: bool = False):
+        await asyncio.sleep(self.latency)
+        if stream:
+            return self._stream()
+        return SimpleNamespace(text=self.text)
+
+    async def _stream(self):
+        for i in range(0, len(self.text), self.chunk_size):
+            await asyncio.sleep(0)
+            self.streamed += 1
+            yield SimpleNamespace(text=self.text[i:i + self.chunk_size])
+
+
+class TestAsyncAgent:
+    """Suite de tests para aprocess_message"""
+
+    @pytest.fixture(autouse=True)
+    def kb(self, monkeypatch):
+        """Fixture: Base de conocimiento léxica compartida"""
+        monkeypatch.setattr(knowledge, "_shared_knowledge_base",
+                            KnowledgeBase(use_embeddings=False, docs_dir=None))
+
+    def make_agent(self, text: str = "Con gusto te ayudo 😊") -> BankingAgent:
+        agent = BankingAgent(api_key="test")
+        agent.model = FakeModel(text)
+        return agent
+
+    def test_concurrent_conversations_overlap(self):
+        """Test: Las conversaciones concurrentes esperan al LLM en paralelo"""
+        agents = [self.make_agent() for _ in range(5)]
+
+        async def run():
+            return await asyncio.gather(*(a.aprocess_message("hola, necesito ayuda") for a in agents))
+
+        start = time.perf_counter()
+        responses = asyncio.run(run())
+
+        assert responses == ["Con gusto te ayudo 😊"] * 5
+        # En serie serían 5 × 0.2 s
+        assert time.perf_counter() - start < 0.6
+
+    def test_engine_keeps_conversations_apart(self, monkeypatch):
+        """Test: Un motor compartido no mezcla historial ni sesión entre conversaciones"""
+        monkeypatch.setattr("random.random", lambda: 0.5)
+        engine = AgentEngine(api_key="test")
+        engine.model = FakeModel(
+            '{"action": "call_tool", "tool_name": "authenticate_user", '
+            '"parameters": {"document_id": "1234567890", "otp_code": "123456"}}'
+        )
+        alice, bob = ConversationState(), ConversationState()
+
+        engine.process_message(alice, "mi cédula es 1234567890 y el código 123456")
+
+        assert alice.authenticated and not bob.authenticated
+        assert len(alice.history) == 2 and bob.history == []
+
+    def test_sync_wrapper(self):
+        """Test: process_message sigue disponible y guarda el historial"""
+        agent = self.make_agent()
+
+        assert agent.process_message("hola, necesito ayuda") == "Con gusto te ayudo 😊"
+        assert [m["role"] for m in agent.get_conversation_history()] == ["user", "assistant"]
+
+    def test_async_tool_call(self, monkeypatch):
+        """Test: Las herramientas se ejecutan con su versión async"""
+        agent = self.make_agent(
+            '{"action": "call_tool", "tool_name": "authenticate_user", '
+            '"parameters": {"document_id": "1234567890", "otp_code": "123456"}}'
+        )
+        monkeypatch.setattr("random.random", lambda: 0.5)
+
+        response = agent.process_message("mi cédula es 1234567890 y el código 123456")
+
+        assert "Autenticación exitosa" in response
+        assert agent.current_user_id == "USR001"
+
+
+class TestStreamingAgent:
+    """Suite de tests para astream_message"""
+
+    @pytest.fixture(autouse=True)
+    def kb(self, monkeypatch):
+        """Fixture: Base de conocimiento léxica compartida"""
+        monkeypatch.setattr(knowledge, "_shared_knowledge_base",
+                            KnowledgeBase(use_embeddings=False, docs_dir=None))
+
+    def stream(self, model: FakeModel, message: str):
+        agent = BankingAgent(api_key="test")
+        agent.model = model
+
+        async def collect():
+            return [chunk async for chunk in agent.astream_message(message)]
+
+        return agent, asyncio.run(collect())
+
+    def test_chunks_are_sanitized_across_boundaries(self):
+        """Test: Un número partido entre chunks se enmascara igual que completo"""
+        agent, chunks = self.stream(FakeModel("Tu cuenta 1234567890 está activa."), "hola, necesito ayuda")
+
+        assert len(chunks) > 1
+        assert "".join(chunks) == "Tu cuenta **** está activa."
+        assert agent.get_conversation_history()[-1]["content"] == "Tu cuenta **** está activa."
+
+    def test_tool_call_is_not_streamed(self, monkeypatch):
+        """Test: El JSON de una herramienta no llega al cliente, solo su resultado"""
+        monkeypatch.setattr("random.random", lambda: 0.5)
+        agent, chunks = self.stream(FakeModel(
+            '{"action": "call_tool", "tool_name": "authenticate_user", '
+            '"parameters": {"document_id": "1234567890", "otp_code": "123456"}}'
+        ), "mi cédula es 1234567890 y el código 123456")
+
+        assert len(chunks) == 1
+        assert "Autenticación exitosa" in chunks[0]
+
+    def test_tool_starts_when_json_closes(self, monkeypatch):
+        """Test: La herramienta no espera a que termine la generación"""
+        monkeypatch.setattr("random.random", lambda: 0.5)
+        model = FakeModel(
+            '```json\n{"action": "call_tool", "tool_name": "authenticate_user", '
+            '"parameters": {"document_id": "1234567890", "otp_code": "123456"}}\n```'
+            + "\n" * 400
+        )
+        agent, chunks = self.stream(model, "mi cédula es 1234567890 y el código 123456")
+
+        assert "Autenticación exitosa" in chunks[0]
+        assert model.streamed < len(model.text) // model.chunk_size / 2
+
+
+class KeywordEncoder:
+    """Encoder de prueba: el vector de un texto lo decide la primera palabra clave que contiene"""
+
+    name = "keywords-test"
+    VECTORS = {"bloqueo": [1.0, 0.0, 0.0], "robado": [0.98, 0.2, 0.0], "adicional": [0.0, 0.0, 1.0]}
+
+    def encode(self, texts, batch_size: int = 32):
+        import numpy as np
+        return np.array([
+            next(vector for word, vector in self.VECTORS.items() if word in text.lower())
+            for text in texts
+        ], dtype=np.float32)
+
+
+class TestFastPath:
+    """Suite de tests para la respuesta directa con una FAQ"""
+
+    FAQS = [
+        {"id": "faq_a", "category": "tarjetas", "question": "¿Cómo bloqueo mi tarjeta?",
+         "answer": "Desde la app, en la sección de tarjetas."},
+        {"id": "faq_b", "category": "seguridad", "question": "Reportar plástico robado",
+         "answer": "Llama a la línea de atención."},
+        {"id": "faq_c", "category": "tarjetas", "question": "¿Cómo pido una tarjeta adicional?",
+         "answer": "Solicita tu tarjeta en la oficina."},
+    ]
+
+    @pytest.fixture
+    def engine(self, tmp_path, monkeypatch):
+        pytest.importorskip("numpy")
+        path = tmp_path / "faqs.json"
+        path.write_text(json.dumps({"faqs": self.FAQS}), encoding="utf-8")
+        monkeypatch.setattr(knowledge, "FAQS_FILE", str(path))
+        monkeypatch.setattr(knowledge, "FAQS_JOURNAL_FILE", str(tmp_path / "faqs.journal.jsonl"))
+        monkeypatch.setattr(knowledge, "VECTOR_STORE_DIR", str(tmp_path / "index"))
+        monkeypatch.setattr(knowledge, "_shared_knowledge_base", KnowledgeBase(
+            vector_backend="numpy", embedding_model=KeywordEncoder(), docs_dir=None))
+        return AgentEngine(model=FakeLLM(latency_ms=0))
+
+    def test_margin_uses_semantic_runner_up_fused_out_of_top_k(self, engine):
+        """Test: Un casi empate semántico que la fusión híbrida deja fuera manda la consulta al LLM"""
+        query = "¿Cómo bloqueo mi tarjeta?"
+        hybrid = engine.knowledge.retrieve(query, top_k=2, mode="hybrid", prune=False)
+
+        # La segunda más similar (faq_b) no comparte palabras con la query
+        assert [r.id for r in hybrid] == ["faq_a", "faq_c"]
+        assert engine._confident_faq(hybrid) is not None
+        assert engine._fast_path_faq(query) is None
+
+    def test_clear_winner_skips_the_llm(self, engine):
+        """Test: Sin casi empate semántico la mejor FAQ se responde directamente"""
+        assert engine._fast_path_faq("¿Cómo pido una tarjeta adicional?").id == "faq_c"
@@ -0,0 +1,85 @@
+"""
+Tests para el endpoint en streaming /chat/stream (api.py)
+"""
+
+import importlib
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+import src.knowledge as knowledge
+from src.knowledge import KnowledgeBase
+
+QUESTION = "¿Qué necesito para abrir una cuenta de ahorros?"
+
+
+def parse_events(body: str):
+    """(evento, datos) de cada evento SSE del cuerpo de la respuesta"""
+    events = []
+    for block in body.split("\n\n"):
+        if not block:
+            continue
+        name, data = "message", None
+        for line in block.split("\n"):
+            field, _, value = line.partition(": ")
+            if field == "event":
+                name = value
+            elif field == "data":
+                data = json.loads(value)
+        events.append((name, data))
+    return events
+
+
+class TestChatStream:
+    """Suite de tests para /chat/stream con el backend fake"""
+
+    @pytest.fixture
+    def api(self, monkeypatch):
+        monkeypatch.setattr(knowledge, "_shared_knowledge_base",
+                            KnowledgeBase(use_embeddings=False, docs_dir=None))
+        # Sin watcher de faqs.json: otros tests cambian FAQS_FILE
+        monkeypatch.setattr(knowledge, "start_knowledge_base_watcher", lambda *args, **kwargs: None)
+        api = importlib.import_module("api")
+        monkeypatch.setattr(api.engine.model, "latency_ms", 0)
+        monkeypatch.setattr(api.engine.model, "chunk_ms", 0)
+        return api
+
+    def test_streams_deltas_then_done(self, api):
+        """Test: La respuesta llega en eventos "data" con deltas y termina con "done" """
+        client = TestClient(api.app)
+
+        response = client.post("/chat/stream", json={"message": QUESTION})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_events(response.text)
+        assert events[-1] == ("done", {})
+        deltas = [data["delta"] for name, data in events[:-1]]
+        assert len(deltas) > 1 and all(name == "message" for name, _ in events[:-1])
+
+        state = api.conversations.get_or_create(response.cookies["conversation_id"])
+        assert state.history[-1]["role"] == "assistant"
+        assert state.history[-1]["content"] == "".join(deltas)
+
+    def test_cookie_keeps_the_conversation(self, api):
+        """Test: Con la cookie de la primera respuesta los turnos siguen en la misma conversación"""
+        client = TestClient(api.app)
+
+        client.post("/chat/stream", json={"message": QUESTION})
+        conversation_id = client.cookies["conversation_id"]
+        client.post("/chat/stream", json={"message": "¿Y para una cuenta corriente?"})
+
+        assert client.cookies["conversation_id"] == conversation_id
+        state = api.conversations.get_or_create(conversation_id)
+        assert [msg["role"] for msg in state.history] == ["user", "assistant"] * 2
+
+    def test_empty_message(self, api):
+        """Test: Un mensaje vacío se rechaza sin abrir el stream"""
+        response = TestClient(api.app).post("/chat/stream", json={"message": ""})
+
+        assert response.status_code == 400
@@ -0,0 +1,159 @@
+"""
+Tests para las cachés en memoria (src/cache.py) y la normalización de queries
+"""
+
+import pytest
+
+from src.cache import LRUCache
+from src.normalization import normalize_query
+
+
+class TestLRUCache:
+    """Suite de tests para LRUCache"""
+
+    def test_evicts_least_recently_used(self):
+        """Test: Al superar maxsize se desaloja la entrada menos reciente"""
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert len(cache) == 2
+
+    def test_counters(self):
+        """Test: Se cuentan aciertos, fallos y desalojos"""
+        cache = LRUCache(1)
+        cache.get("a")
+        cache.put("a", 1)
+        cache.get("a")
+        cache.put("b", 2)
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["evictions"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_zero_size_disables_cache(self):
+        """Test: maxsize = 0 no almacena nada"""
+        cache = LRUCache(0)
+        cache.put("a", 1)
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestNormalizeQuery:
+    """Suite de tests para normalize_query"""
+
+    @pytest.mark.parametrize("variant", [
+        "¿Cuáles son los horarios?",
+        "cuales son los horarios",
+        "  CUÁLES   son los HORARIOS!!  ",
+        "cuales_son_los_horarios",
+    ])
+    def test_variants_share_key(self, variant):
+        """Test: Variantes de mayúsculas, tildes y puntuación comparten clave"""
+        assert normalize_query(variant) == "cuales son los horarios"
+
+
+class TestQueryEmbeddingCache:
+    """Suite de tests para la caché de embeddings de queries del KnowledgeBase"""
+
+    @pytest.fixture
+    def kb(self):
+        np = pytest.importorskip("numpy")
+        from src.knowledge import KnowledgeBase
+
+        class CountingModel:
+            def __init__(self):
+                self.encoded = []
+
+            def encode(self, texts):
+                self.encoded.append(list(texts))
+                return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+        kb = KnowledgeBase(use_embeddings=False)
+        kb.embedding_model = CountingModel()
+        return kb
+
+    def test_repeated_queries_hit_cache(self, kb):
+        """Test: Una query normalizada igual no se vuelve a codificar"""
+        first = kb.embed_query("¿Horarios?")
+        second = kb.embed_query("horarios")
+
+        assert second is first
+        assert len(kb.embedding_model.encoded) == 1
+        assert kb.query_embedding_cache.get_stats()["hits"] == 1
+
+    def test_batch_encodes_only_misses_once(self, kb):
+        """Test: En lote solo se codifican los fallos, sin duplicados"""
+        kb.embed_query("horarios")
+
+        embeddings = kb.embed_queries(["Horarios", "tarjeta", "TARJETA?"])
+
+        assert kb.embedding_model.encoded[-1] == ["tarjeta"]
+        assert embeddings[1] is embeddings[2]
+        assert not embeddings[0].flags.writeable
+
+
+class TestSemanticResponseCache:
+    """Suite de tests para SemanticResponseCache"""
+
+    @pytest.fixture
+    def clock(self):
+        class Clock:
+            now = 0.0
+
+            def __call__(self):
+                return self.now
+
+        return Clock()
+
+    @pytest.fixture
+    def cache(self, clock):
+        from src.cache import SemanticResponseCache
+        return SemanticResponseCache(maxsize=2, ttl_seconds=60, threshold=0.9, clock=clock)
+
+    def test_exact_normalized_match(self, cache):
+        """Test: Sin embeddings se reutiliza por texto normalizado"""
+        cache.put("¿Cuál es el horario?", "8 a 5")
+
+        assert cache.get("cual es el HORARIO") == "8 a 5"
+        assert cache.get("otra pregunta") is None
+
+    def test_semantic_match_respects_threshold_and_namespace(self, cache):
+        """Test: Se reutiliza por similitud solo sobre el umbral y en el mismo namespace"""
+        np = pytest.importorskip("numpy")
+        cache.put("horarios", "8 a 5", embedding=np.array([1.0, 0.0]), namespace=("v1", False))
+
+        close = np.array([0.95, 0.1])
+        far = np.array([0.5, 0.5])
+        assert cache.get("a qué hora abren", close, namespace=("v1", False)) == "8 a 5"
+        assert cache.get("a qué hora abren", far, namespace=("v1", False)) is None
+        assert cache.get("a qué hora abren", close, namespace=("v2", False)) is None
+        assert cache.get_stats()["semantic_hits"] == 1
+
+    def test_ttl_and_size_eviction(self, cache, clock):
+        """Test: Las entradas expiran por TTL y se desaloja la menos reciente"""
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        assert cache.get("b") is None
+
+        clock.now = 61
+        assert cache.get("a") is None
+        assert cache.get_stats()["expirations"] == 1
+
+    def test_content_version_change_invalidates(self, cache):
+        """Test: Un cambio de contenido de la base de conocimiento vacía la caché"""
+        cache.put("horarios", "8 a 5", content_version="v1")
+
+        assert cache.get("horarios", content_version="v1") == "8 a 5"
+        assert cache.get("horarios", content_version="v2") is None
+        assert len(cache) == 0
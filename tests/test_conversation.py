@@ -0,0 +1,68 @@
+"""
+Tests para el estado por conversación (src/conversation.py)
+"""
+
+import time
+
+from src.conversation import ConversationState, ConversationStore
+
+
+class TestConversationState:
+    """Suite de tests para ConversationState"""
+
+    def test_history_is_bounded(self):
+        """Test: El historial conserva solo los últimos max_history mensajes"""
+        state = ConversationState(max_history=3)
+        for i in range(5):
+            state.add_message("user", f"mensaje {i}")
+
+        assert [m["content"] for m in state.history] == ["mensaje 2", "mensaje 3", "mensaje 4"]
+
+
+class TestConversationStore:
+    """Suite de tests para ConversationStore"""
+
+    def test_lookup_by_id(self):
+        """Test: El mismo id devuelve el mismo estado; uno desconocido crea otro"""
+        store = ConversationStore()
+        state = store.get_or_create(None)
+
+        assert store.get_or_create(state.conversation_id) is state
+        assert store.get_or_create("desconocido") is not state
+        assert len(store) == 2
+
+    def test_capacity_evicts_least_recent(self):
+        """Test: Al superar el máximo se descarta la conversación menos reciente"""
+        evicted = []
+        store = ConversationStore(max_conversations=2, on_evict=evicted.append)
+        first = store.get_or_create(None)
+        second = store.get_or_create(None)
+        store.get_or_create(first.conversation_id)  # first pasa a ser la más reciente
+
+        store.get_or_create(None)
+
+        assert evicted == [second]
+        assert store.get_or_create(first.conversation_id) is first
+        assert store.get_stats()["evictions"]["capacity"] == 1
+
+    def test_memory_cap(self):
+        """Test: El tope de memoria descarta conversaciones viejas, nunca la actual"""
+        store = ConversationStore(max_memory_mb=0.01)
+        store.get_or_create(None)
+        current = store.get_or_create(None)
+        current.add_message("assistant", "x" * 20000)
+
+        store.update(current)
+
+        assert len(store) == 1
+        assert store.get_or_create(current.conversation_id) is current
+        assert store.get_stats()["evictions"]["memory"] == 1
+
+    def test_idle_conversations_expire(self):
+        """Test: Las conversaciones inactivas se descartan"""
+        store = ConversationStore(idle_minutes=0.001)
+        state = store.get_or_create(None)
+        time.sleep(0.1)
+
+        assert store.get_or_create(state.conversation_id) is not state
+        assert store.get_stats()["evictions"]["idle"] == 1
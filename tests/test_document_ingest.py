@@ -0,0 +1,94 @@
+"""
+Tests para la ingesta de documentos markdown por fragmentos (src/document_ingest.py)
+"""
+
+import pytest
+
+from src.document_ingest import MarkdownChunker, iter_document_chunks, read_chunk
+
+DOCUMENT = """# Manual de Tarjetas
+
+Introducción al manual.
+
+## Bloqueo
+
+Si pierdes tu tarjeta, bloquéala desde la app.
+
+Luego solicita una reposición en agencia.
+
+## Comandos
+
+```bash
+# esto no es un encabezado
+
+curl https://api.banco.ec/bloqueo
+```
+"""
+
+
+class TestMarkdownChunker:
+    """Suite de tests para MarkdownChunker"""
+
+    @pytest.fixture
+    def docs(self, tmp_path):
+        (tmp_path / "tarjetas.md").write_text(DOCUMENT, encoding="utf-8")
+        (tmp_path / "notas.txt").write_text("no es markdown", encoding="utf-8")
+        return tmp_path
+
+    def test_chunks_follow_headings(self, docs):
+        """Test: Cada fragmento pertenece a una sección y lleva su ruta de encabezados"""
+        chunks = list(iter_document_chunks(str(docs)))
+
+        assert [chunk.ref.title for chunk in chunks] == [
+            "Manual de Tarjetas",
+            "Manual de Tarjetas › Bloqueo",
+            "Manual de Tarjetas › Comandos",
+        ]
+        assert chunks[1].text.startswith("Si pierdes") and chunks[1].text.endswith("agencia.")
+        assert {chunk.ref.source for chunk in chunks} == {"tarjetas.md"}
+
+    def test_code_blocks_are_not_split_on_comments(self, docs):
+        """Test: Un '#' dentro de un bloque de código no abre una sección"""
+        commands = list(iter_document_chunks(str(docs)))[-1]
+
+        assert commands.text.startswith("```bash") and commands.text.endswith("```")
+
+    def test_long_sections_overlap(self, tmp_path):
+        """Test: Los fragmentos de una sección larga respetan el tamaño y se solapan"""
+        paragraphs = [f"Párrafo {i} " + "x" * 40 for i in range(10)]
+        (tmp_path / "largo.md").write_text("# Largo\n\n" + "\n\n".join(paragraphs), encoding="utf-8")
+
+        chunks = list(MarkdownChunker(chunk_size=120, overlap=60).chunk_file(str(tmp_path), "largo.md"))
+
+        assert len(chunks) > 1
+        assert all(len(chunk.text) <= 120 for chunk in chunks)
+        for previous, current in zip(chunks, chunks[1:]):
+            assert previous.text.split("\n\n")[-1] == current.text.split("\n\n")[0]
+
+    def test_read_chunk_detects_changes(self, docs):
+        """Test: El texto se relee del archivo y un cambio posterior lo invalida"""
+        chunk = list(iter_document_chunks(str(docs)))[1]
+        assert read_chunk(str(docs), chunk.ref) == chunk.text
+
+        (docs / "tarjetas.md").write_text(DOCUMENT.replace("app", "web"), encoding="utf-8")
+        assert read_chunk(str(docs), chunk.ref) is None
+
+
+class TestKnowledgeBaseDocuments:
+    """Suite de tests para la indexación de documentos en KnowledgeBase"""
+
+    def test_chunks_are_searchable_next_to_faqs(self, tmp_path):
+        """Test: Los fragmentos se recuperan con su documento de origen"""
+        from src.knowledge import KnowledgeBase
+
+        (tmp_path / "tarjetas.md").write_text(DOCUMENT, encoding="utf-8")
+        kb = KnowledgeBase(use_embeddings=False, docs_dir=str(tmp_path))
+
+        results = kb.retrieve("reposición de tarjeta en agencia", top_k=3, mode="lexical")
+
+        assert results[0].source == "tarjetas.md"
+        assert results[0].question == "Manual de Tarjetas › Bloqueo"
+        assert "reposición" in results[0].answer
+        assert kb.get_statistics()["documents"]["chunks"] == 3
+        # Los fragmentos no pertenecen a ninguna categoría de FAQs
+        assert all(r.source is None for r in kb.retrieve("tarjeta", top_k=5, categories=["tarjetas"]))
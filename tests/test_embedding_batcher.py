@@ -0,0 +1,84 @@
+"""
+Tests para el micro-batching de embeddings de queries (src/embedding_batcher.py)
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.embedding_batcher import MicroBatchEncoder
+
+
+class RecordingModel:
+    """Modelo falso: registra los lotes y tarda hasta que se libera"""
+
+    def __init__(self):
+        self.batches = []
+        self.encoding = 0
+        self.release = threading.Event()
+
+    def encode(self, texts):
+        self.encoding = len(texts)
+        self.release.wait(timeout=5)
+        self.batches.append(list(texts))
+        if "falla" in texts:
+            raise RuntimeError("modelo caído")
+        return [f"emb:{text}" for text in texts]
+
+
+class TestMicroBatchEncoder:
+    """Suite de tests para MicroBatchEncoder"""
+
+    @pytest.fixture
+    def model(self):
+        return RecordingModel()
+
+    @pytest.fixture
+    def encoder(self, model):
+        encoder = MicroBatchEncoder(model, max_batch_size=8, max_wait_ms=50)
+        yield encoder
+        model.release.set()
+        encoder.close()
+
+    def test_concurrent_callers_share_batches(self, encoder, model):
+        """Test: Las queries que llegan mientras el modelo trabaja salen en un lote"""
+        results = {}
+
+        def call(text):
+            results[text] = encoder.encode([text])
+
+        threads = [threading.Thread(target=call, args=(f"q{i}",)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        # Liberar el modelo cuando el resto de las queries ya está en cola
+        deadline = time.monotonic() + 5
+        while model.encoding + encoder.get_stats()["queue_depth"] < 6 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        model.release.set()
+        for thread in threads:
+            thread.join()
+
+        assert results == {f"q{i}": [f"emb:q{i}"] for i in range(6)}
+        assert sum(len(batch) for batch in model.batches) == 6
+        assert len(model.batches) <= 2
+        stats = encoder.get_stats()
+        assert stats["items"] == 6 and stats["max_batch_size"] > 1
+
+    def test_errors_reach_every_caller_in_batch(self, encoder, model):
+        """Test: Si el modelo falla, cada llamador del lote recibe la excepción"""
+        model.release.set()
+
+        with pytest.raises(RuntimeError):
+            encoder.encode(["ok", "falla"])
+        assert encoder.encode(["ok"]) == ["emb:ok"]
+
+    def test_async_encode(self, encoder, model):
+        """Test: aencode espera el resultado sin bloquear el event loop"""
+        model.release.set()
+
+        async def main():
+            return await asyncio.gather(encoder.aencode(["a"]), encoder.aencode(["b", "c"]))
+
+        assert asyncio.run(main()) == [["emb:a"], ["emb:b", "emb:c"]]
@@ -0,0 +1,78 @@
+"""
+Tests para los backends de embeddings (src/embeddings.py)
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.embeddings import HashingEncoder, create_embedding_backend
+
+
+class TestHashingEncoder:
+    """Suite de tests para HashingEncoder"""
+
+    @pytest.fixture
+    def encoder(self):
+        return HashingEncoder(dimensions=512)
+
+    def test_normalized_and_stable(self, encoder):
+        """Test: Vectores unitarios e idénticos entre instancias (hash estable)"""
+        vectors = encoder.encode(["¿Cuánto cobran por transferencias?", "horarios"])
+
+        assert vectors.shape == (2, 512)
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+        assert np.array_equal(vectors, HashingEncoder(dimensions=512).encode(
+            ["¿Cuánto cobran por transferencias?", "horarios"]
+        ))
+
+    def test_related_texts_are_closer(self, encoder):
+        """Test: Variantes morfológicas quedan más cerca que textos no relacionados"""
+        query, related, unrelated = encoder.encode([
+            "costo de transferir dinero",
+            "¿Cuánto cobran por transferencias?",
+            "horarios de atención los sábados",
+        ])
+
+        assert query @ related > query @ unrelated
+
+    def test_empty_text_is_zero_vector(self, encoder):
+        """Test: Un texto sin términos produce un vector nulo (sin NaN)"""
+        assert not encoder.encode(["de la"]).any()
+
+    def test_unknown_backend(self):
+        """Test: Un backend desconocido se rechaza"""
+        with pytest.raises(ValueError):
+            create_embedding_backend("word2vec", "modelo")
+
+
+class TestKnowledgeBaseHashingBackend:
+    """Suite de tests para KnowledgeBase con el backend de hashing"""
+
+    def test_semantic_search_without_model_download(self, tmp_path, monkeypatch):
+        """Test: La búsqueda semántica funciona con el backend de hashing"""
+        import src.knowledge as knowledge
+        monkeypatch.setattr(knowledge, "VECTOR_STORE_DIR", str(tmp_path))
+
+        kb = knowledge.KnowledgeBase(vector_backend="numpy", docs_dir=None,
+                                     embedding_backend="hashing")
+
+        assert kb.use_embeddings
+        assert kb.embedding_model_name.startswith("hashing-")
+        assert kb.retrieve("diferencia entre cuenta corriente y de ahorros",
+                           top_k=1, mode="semantic")[0].id == "faq_003"
+
+    def test_missing_chromadb_falls_back_to_numpy(self, tmp_path, monkeypatch):
+        """Test: Sin chromadb instalado el backend por defecto (chroma) cae a numpy"""
+        import src.knowledge as knowledge
+        import src.vector_store as vector_store
+        monkeypatch.setattr(knowledge, "VECTOR_STORE_DIR", str(tmp_path))
+        monkeypatch.setattr(vector_store, "CHROMA_AVAILABLE", False)
+
+        kb = knowledge.KnowledgeBase(vector_backend="chroma", docs_dir=None,
+                                     embedding_backend="hashing")
+
+        assert kb.use_embeddings and kb.vector_backend == "numpy"
+        assert kb.supports_hot_reload
+        assert kb.retrieve("diferencia entre cuenta corriente y de ahorros",
+                           top_k=1, mode="semantic")[0].id == "faq_003"
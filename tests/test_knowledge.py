@@ -0,0 +1,269 @@
+"""
+Tests para la base de conocimiento (src/knowledge.py): índice persistente
+incremental, índice IVF y búsqueda por lotes, recarga en caliente, journal
+de FAQs y su compactación
+"""
+
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import src.knowledge as knowledge
+
+FAQS = [
+    {"id": "faq_001", "category": "horarios", "question": "¿Cuáles son los horarios?",
+     "answer": "Lunes a viernes de 8 a 5.", "keywords": ["horario"]},
+    {"id": "faq_002", "category": "tarjetas", "question": "¿Cómo cambio el PIN?",
+     "answer": "Desde la app.", "keywords": ["pin"]},
+]
+
+
+def _write_faqs(path, faqs):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"faqs": faqs}, f, ensure_ascii=False)
+    # Forzar una firma distinta aunque el sistema de archivos tenga poca resolución
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class CountingEncoder:
+    """Backend de hashing que registra los textos que codifica"""
+
+    def __init__(self):
+        from src.embeddings import HashingEncoder
+        self.encoder = HashingEncoder(dimensions=256)
+        self.name = self.encoder.name
+        self.texts = []
+
+    def encode(self, texts, batch_size: int = 32):
+        self.texts.extend(texts)
+        return self.encoder.encode(texts, batch_size=batch_size)
+
+
+class TestIncrementalIndex:
+    """Suite de tests para la reutilización del índice vectorial persistente"""
+
+    def test_restart_embeds_only_the_edited_faq(self, tmp_path, monkeypatch):
+        """Test: Al reconstruir sobre el mismo índice solo se embebe la FAQ editada"""
+        pytest.importorskip("numpy")
+        path = tmp_path / "faqs.json"
+        _write_faqs(path, FAQS)
+        monkeypatch.setattr(knowledge, "FAQS_FILE", str(path))
+        monkeypatch.setattr(knowledge, "FAQS_JOURNAL_FILE", str(tmp_path / "faqs.journal.jsonl"))
+        monkeypatch.setattr(knowledge, "VECTOR_STORE_DIR", str(tmp_path / "index"))
+
+        def build():
+            encoder = CountingEncoder()
+            kb = knowledge.KnowledgeBase(vector_backend="numpy", embedding_model=encoder, docs_dir=None)
+            return kb, encoder
+
+        _, first = build()
+        _write_faqs(path, FAQS[:1] + [{**FAQS[1], "answer": "Solo en el cajero."}])
+        kb, second = build()
+
+        assert len(first.texts) == 2
+        assert second.texts == ["¿Cómo cambio el PIN? Solo en el cajero."]
+        assert kb.index_stats == {"reused": 1, "embedded": 1, "deleted": 0}
+        assert kb.vector_store.count() == 2
+
+
+class TestIvfIndexAndBatchSearch:
+    """Suite de tests para rebuild_ann_index y la búsqueda por lotes"""
+
+    QUERIES = ["¿Cuáles son los horarios de atención?", "bloquear mi tarjeta",
+               "diferencia entre cuenta corriente y de ahorros", "requisitos para un crédito"]
+
+    @pytest.fixture
+    def kb(self, tmp_path, monkeypatch):
+        pytest.importorskip("numpy")
+        monkeypatch.setattr(knowledge, "VECTOR_STORE_DIR", str(tmp_path))
+        return knowledge.KnowledgeBase(vector_backend="ivf", docs_dir=None,
+                                       embedding_backend="hashing")
+
+    def test_rebuild_keeps_results(self, kb):
+        """Test: Re-entrenar las particiones IVF no cambia los resultados (nprobe >= nlist)"""
+        before = [kb.retrieve_hits(query, top_k=3, mode="semantic") for query in self.QUERIES]
+
+        kb.rebuild_ann_index(nlist=4)
+
+        assert kb.vector_store.trained
+        assert [kb.retrieve_hits(query, top_k=3, mode="semantic") for query in self.QUERIES] == before
+        reopened = knowledge.KnowledgeBase(vector_backend="ivf", docs_dir=None,
+                                           embedding_backend="hashing")
+        assert reopened.index_stats["embedded"] == 0
+        assert [reopened.retrieve_hits(query, top_k=3, mode="semantic") for query in self.QUERIES] == before
+
+    @pytest.mark.parametrize("mode", ["semantic", "hybrid", "lexical"])
+    def test_batch_equals_one_by_one(self, kb, mode):
+        """Test: Buscar en lote da lo mismo que buscar las queries de a una"""
+        kb.rebuild_ann_index(nlist=4)
+
+        assert kb.retrieve_hits_batch(self.QUERIES, top_k=3, mode=mode) == [
+            kb.retrieve_hits(query, top_k=3, mode=mode) for query in self.QUERIES
+        ]
+        assert kb.search_batch(self.QUERIES, top_k=3, mode=mode) == [
+            kb.search(query, top_k=3, mode=mode) for query in self.QUERIES
+        ]
+
+
+class TestHotReload:
+    """Suite de tests para reload_knowledge_base y KnowledgeBaseWatcher"""
+
+    @pytest.fixture
+    def faqs_file(self, tmp_path, monkeypatch):
+        path = tmp_path / "faqs.json"
+        _write_faqs(path, FAQS)
+        monkeypatch.setattr(knowledge, "FAQS_FILE", str(path))
+        monkeypatch.setattr(knowledge, "FAQS_JOURNAL_FILE", str(tmp_path / "faqs.journal.jsonl"))
+        monkeypatch.setattr(knowledge, "_shared_knowledge_base", knowledge.KnowledgeBase(use_embeddings=False, docs_dir=None))
+        return path
+
+    def test_reload_swaps_instance_and_keeps_old_snapshot(self, faqs_file):
+        """Test: La recarga publica una instancia nueva y no toca la anterior"""
+        old = knowledge.get_knowledge_base()
+        _write_faqs(faqs_file, FAQS[:1] + [{**FAQS[1], "answer": "Solo en el cajero."}])
+
+        fresh = knowledge.reload_knowledge_base()
+
+        assert knowledge.get_knowledge_base() is fresh is not old
+        assert "cajero" in fresh.search("cambiar pin", top_k=1, mode="lexical")
+        assert "app" in old.search("cambiar pin", top_k=1, mode="lexical")
+        assert fresh.content_version != old.content_version
+        # Los hilos de búsqueda no se acumulan con cada recarga
+        assert fresh._search_executor is old._search_executor
+
+    def test_watcher_reloads_only_on_change(self, faqs_file):
+        """Test: El watcher recarga cuando cambia faqs.json y solo entonces"""
+        watcher = knowledge.KnowledgeBaseWatcher(interval_seconds=60)
+
+        assert watcher.check() is False
+
+        _write_faqs(faqs_file, FAQS[:1])
+        assert watcher.check() is True
+        assert len(knowledge.get_knowledge_base().faqs) == 1
+        assert watcher.check() is False
+
+    def test_invalid_file_keeps_current_instance(self, faqs_file):
+        """Test: Un faqs.json inválido no reemplaza la base vigente"""
+        current = knowledge.get_knowledge_base()
+        faqs_file.write_text('{"faqs": [', encoding='utf-8')
+        watcher = knowledge.KnowledgeBaseWatcher(interval_seconds=60)
+
+        assert watcher.check() is False
+        assert knowledge.get_knowledge_base() is current
+        assert watcher.check() is False
+
+    def test_late_writes_are_redirected(self, faqs_file):
+        """Test: Escribir sobre la instancia reemplazada actualiza la vigente"""
+        old = knowledge.get_knowledge_base()
+        fresh = knowledge.reload_knowledge_base()
+
+        old.add_faq("¿Atienden feriados?", "No.", "horarios", ["feriado"])
+
+        assert len(fresh.faqs) == 3
+        assert len(old.faqs) == 2
+
+    def test_compaction_does_not_trigger_reload(self, faqs_file):
+        """Test: La compactación propia del journal no dispara una recarga"""
+        kb = knowledge.get_knowledge_base()
+        kb.add_faq("¿Atienden feriados?", "No.", "horarios", ["feriado"])
+        kb.compact_journal()
+
+        assert knowledge.KnowledgeBaseWatcher(interval_seconds=60).check() is False
+
+    def test_shared_vector_store_refuses_hot_reload(self, faqs_file, monkeypatch):
+        """Test: Con un almacén compartido (chroma) no se recarga en caliente"""
+        current = knowledge.get_knowledge_base()
+        monkeypatch.setattr(current, "use_embeddings", True)
+        monkeypatch.setattr(current, "vector_store", SimpleNamespace(supports_snapshots=False), raising=False)
+        _write_faqs(faqs_file, FAQS[:1])
+
+        with pytest.raises(RuntimeError):
+            knowledge.reload_knowledge_base()
+        assert knowledge.KnowledgeBaseWatcher(interval_seconds=60).check() is False
+        assert knowledge.start_knowledge_base_watcher(interval_seconds=60) is None
+        assert knowledge.get_knowledge_base() is current
+
+    def test_reload_reuses_encoder_and_search_threads(self, faqs_file, tmp_path, monkeypatch):
+        """Test: Con embeddings la recarga reutiliza el encoder y los hilos de búsqueda"""
+        monkeypatch.setattr(knowledge, "VECTOR_STORE_DIR", str(tmp_path / "index"))
+        monkeypatch.setattr(knowledge, "_shared_knowledge_base", knowledge.KnowledgeBase(
+            vector_backend="numpy", docs_dir=None, embedding_backend="hashing"))
+        old = knowledge.get_knowledge_base()
+        _write_faqs(faqs_file, FAQS[:1])
+
+        fresh = knowledge.reload_knowledge_base()
+
+        assert fresh.use_embeddings and fresh is not old
+        assert fresh.query_encoder is old.query_encoder
+        assert fresh._search_executor is old._search_executor
+
+
+class TestFaqJournal:
+    """Suite de tests para remove_faqs, el journal append-only y su compactación"""
+
+    @pytest.fixture
+    def faqs_file(self, tmp_path, monkeypatch):
+        path = tmp_path / "faqs.json"
+        _write_faqs(path, FAQS)
+        monkeypatch.setattr(knowledge, "FAQS_FILE", str(path))
+        monkeypatch.setattr(knowledge, "FAQS_JOURNAL_FILE", str(tmp_path / "faqs.journal.jsonl"))
+        return path
+
+    def build(self):
+        return knowledge.KnowledgeBase(use_embeddings=False, docs_dir=None)
+
+    def test_remove_faqs(self, faqs_file):
+        """Test: remove_faqs quita la FAQ de todos los índices y no reutiliza su id"""
+        kb = self.build()
+
+        assert kb.remove_faqs(["faq_002", "faq_999"]) == 1
+        assert [faq['id'] for faq in kb.faqs] == ["faq_001"]
+        assert kb.find_faq_by_question("¿Cómo cambio el PIN?") is None
+        assert kb.get_faq_by_category("tarjetas") == []
+        assert "tarjetas" not in kb.get_all_categories()
+        assert all(r.id != "faq_002" for r in kb.retrieve("cambiar pin", mode="lexical", prune=False))
+        assert kb.retrieve("horario", top_k=1, mode="lexical", prune=False)[0].id == "faq_001"
+        assert kb.remove_faqs(["faq_002"]) == 0
+
+        kb.add_faq("¿Atienden feriados?", "No.", "horarios", ["feriado"])
+        assert kb.faqs[-1]['id'] == "faq_003"
+
+    def test_journal_is_replayed_on_restart(self, faqs_file):
+        """Test: Altas, cambios y bajas sobreviven a un reinicio sin tocar faqs.json"""
+        kb = self.build()
+        kb.add_faqs([{**FAQS[0], "answer": "Lunes a sábado de 8 a 5."},
+                     {"question": "¿Atienden feriados?", "answer": "No.", "category": "horarios"}])
+        kb.remove_faqs(["faq_002"])
+        original = faqs_file.read_text(encoding='utf-8')
+
+        restarted = self.build()
+
+        assert faqs_file.read_text(encoding='utf-8') == original
+        assert [faq['id'] for faq in restarted.faqs] == ["faq_001", "faq_003"]
+        assert "sábado" in restarted.faqs[0]['answer']
+        assert restarted.get_statistics()["journal_entries"] == 3
+
+    def test_truncated_journal_line_is_ignored(self, faqs_file):
+        """Test: Una línea a medio escribir del journal no impide arrancar"""
+        self.build().remove_faqs(["faq_002"])
+        with open(knowledge.FAQS_JOURNAL_FILE, 'a', encoding='utf-8') as f:
+            f.write('{"op": "delete", "id": "faq_0')
+
+        assert [faq['id'] for faq in self.build().faqs] == ["faq_001"]
+
+    def test_compaction_rewrites_faqs_and_clears_journal(self, faqs_file, monkeypatch):
+        """Test: Al llegar al umbral el journal se vuelca a faqs.json y se vacía"""
+        monkeypatch.setattr(knowledge, "FAQ_JOURNAL_COMPACT_THRESHOLD", 2)
+        kb = self.build()
+
+        kb.add_faq("¿Atienden feriados?", "No.", "horarios", ["feriado"])
+        assert os.path.exists(knowledge.FAQS_JOURNAL_FILE)
+        kb.remove_faqs(["faq_001"])
+
+        assert not os.path.exists(knowledge.FAQS_JOURNAL_FILE)
+        with open(faqs_file, encoding='utf-8') as f:
+            assert [faq['id'] for faq in json.load(f)['faqs']] == ["faq_002", "faq_003"]
+        assert [faq['id'] for faq in self.build().faqs] == ["faq_002", "faq_003"]
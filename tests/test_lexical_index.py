@@ -0,0 +1,82 @@
+"""
+Tests para el índice BM25 de la búsqueda por keywords (src/lexical_index.py)
+"""
+
+import pytest
+
+from src.lexical_index import BM25Index, tokenize
+
+WEIGHTS = {"keywords": 3.0, "question": 2.0, "answer": 1.0}
+
+
+class TestTokenize:
+    """Suite de tests para la tokenización"""
+
+    def test_folds_accents_and_stems_plurals(self):
+        """Test: Variantes con tilde y en plural producen el mismo token"""
+        assert tokenize("¿Cuánto cobran?") == tokenize("cuanto cobran")
+        assert tokenize("comisiones tarjetas") == tokenize("comisión tarjeta")
+        assert tokenize("intereses") == tokenize("interés")
+
+    def test_drops_stopwords_and_keeps_enie(self):
+        """Test: Se descartan palabras vacías y la ñ se conserva"""
+        assert tokenize("de la cuenta") == tokenize("cuenta")
+        assert tokenize("año") != tokenize("ano")
+
+
+class TestBM25Index:
+    """Suite de tests para BM25Index"""
+
+    @pytest.fixture
+    def index(self):
+        index = BM25Index(WEIGHTS)
+        index.add("horarios", {
+            "question": "¿Cuáles son los horarios de atención?",
+            "answer": "Lunes a viernes de 8 a 5.",
+            "keywords": ["horario", "atencion", "abierto"]
+        })
+        index.add("transferencias", {
+            "question": "¿Cuánto cobran por transferencias?",
+            "answer": "Las transferencias internas son gratuitas.",
+            "keywords": ["transferencia", "costo", "comision"]
+        })
+        index.add("robo", {
+            "question": "¿Qué hago si me robaron mi tarjeta?",
+            "answer": "Bloquea la tarjeta desde la app.",
+            "keywords": ["robo", "bloquear", "tarjeta"]
+        })
+        return index
+
+    def test_ranks_matching_document_first(self, index):
+        """Test: La FAQ que comparte más términos queda primera"""
+        assert index.search("cuanto cuesta una transferencia", 3)[0][0] == "transferencias"
+        assert index.search("¿Está abierto el sábado?", 3)[0][0] == "horarios"
+
+    def test_keywords_field_is_boosted(self, index):
+        """Test: Un término en las keywords pesa más que en la respuesta"""
+        index.add("bloqueo", {
+            "question": "¿Cómo uso la app?",
+            "answer": "Desde la app puedes bloquear tu tarjeta.",
+        })
+
+        assert index.search("bloquear", 2)[0][0] == "robo"
+
+    def test_incremental_replace_and_remove(self, index):
+        """Test: Reemplazar y dar de baja actualiza los postings"""
+        index.add("robo", {"question": "Seguros de auto", "answer": "", "keywords": []})
+        assert index.search("tarjeta robada", 3) == []
+
+        index.remove("transferencias")
+        assert len(index) == 2
+        assert index.search("transferencias", 3) == []
+
+    def test_no_matching_terms(self, index):
+        """Test: Una query sin términos conocidos no devuelve resultados"""
+        assert index.search("de la", 3) == []
+        assert index.search("criptomonedas", 3) == []
+
+    def test_search_filtered_by_ids(self, index):
+        """Test: Con ids solo se devuelven documentos de ese subconjunto"""
+        hits = index.search("tarjeta transferencias", 3, ids=["robo"])
+
+        assert [doc_id for doc_id, _ in hits] == ["robo"]
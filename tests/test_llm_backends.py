@@ -0,0 +1,78 @@
+"""
+Tests para los backends del LLM (src/llm_backends.py)
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import src.knowledge as knowledge
+from src.agent import AgentEngine
+from src.conversation import ConversationState
+from src.knowledge import KnowledgeBase
+from src.llm_backends import FakeLLM, create_llm_backend
+
+
+def prompt_for(message: str, authenticated: bool = False) -> str:
+    state = "ESTADO: Usuario autenticado ✓" if authenticated else "ESTADO: Usuario NO autenticado"
+    return f"Eres un asistente bancario.\n{state}\n\nUsuario: {message}\nAsistente:"
+
+
+class TestFakeLLM:
+    """Suite de tests para FakeLLM"""
+
+    def test_streams_response_in_chunks(self):
+        """Test: El stream entrega la respuesta completa en chunks de chunk_chars"""
+        model = FakeLLM(latency_ms=0, chunk_ms=0, chunk_chars=5, response_chars=40)
+
+        async def run():
+            response = await model.generate_content_async(prompt_for("hola"), stream=True)
+            return [chunk.text async for chunk in response]
+
+        chunks = asyncio.run(run())
+        assert len(chunks) == 8 and all(len(chunk) <= 5 for chunk in chunks)
+        assert "".join(chunks) == model.respond(prompt_for("hola"))
+
+    def test_emits_tool_calls(self):
+        """Test: Emite authenticate_user y las herramientas personales según el prompt"""
+        model = FakeLLM(latency_ms=0)
+
+        auth = json.loads(model.respond(prompt_for("mi cédula es 1234567890, código 123456")))
+        balance = json.loads(model.respond(prompt_for("¿cuál es mi saldo?", authenticated=True)))
+
+        assert auth["tool_name"] == "authenticate_user"
+        assert auth["parameters"] == {"document_id": "1234567890", "otp_code": "123456"}
+        assert balance["tool_name"] == "get_account_balance"
+        # Sin sesión la consulta personal se responde con texto
+        assert not model.respond(prompt_for("¿cuál es mi saldo?")).startswith("{")
+
+    def test_latency_fn_and_errors(self):
+        """Test: La latencia sigue latency_fn y error_rate=1 hace fallar cada llamada"""
+        model = FakeLLM(latency_fn=lambda: 250, error_rate=1.0)
+
+        assert model.sample_latency() == 0.25
+        model.latency_fn = lambda: 0
+        with pytest.raises(ConnectionError):
+            asyncio.run(model.generate_content_async("hola"))
+
+    def test_unknown_backend(self):
+        """Test: Un backend desconocido falla con un mensaje claro"""
+        with pytest.raises(ValueError, match="desconocido"):
+            create_llm_backend("llama")
+
+    def test_agent_runs_offline(self, monkeypatch):
+        """Test: El agente completo autentica y consulta saldo con el backend fake"""
+        monkeypatch.setattr(knowledge, "_shared_knowledge_base",
+                            KnowledgeBase(use_embeddings=False, docs_dir=None))
+        monkeypatch.setattr("random.random", lambda: 0.5)
+        monkeypatch.setattr("random.uniform", lambda a, b: 0)
+        engine = AgentEngine(backend="fake", api_key=None)
+        engine.model.latency_ms = 0
+        state = ConversationState()
+
+        engine.process_message(state, "Mi cédula es 1234567890 y el código 123456")
+        response = engine.process_message(state, "¿Cuál es mi saldo?")
+
+        assert state.authenticated
+        assert "Ahorros" in response
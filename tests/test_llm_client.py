@@ -0,0 +1,187 @@
+"""
+Tests para el cliente de llamadas al LLM (src/llm_client.py)
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.llm_backends import FakeLLM
+from src.llm_client import LLMClient, LLMTimeoutError
+
+
+class ScriptedModel:
+    """Modelo cuyas llamadas siguen un guion: latencia del primer chunk o error"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def generate_content_async(self, prompt, stream: bool = False):
+        step = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        if isinstance(step, Exception):
+            raise step
+        return self._stream(step, f"respuesta {self.calls}")
+
+    async def _stream(self, latency: float, text: str):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(latency)
+            for word in text.split(" "):
+                yield SimpleNamespace(text=word + " ")
+        finally:
+            self.active -= 1
+
+
+class GatedFakeLLM(FakeLLM):
+    """
+    FakeLLM que registra sus streams; a partir de la llamada `gate_from` el
+    primer chunk espera a la siguiente llamada, así la request original y
+    la de respaldo abren su stream a la vez
+    """
+
+    def __init__(self, gate_from: int):
+        super().__init__(latency_ms=0, latency_sigma=0, chunk_ms=0, response_chars=40)
+        self.gate_from = gate_from
+        self.gate = None
+        self.streams = []
+
+    async def generate_content_async(self, prompt, stream: bool = False):
+        response = await super().generate_content_async(prompt, stream)
+        self.streams.append(response)
+        return response
+
+    async def _stream(self, text, latency, failed):
+        if self.calls >= self.gate_from:
+            if self.gate is None:
+                self.gate = asyncio.Event()
+                await self.gate.wait()
+            else:
+                self.gate.set()
+        async for chunk in super()._stream(text, latency, failed):
+            yield chunk
+
+
+def collect(client: LLMClient, prompt: str = "hola") -> str:
+    async def run():
+        return "".join([chunk async for chunk in client.stream(prompt)])
+    return asyncio.run(run())
+
+
+class TestLLMClient:
+    """Suite de tests para LLMClient"""
+
+    def test_retries_transient_errors(self):
+        """Test: Un error transitorio se reintenta y la llamada termina bien"""
+        model = ScriptedModel([ConnectionError("reset"), 0.0])
+        client = LLMClient(model, retry_attempts=2, retry_backoff_seconds=0.01)
+
+        assert collect(client) == "respuesta 2 "
+        assert client.get_stats()["retries"] == 1
+
+    def test_other_errors_are_not_retried(self):
+        """Test: Los errores no transitorios se propagan sin reintentar"""
+        model = ScriptedModel([ValueError("prompt inválido"), 0.0])
+        client = LLMClient(model, retry_attempts=2)
+
+        with pytest.raises(ValueError):
+            collect(client)
+        assert model.calls == 1 and client.get_stats()["errors"] == 1
+
+    def test_first_chunk_deadline(self):
+        """Test: Un intento sin primer chunk a tiempo se corta y se reintenta"""
+        model = ScriptedModel([5.0])
+        client = LLMClient(model, first_chunk_timeout_seconds=0.05,
+                           retry_attempts=1, retry_backoff_seconds=0.01)
+
+        with pytest.raises(LLMTimeoutError):
+            collect(client)
+        assert model.calls == 2
+        assert client.get_stats()["timeouts"] == 1
+
+    def test_hedge_beats_slow_call(self):
+        """Test: Si la llamada supera el p95 observado, gana la request de respaldo"""
+        model = ScriptedModel([0.01] * 5 + [1.0, 0.01])
+        client = LLMClient(model, hedge=True, hedge_min_samples=5)
+        for _ in range(5):
+            collect(client)
+
+        assert collect(client) == "respuesta 7 "
+        stats = client.get_stats()
+        assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+
+    def test_concurrency_limit(self):
+        """Test: Nunca hay más llamadas en vuelo que max_concurrency"""
+        model = ScriptedModel([0.02])
+        client = LLMClient(model, max_concurrency=2)
+
+        async def run():
+            async def one():
+                return "".join([chunk async for chunk in client.stream("hola")])
+            return await asyncio.gather(*(one() for _ in range(6)))
+
+        assert len(asyncio.run(run())) == 6
+        assert model.max_active == 2
+        assert client.get_stats()["in_flight"] == 0
+
+    def test_hedge_loser_stream_is_closed(self):
+        """Test: Si ambas requests abren su stream, la perdedora se cierra"""
+        model = GatedFakeLLM(gate_from=6)
+        client = LLMClient(model, hedge=True, hedge_min_samples=5)
+        for _ in range(5):
+            collect(client)
+
+        async def run():
+            text = "".join([chunk async for chunk in client.stream("hola")])
+            # Dentro del loop: al terminar, asyncio.run cierra todo igual
+            return text, [stream.ag_frame is None for stream in model.streams]
+
+        text, closed = asyncio.run(run())
+        assert text == model.respond("hola")
+        assert client.get_stats()["hedges"] == 1
+        # Un async generator cerrado no conserva su frame
+        assert closed == [True] * 7
+
+    def test_hedge_waits_for_a_slot_within_the_deadline(self):
+        """Test: Si otro loop toma el último cupo, el hedge no bloquea a la request original"""
+        model = ScriptedModel([0.01] * 5 + [0.3])
+        client = LLMClient(model, max_concurrency=1, timeout_seconds=5,
+                           hedge=True, hedge_min_samples=5)
+        for _ in range(5):
+            collect(client)
+        # locked() dice que hay cupo, pero la request original tiene el único
+        client._semaphore.locked = lambda: False
+
+        assert collect(client) == "respuesta 6 "
+        stats = client.get_stats()
+        assert stats["hedges"] == 0 and stats["in_flight"] == 0
+        assert not client._semaphore._waiters and client._semaphore._value == 1
+
+    def test_limit_is_shared_across_event_loops(self):
+        """Test: El mismo cliente limita las llamadas desde varios event loops a la vez"""
+        model = ScriptedModel([0.02])
+        client = LLMClient(model, max_concurrency=1)
+        results = []
+
+        def loop_thread():
+            async def run():
+                async def one():
+                    return "".join([chunk async for chunk in client.stream("hola")])
+                return await asyncio.gather(*(one() for _ in range(3)))
+            results.extend(asyncio.run(run()))
+
+        threads = [threading.Thread(target=loop_thread) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(results) == 6
+        assert model.max_active == 1
+        assert client.get_stats()["in_flight"] == 0
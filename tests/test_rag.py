@@ -5,6 +5,38 @@ Script para probar el sistema RAG con embeddings.
 
 from src.knowledge import KnowledgeBase
 
+# Queries de prueba (también las usan los reportes de benchmarks/)
+TEST_QUERIES = [
+    "¿A qué hora abren?",
+    "Necesito una cuenta para ahorrar dinero",
+    "¿Cuánto me cobran si transfiero plata?",
+    "Perdí mi tarjeta de crédito",
+    "Quiero invertir mi dinero",
+    "¿Tienen seguros para el carro?",
+]
+
+COMPARISON_QUERY = "me robaron la tarjeta"
+
+# Conjunto etiquetado (query -> FAQs relevantes) para evaluar recall por
+# modo de búsqueda (benchmarks/retrieval_eval.py)
+LABELED_QUERIES = {
+    "¿A qué hora abren?": ["faq_001"],
+    "Necesito una cuenta para ahorrar dinero": ["faq_002"],
+    "¿Cuánto me cobran si transfiero plata?": ["faq_006"],
+    "Perdí mi tarjeta de crédito": ["faq_009"],
+    "Quiero invertir mi dinero": ["faq_011"],
+    "¿Tienen seguros para el carro?": ["faq_007"],
+    COMPARISON_QUERY: ["faq_009"],
+    "¿Atienden los domingos?": ["faq_001"],
+    "¿Qué rendimiento paga la cuenta de ahorros?": ["faq_004"],
+    "diferencia entre cuenta corriente y de ahorros": ["faq_003"],
+    "requisitos para sacar una tarjeta de crédito": ["faq_005"],
+    "¿Cómo veo cuánto dinero tengo?": ["faq_008"],
+    "necesito un crédito personal": ["faq_010"],
+    "olvidé la clave de mi tarjeta": ["faq_012"],
+    "quiero poner una queja": ["faq_013"],
+}
+
 def test_rag_system():
     """Prueba el sistema RAG con diferentes queries"""
     
@@ -27,14 +59,7 @@ def test_rag_system():
         print(f"  • Vector DB: {stats['vector_db']}")
     
     # Queries de prueba
-    test_queries = [
-        "¿A qué hora abren?",
-        "Necesito una cuenta para ahorrar dinero",
-        "¿Cuánto me cobran si transfiero plata?",
-        "Perdí mi tarjeta de crédito",
-        "Quiero invertir mi dinero",
-        "¿Tienen seguros para el carro?",
-    ]
+    test_queries = TEST_QUERIES
     
     print("\n" + "="*70)
     print("🔍 PRUEBAS DE BÚSQUEDA SEMÁNTICA")
@@ -66,7 +91,7 @@ def test_rag_system():
         print("📊 COMPARACIÓN: Embeddings vs Keywords")
         print("="*70)
         
-        comparison_query = "me robaron la tarjeta"
+        comparison_query = COMPARISON_QUERY
         
         print(f"\n🔍 Query: \"{comparison_query}\"")
         
@@ -0,0 +1,124 @@
+"""
+Tests para la fusión de resultados de búsqueda (src/retrieval.py)
+"""
+
+import pytest
+
+from src.retrieval import (
+    SearchHit,
+    SearchResult,
+    format_results,
+    passes_min_scores,
+    reciprocal_rank_fusion
+)
+
+
+class TestReciprocalRankFusion:
+    """Suite de tests para reciprocal_rank_fusion"""
+
+    def test_documents_in_both_rankings_win(self):
+        """Test: Un documento bien ubicado en ambas fuentes supera a los de una sola"""
+        hits = reciprocal_rank_fusion({
+            "semantic": [("a", 0.9), ("b", 0.8), ("c", 0.7)],
+            "lexical": [("d", 12.0), ("b", 9.0), ("a", 1.0)],
+        }, top_k=4, k=60)
+
+        assert [hit.id for hit in hits][:2] == ["a", "b"]
+        assert hits[0].score == pytest.approx(1 / 61 + 1 / 63)
+        assert hits[1].score == pytest.approx(2 / 62)
+
+    def test_keeps_per_source_scores(self):
+        """Test: Cada resultado conserva el score original de cada fuente"""
+        hits = reciprocal_rank_fusion({
+            "semantic": [("a", 0.9)],
+            "lexical": [("a", 7.5), ("b", 3.0)],
+        }, top_k=2)
+
+        assert hits[0].scores == {"semantic": 0.9, "lexical": 7.5}
+        assert hits[1].scores == {"lexical": 3.0}
+
+    def test_top_k_limits_results(self):
+        """Test: Se devuelven como máximo top_k resultados"""
+        ranking = [(str(i), 1.0) for i in range(10)]
+
+        assert len(reciprocal_rank_fusion({"lexical": ranking}, top_k=3)) == 3
+
+
+class TestPruningAndFormatting:
+    """Suite de tests para el umbral de score y el formateo con presupuesto"""
+
+    def _result(self, faq_id, answer="respuesta"):
+        return SearchResult(faq_id, f"Pregunta {faq_id}", answer, "general", 1.0)
+
+    def test_min_score_per_source(self):
+        """Test: Basta con que una fuente alcance su mínimo"""
+        min_scores = {"semantic": 0.4, "lexical": 1.0}
+
+        assert passes_min_scores(SearchHit("a", 0.02, {"semantic": 0.5}), min_scores)
+        assert passes_min_scores(SearchHit("a", 0.02, {"semantic": 0.1, "lexical": 3.0}), min_scores)
+        assert not passes_min_scores(SearchHit("a", 0.02, {"semantic": 0.1, "lexical": 0.2}), min_scores)
+
+    def test_format_respects_char_budget(self):
+        """Test: Se agregan resultados en orden hasta agotar el presupuesto"""
+        results = [self._result("1"), self._result("2"), self._result("3")]
+        single = format_results(results[:1])
+
+        text = format_results(results, max_chars=2 * len(single) + 2)
+
+        assert text == format_results(results[:2])
+        assert format_results(results).count("**Pregunta") == 3
+
+    def test_first_result_is_truncated_to_budget(self):
+        """Test: Si el primer resultado no cabe, se recorta"""
+        text = format_results([self._result("1", "x" * 500)], max_chars=50)
+
+        assert len(text) == 50
+        assert text.endswith("…")
+
+
+class TestKnowledgeBaseRetrieve:
+    """Suite de tests para KnowledgeBase.retrieve (búsqueda léxica)"""
+
+    @pytest.fixture
+    def kb(self):
+        from src.knowledge import KnowledgeBase
+        return KnowledgeBase(use_embeddings=False, docs_dir=None)
+
+    def test_structured_results(self, kb):
+        """Test: retrieve devuelve resultados estructurados ordenados por score"""
+        results = kb.retrieve("¿Cuánto cobran por transferencias?", top_k=3)
+
+        assert results[0].id == "faq_006"
+        assert results[0].category == "transferencias"
+        assert results[0].scores["lexical"] == results[0].score
+        assert [r.score for r in results] == sorted((r.score for r in results), reverse=True)
+
+    def test_low_scores_are_pruned(self, kb):
+        """Test: Los resultados bajo el score mínimo se descartan"""
+        query = "¿Cuánto cobran por transferencias?"
+        unpruned = kb.retrieve(query, top_k=3, prune=False)
+        kb.min_scores = {"lexical": unpruned[0].score}
+
+        pruned = kb.retrieve(query, top_k=3)
+
+        assert len(unpruned) > 1
+        assert [r.id for r in pruned] == ["faq_006"]
+
+    def test_find_faq_by_exact_question(self, kb):
+        """Test: Una pregunta idéntica a una FAQ (salvo tildes y signos) se reconoce"""
+        match = kb.find_faq_by_question("cuales son los HORARIOS de atencion")
+
+        assert match.id == "faq_001"
+        assert match.scores == {"exact": 1.0}
+        assert kb.find_faq_by_question("horarios de atención") is None
+
+    def test_exact_question_index_follows_updates(self, kb, tmp_path, monkeypatch):
+        """Test: Al editar la pregunta de una FAQ se actualiza el índice exacto"""
+        import src.knowledge as knowledge
+        monkeypatch.setattr(knowledge, "FAQS_JOURNAL_FILE", str(tmp_path / "journal.jsonl"))
+        faq = dict(kb.faqs[0], question="¿A qué hora abren?")
+
+        kb.add_faqs([faq])
+
+        assert kb.find_faq_by_question("a que hora abren").id == faq["id"]
+        assert kb.find_faq_by_question("¿Cuáles son los horarios de atención?") is None
@@ -0,0 +1,37 @@
+"""
+Tests para la sanitización de respuestas (src/security.py)
+"""
+
+import pytest
+
+from src.security import SecurityManager, StreamSanitizer
+
+
+class TestStreamSanitizer:
+    """Suite de tests para StreamSanitizer"""
+
+    @pytest.fixture
+    def security(self):
+        return SecurityManager()
+
+    @pytest.mark.parametrize("text", [
+        "Tu cuenta 1234567890 tiene $5,420.50 disponibles.",
+        "Tarjeta 4111 1111 1111 1111 bloqueada",
+        "Cédula a1234567890 y monto $999.99",
+    ])
+    def test_matches_full_sanitization(self, security, text):
+        """Test: Sanitizar por chunks da lo mismo que sanitizar la respuesta completa"""
+        expected = security.sanitize_output(text, authenticated=False)
+        for size in (1, 3, 7):
+            sanitizer = StreamSanitizer(security, authenticated=False)
+            pieces = [sanitizer.feed(text[i:i + size]) for i in range(0, len(text), size)]
+            pieces.append(sanitizer.flush())
+
+            assert "".join(pieces) == expected
+
+    def test_holds_back_only_open_numbers(self, security):
+        """Test: Se retiene solo la cola que todavía puede formar un dato sensible"""
+        sanitizer = StreamSanitizer(security, authenticated=False)
+
+        assert sanitizer.feed("Tu cuenta 12345") == "Tu cuenta"
+        assert sanitizer.feed("67890 está activa") == " **** está activa"
@@ -0,0 +1,139 @@
+"""
+Tests para la coalescencia de consultas idénticas (src/single_flight.py)
+"""
+
+import asyncio
+
+import pytest
+
+import src.knowledge as knowledge
+from src.agent import AgentEngine
+from src.conversation import ConversationState
+from src.knowledge import KnowledgeBase
+from src.llm_backends import FakeLLM
+from src.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Suite de tests para SingleFlight"""
+
+    def test_followers_receive_leader_chunks(self):
+        """Test: Los seguidores reciben los chunks ya emitidos y los siguientes"""
+        flights = SingleFlight()
+
+        async def run():
+            flight, leader = flights.join("clave")
+            flight.publish("Hola ")
+            follower_flight, follower_leads = flights.join("clave")
+
+            async def follow():
+                return [chunk async for chunk in follower_flight.follow(1.0)]
+
+            task = asyncio.ensure_future(follow())
+            await asyncio.sleep(0)
+            flight.publish("mundo")
+            flight.finish()
+            flights.land(flight)
+            return leader, follower_leads, await task
+
+        leader, follower_leads, chunks = asyncio.run(run())
+        assert leader and not follower_leads
+        assert chunks == ["Hola ", "mundo"]
+        assert flights.get_stats()["coalesced"] == 1
+        assert flights.get_stats()["in_flight"] == 0
+
+    def test_unfinished_flight_is_not_shared(self):
+        """Test: Si el líder no termina su vuelo, los seguidores no lo reutilizan"""
+        flights = SingleFlight()
+
+        async def run():
+            flight, _ = flights.join("clave")
+            follower_flight, _ = flights.join("clave")
+            flights.land(flight)
+            return [chunk async for chunk in follower_flight.follow(1.0)], follower_flight
+
+        chunks, flight = asyncio.run(run())
+        assert chunks == [] and flight.done and not flight.shared
+
+
+class TestAgentSingleFlight:
+    """Suite de tests para la coalescencia en AgentEngine"""
+
+    @pytest.fixture(autouse=True)
+    def kb(self, monkeypatch):
+        """Fixture: Base de conocimiento léxica compartida y caché vacía"""
+        monkeypatch.setattr(knowledge, "_shared_knowledge_base",
+                            KnowledgeBase(use_embeddings=False, docs_dir=None))
+        monkeypatch.setattr("src.cache._shared_response_cache", None)
+
+    def run_concurrently(self, engine: AgentEngine, messages):
+        states = [ConversationState() for _ in messages]
+
+        async def run():
+            return await asyncio.gather(*(
+                engine.aprocess_message(state, message) for state, message in zip(states, messages)
+            ))
+
+        return states, asyncio.run(run())
+
+    def test_identical_queries_share_one_llm_call(self):
+        """Test: Consultas generales equivalentes y simultáneas hacen una sola llamada al LLM"""
+        model = FakeLLM(latency_ms=50, latency_sigma=0, chunk_ms=0)
+        engine = AgentEngine(model=model)
+        messages = ["¿Cómo participo en la promoción?"] * 5 + ["¿como PARTICIPO en la promocion"] * 3
+
+        states, responses = self.run_concurrently(engine, messages)
+
+        assert model.calls == 1
+        assert len(set(responses)) == 1
+        assert all(state.history[-1]["content"] == responses[0] for state in states)
+        assert engine.single_flight.get_stats()["coalesced"] == 7
+
+    def test_tool_calls_are_not_shared(self, monkeypatch):
+        """Test: Si el LLM pide una herramienta, cada conversación resuelve su turno"""
+        monkeypatch.setattr("random.uniform", lambda a, b: 0)
+        model = FakeLLM(latency_ms=50, latency_sigma=0, chunk_ms=0)
+        engine = AgentEngine(model=model)
+        message = "¿Cómo entro? Mi cédula es 1234567890 y el código 123456"
+
+        states, _ = self.run_concurrently(engine, [message] * 3)
+
+        assert all(state.authenticated for state in states)
+        assert model.calls == 3
+        assert engine.single_flight.get_stats()["fallbacks"] == 2
+
+    def test_answers_with_history_are_not_cached(self):
+        """Test: Solo se cachea la respuesta a un primer mensaje, que no depende del historial"""
+        model = FakeLLM(latency_ms=0, latency_sigma=0, chunk_ms=0)
+        engine = AgentEngine(model=model)
+        message = "¿Cómo participo en la promoción?"
+        returning = ConversationState()
+        returning.add_message("user", "Hola, soy cliente del plan empresarial")
+        returning.add_message("assistant", "¡Hola! ¿En qué te ayudo?")
+
+        for state in (returning, ConversationState(), ConversationState()):
+            asyncio.run(engine.aprocess_message(state, message))
+
+        # El primero no se cachea (tenía historial); el tercero reutiliza el segundo
+        assert model.calls == 2
+
+    def test_conversations_with_history_are_not_coalesced(self):
+        """Test: La misma consulta desde conversaciones con distinto historial no comparte respuesta"""
+        model = FakeLLM(latency_ms=50, latency_sigma=0, chunk_ms=0)
+        engine = AgentEngine(model=model)
+        states = [ConversationState(), ConversationState()]
+        states[0].add_message("user", "Tengo una cuenta de ahorros")
+        states[0].add_message("assistant", "Perfecto, ¿en qué te ayudo?")
+        states[1].add_message("user", "Tengo una tarjeta de crédito")
+        states[1].add_message("assistant", "Perfecto, ¿en qué te ayudo?")
+        message = "¿Cómo participo en la promoción?"
+
+        async def run():
+            return await asyncio.gather(*(engine.aprocess_message(state, message) for state in states))
+
+        asyncio.run(run())
+
+        assert model.calls == 2
+        assert engine.single_flight.get_stats()["coalesced"] == 0
+        # Cada conversación guarda su propio turno
+        assert all(len(state.history) == 4 for state in states)
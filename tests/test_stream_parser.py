@@ -0,0 +1,84 @@
+"""
+Tests para la detección incremental de llamadas a herramientas (src/stream_parser.py)
+"""
+
+import json
+
+import pytest
+
+from src.stream_parser import JSON, PENDING, TEXT, ToolCallStreamParser
+
+TOOL_CALL = {
+    "action": "call_tool",
+    "tool_name": "authenticate_user",
+    "parameters": {"document_id": "1234567890", "otp_code": "123456"},
+}
+
+
+def feed_all(parser: ToolCallStreamParser, text: str, size: int = 3) -> str:
+    return "".join(parser.feed(text[i:i + size]) for i in range(0, len(text), size))
+
+
+class TestToolCallStreamParser:
+    """Suite de tests para ToolCallStreamParser"""
+
+    def test_text_is_forwarded_right_away(self):
+        """Test: El lenguaje natural se reenvía desde el primer carácter útil"""
+        parser = ToolCallStreamParser()
+
+        assert parser.feed("  \n") == ""
+        assert parser.mode == PENDING
+        assert parser.feed("Hola") == "Hola"
+        assert parser.mode == TEXT
+        assert parser.feed(", ¿qué tal?") == ", ¿qué tal?"
+
+    @pytest.mark.parametrize("prefix,suffix", [("", ""), ("```json\n", "\n```"), ("\n```\n", "")])
+    def test_tool_call_completes_when_object_closes(self, prefix, suffix):
+        """Test: La llamada se detecta al cerrar el objeto, con o sin bloque de código"""
+        parser = ToolCallStreamParser()
+
+        forwarded = feed_all(parser, prefix + json.dumps(TOOL_CALL) + suffix + " texto extra")
+
+        assert forwarded == ""
+        assert parser.mode == JSON and parser.complete
+        assert parser.tool_call == TOOL_CALL
+
+    def test_braces_inside_strings(self):
+        """Test: Las llaves dentro de strings no cierran el objeto antes de tiempo"""
+        call = {**TOOL_CALL, "user_message": "Un momento } {por favor"}
+        parser = ToolCallStreamParser()
+
+        feed_all(parser, json.dumps(call)[:-1])
+        assert not parser.complete
+        parser.feed("}")
+        assert parser.tool_call == call
+
+    def test_invalid_json_is_not_a_tool_call(self):
+        """Test: Un JSON que no es llamada a herramienta (o incompleto) no se ejecuta"""
+        unknown = ToolCallStreamParser()
+        feed_all(unknown, '{"action": "call_tool", "tool_name": "transferir"}')
+        truncated = ToolCallStreamParser()
+        feed_all(truncated, '{"action": "call_tool"')
+
+        assert unknown.complete and unknown.tool_call is None
+        assert truncated.mode == JSON and not truncated.complete and truncated.tool_call is None
+
+    def test_tool_call_after_prose(self):
+        """Test: Una llamada precedida de texto se detecta y el JSON no se reenvía"""
+        parser = ToolCallStreamParser()
+
+        forwarded = feed_all(parser, "Claro, consulto tu saldo: " + json.dumps(TOOL_CALL) + " listo")
+
+        assert forwarded == "Claro, consulto tu saldo: "
+        assert parser.mode == JSON and parser.complete
+        assert parser.tool_call == TOOL_CALL
+
+    def test_braces_in_prose_are_forwarded(self):
+        """Test: Las llaves del texto que no son una llamada se reenvían, también al final"""
+        text = 'Usa {nombre} o {"clave": 1} en la plantilla {"sin cerrar": '
+        parser = ToolCallStreamParser()
+
+        forwarded = feed_all(parser, text)
+
+        assert parser.mode == TEXT and parser.tool_call is None
+        assert forwarded + parser.flush() == text
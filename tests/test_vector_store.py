@@ -0,0 +1,306 @@
+"""
+Tests para los almacenes vectoriales (src/vector_store.py)
+"""
+
+import sys
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.vector_store import IVFVectorStore, NumpyVectorStore, create_vector_store
+
+
+def _metadatas(ids):
+    return [{"content_hash": f"hash_{item_id}"} for item_id in ids]
+
+
+class TestNumpyVectorStore:
+    """Suite de tests para NumpyVectorStore"""
+
+    @pytest.fixture
+    def corpus(self):
+        """Fixture: embeddings aleatorios reproducibles"""
+        rng = np.random.default_rng(0)
+        return rng.standard_normal((50, 16)).astype(np.float32)
+
+    @pytest.fixture
+    def store(self, tmp_path, corpus):
+        """Fixture: store con 50 documentos indexados"""
+        store = NumpyVectorStore(str(tmp_path), "test-model", mmap=True)
+        ids = [f"doc_{i}" for i in range(len(corpus))]
+        store.upsert(ids, corpus, _metadatas(ids))
+        return store
+
+    def test_query_matches_exact_cosine_ranking(self, store, corpus):
+        """Test: El top-k coincide con el ranking coseno exacto"""
+        query = corpus[7] + 0.1
+        normalized = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+        expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+
+        hits = store.query(query, 5)
+
+        assert [item_id for item_id, _ in hits] == [f"doc_{i}" for i in expected]
+        scores = [score for _, score in hits]
+        assert scores == sorted(scores, reverse=True)
+        assert hits[0][1] <= 1.0 + 1e-6
+
+    def test_batch_query_equals_single_queries(self, store, corpus):
+        """Test: query_batch devuelve lo mismo que queries individuales"""
+        queries = corpus[:4] * 2
+
+        batch = store.query_batch(queries, 3)
+
+        for query, hits in zip(queries, batch):
+            single = store.query(query, 3)
+            assert [i for i, _ in hits] == [i for i, _ in single]
+
+    def test_upsert_replaces_and_delete_removes(self, store, corpus):
+        """Test: upsert sobreescribe por id y delete elimina"""
+        store.upsert(["doc_0"], corpus[1:2], _metadatas(["doc_0"]))
+        assert store.count() == 50
+        assert store.get_content_hashes()["doc_0"] == "hash_doc_0"
+
+        store.delete(["doc_1", "missing"])
+
+        assert store.count() == 49
+        assert "doc_1" not in {item_id for item_id, _ in store.query(corpus[1], 49)}
+        assert store.query(corpus[1], 1)[0][0] == "doc_0"
+
+    def test_persist_and_reload_memory_mapped(self, store, tmp_path, corpus):
+        """Test: El índice persistido se recarga memory-mapped y admite cambios"""
+        store.persist()
+
+        reloaded = NumpyVectorStore(str(tmp_path), "test-model", mmap=True)
+
+        assert isinstance(reloaded.matrix, np.memmap)
+        assert reloaded.ids == store.ids
+        assert reloaded.query(corpus[3], 1)[0][0] == "doc_3"
+
+        reloaded.upsert(["doc_new"], corpus[3:4] * -1, _metadatas(["doc_new"]))
+        assert reloaded.count() == 51
+        assert reloaded.query(-corpus[3], 1)[0][0] == "doc_new"
+
+    def test_other_model_index_is_ignored(self, store, tmp_path):
+        """Test: No se reutilizan vectores de otro modelo de embeddings"""
+        store.persist()
+
+        other = NumpyVectorStore(str(tmp_path), "other-model")
+
+        assert other.count() == 0
+
+    def test_query_filtered_by_ids(self, store, corpus):
+        """Test: Con ids solo se consideran esos documentos"""
+        allowed = ["doc_3", "doc_9", "doc_20", "missing"]
+
+        hits = store.query(corpus[3], 5, ids=allowed)
+
+        assert [item_id for item_id, _ in hits][0] == "doc_3"
+        assert {item_id for item_id, _ in hits} == {"doc_3", "doc_9", "doc_20"}
+        assert store.query(corpus[3], 5, ids=[]) == []
+
+    def test_queries_during_concurrent_writes(self, store, corpus):
+        """Test: Las queries no mezclan ids y scores mientras otro hilo escribe"""
+        # Cambios de hilo frecuentes para intercalar queries y escrituras
+        previous = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        stop = threading.Event()
+
+        def writer():
+            # Borrar doc_0 desplaza todas las filas; reinsertarlo lo pone al final
+            while not stop.is_set():
+                store.delete(["doc_0"])
+                store.upsert(["doc_0"], corpus[:1], _metadatas(["doc_0"]))
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for _ in range(2000):
+                for i in (10, 40):
+                    item_id, score = store.query(corpus[i], 1)[0]
+                    assert item_id == f"doc_{i}"
+                    assert score == pytest.approx(1.0, abs=1e-5)
+        finally:
+            stop.set()
+            thread.join()
+            sys.setswitchinterval(previous)
+
+    def test_unknown_backend(self, tmp_path):
+        """Test: Backend desconocido lanza ValueError"""
+        with pytest.raises(ValueError):
+            create_vector_store("faiss", str(tmp_path), "test-model")
+
+
+class TestQuantizedStorage:
+    """Suite de tests para el almacenamiento cuantizado (float16 / int8)"""
+
+    @pytest.fixture
+    def corpus(self):
+        rng = np.random.default_rng(1)
+        return rng.standard_normal((200, 32)).astype(np.float32)
+
+    def _build(self, path, corpus, **options):
+        store = NumpyVectorStore(str(path), "test-model", **options)
+        ids = [f"doc_{i}" for i in range(len(corpus))]
+        store.upsert(ids, corpus, _metadatas(ids))
+        return store
+
+    @pytest.mark.parametrize("dtype,ratio", [("float16", 2), ("int8", 3.5)])
+    def test_memory_is_reduced(self, tmp_path, corpus, dtype, ratio):
+        """Test: La matriz recorrida ocupa menos que en float32"""
+        full = self._build(tmp_path / "f32", corpus)
+        quantized = self._build(tmp_path / dtype, corpus, dtype=dtype)
+
+        assert full.memory_bytes() / quantized.memory_bytes() >= ratio
+
+    @pytest.mark.parametrize("dtype", ["float16", "int8"])
+    def test_rescore_returns_exact_scores(self, tmp_path, corpus, dtype):
+        """Test: Con rescore el top-k y sus scores coinciden con float32"""
+        full = self._build(tmp_path / "f32", corpus)
+        quantized = self._build(tmp_path / dtype, corpus, dtype=dtype, rescore=True)
+
+        for query in corpus[:20] + 0.3:
+            expected = full.query(query, 5)
+            hits = quantized.query(query, 5)
+            assert [i for i, _ in hits] == [i for i, _ in expected]
+            assert np.allclose([s for _, s in hits], [s for _, s in expected], atol=1e-5)
+
+    def test_filtered_query_with_rescore(self, tmp_path, corpus):
+        """Test: La búsqueda filtrada sobre int8 + rescore devuelve scores exactos"""
+        full = self._build(tmp_path / "f32", corpus)
+        quantized = self._build(tmp_path / "int8", corpus, dtype="int8", rescore=True)
+        allowed = [f"doc_{i}" for i in range(0, 200, 3)]
+
+        expected = full.query(corpus[30] + 0.3, 4, ids=allowed)
+        hits = quantized.query(corpus[30] + 0.3, 4, ids=allowed)
+
+        assert [i for i, _ in hits] == [i for i, _ in expected]
+        assert np.allclose([s for _, s in hits], [s for _, s in expected], atol=1e-5)
+
+    def test_reload_quantized_index(self, tmp_path, corpus):
+        """Test: El índice int8 persistido se recarga sin re-cuantizar"""
+        store = self._build(tmp_path, corpus, dtype="int8")
+        store.persist()
+
+        reloaded = NumpyVectorStore(str(tmp_path), "test-model", dtype="int8")
+
+        assert reloaded.quantized.dtype == np.int8
+        assert not reloaded._dirty
+        assert reloaded.query(corpus[10], 1)[0][0] == "doc_10"
+
+    def test_requantize_float32_index_on_load(self, tmp_path, corpus):
+        """Test: Un índice float32 existente se cuantiza al abrirlo en float16"""
+        self._build(tmp_path, corpus).persist()
+
+        reloaded = NumpyVectorStore(str(tmp_path), "test-model", dtype="float16")
+
+        assert reloaded.quantized.dtype == np.float16
+        assert reloaded.query(corpus[42], 1)[0][0] == "doc_42"
+
+
+class TestIVFVectorStore:
+    """Suite de tests para el índice aproximado IVF"""
+
+    @pytest.fixture
+    def corpus(self):
+        # Datos agrupados: 20 clusters de 100 vectores
+        rng = np.random.default_rng(2)
+        centers = rng.standard_normal((20, 32)).astype(np.float32)
+        points = centers.repeat(100, axis=0) + 0.3 * rng.standard_normal((2000, 32))
+        return points.astype(np.float32)
+
+    @pytest.fixture
+    def store(self, tmp_path, corpus):
+        store = IVFVectorStore(str(tmp_path), "test-model", nlist=20, nprobe=3,
+                               min_train_size=500)
+        ids = [f"doc_{i}" for i in range(len(corpus))]
+        store.upsert(ids, corpus, _metadatas(ids))
+        store.persist()
+        return store
+
+    def test_trains_on_persist_and_keeps_all_vectors(self, store):
+        """Test: persist() entrena las particiones cuando hay suficientes vectores"""
+        assert store.trained
+        assert len(store.centroids) == 20
+        assert store.offsets[-1] == store.count() == 2000
+
+    def test_recall_against_exact_search(self, store, tmp_path, corpus):
+        """Test: Con nprobe moderado el recall frente a búsqueda exacta es alto"""
+        exact = NumpyVectorStore(str(tmp_path / "exact"), "test-model")
+        ids = [f"doc_{i}" for i in range(len(corpus))]
+        exact.upsert(ids, corpus, _metadatas(ids))
+
+        queries = corpus[::50] + 0.05
+        found = [{i for i, _ in hits} for hits in store.query_batch(queries, 5)]
+        expected = [{i for i, _ in hits} for hits in exact.query_batch(queries, 5)]
+        recall = np.mean([len(f & e) / 5 for f, e in zip(found, expected)])
+
+        assert recall >= 0.9
+        # nprobe = nlist equivale a búsqueda exacta
+        assert store.query(queries[0], 5, nprobe=20) == exact.query(queries[0], 5)
+
+    def test_pending_changes_are_searchable_and_deletes_hidden(self, store, corpus):
+        """Test: Altas pendientes se encuentran y bajas no aparecen"""
+        store.upsert(["doc_new"], -corpus[:1], _metadatas(["doc_new"]))
+        store.delete(["doc_0"])
+
+        assert store.query(-corpus[0], 1)[0][0] == "doc_new"
+        assert "doc_0" not in {i for i, _ in store.query(corpus[0], 10, nprobe=20)}
+        assert store.count() == 2000
+
+    def test_filtered_query_is_exact(self, store, corpus):
+        """Test: La búsqueda filtrada por ids es exacta e incluye pendientes"""
+        store.upsert(["doc_new"], corpus[500:501], _metadatas(["doc_new"]))
+        store.delete(["doc_500"])
+        allowed = ["doc_new", "doc_500", "doc_1500", "doc_501"]
+
+        hits = store.query(corpus[500], 3, ids=allowed)
+
+        assert [i for i, _ in hits][0] == "doc_new"
+        assert {i for i, _ in hits} == {"doc_new", "doc_1500", "doc_501"}
+
+    def test_reload_memory_mapped(self, store, tmp_path, corpus):
+        """Test: El índice persistido se recarga memory-mapped"""
+        reloaded = IVFVectorStore(str(tmp_path), "test-model", nprobe=3)
+
+        assert isinstance(reloaded.vectors, np.memmap)
+        assert reloaded.trained
+        assert reloaded.query(corpus[123], 1)[0][0] == "doc_123"
+
+    def test_small_index_stays_exact(self, tmp_path, corpus):
+        """Test: Por debajo de min_train_size no se entrena y la búsqueda es exacta"""
+        store = IVFVectorStore(str(tmp_path), "test-model", min_train_size=1000)
+        ids = [f"doc_{i}" for i in range(50)]
+        store.upsert(ids, corpus[:50], _metadatas(ids))
+        store.persist()
+
+        assert not store.trained
+        assert store.query(corpus[7], 1)[0][0] == "doc_7"
+
+    def test_queries_during_relayout(self, store, corpus):
+        """Test: Las queries ven un layout completo mientras persist() lo rehace"""
+        previous = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        stop = threading.Event()
+
+        def writer():
+            # Cada persist() reordena las particiones y desplaza las filas
+            while not stop.is_set():
+                store.delete(["doc_0"])
+                store.persist()
+                store.upsert(["doc_0"], corpus[:1], _metadatas(["doc_0"]))
+                store.persist()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for _ in range(2000):
+                for i in (123, 1777):
+                    item_id, score = store.query(corpus[i], 1)[0]
+                    assert item_id == f"doc_{i}"
+                    assert score == pytest.approx(1.0, abs=1e-5)
+        finally:
+            stop.set()
+            thread.join()
+            sys.setswitchinterval(previous)
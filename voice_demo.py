@@ -10,7 +10,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from src.voice_agent import VoiceAgent
-from config.settings import GEMINI_API_KEY
+from config.settings import GEMINI_API_KEY, LLM_BACKEND
 
 
 def print_banner():
@@ -164,7 +164,7 @@ def main():
     print_banner()
     
     # Verificar configuración
-    if not GEMINI_API_KEY:
+    if LLM_BACKEND == "gemini" and not GEMINI_API_KEY:
         print("❌ GEMINI_API_KEY no configurada")
         return
     